@@ -4,3 +4,25 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from django.core import checks
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+
+        from api.middleware.site_stack import check_site_middleware
+        from api.models.user import User
+        from api.services import audit_service, loan_shards, read_replicas
+        from api.services.auth_service import forget_user
+        from api.services.slow_query_log import on_connection_created
+
+        checks.register(loan_shards.check_shard_databases, checks.Tags.database)
+        checks.register(check_site_middleware, checks.Tags.admin)
+        checks.register(read_replicas.check_replica_cache, checks.Tags.caches)
+        connection_created.connect(on_connection_created, dispatch_uid="api.slow_query_log")
+        connection_created.connect(read_replicas.on_connection_created, dispatch_uid="api.read_replicas")
+        post_migrate.connect(loan_shards.on_post_migrate, sender=self, dispatch_uid="api.loan_shards")
+        pre_delete.connect(loan_shards.on_user_deleted, sender=User, dispatch_uid="api.loan_shards")
+        pre_delete.connect(audit_service.on_user_deleted, sender=User, dispatch_uid="api.audit_log")
+        post_save.connect(forget_user, sender=User, dispatch_uid="api.auth_user_cache")
+        post_delete.connect(forget_user, sender=User, dispatch_uid="api.auth_user_cache")
@@ -0,0 +1,355 @@
+"""
+Shared Memory Cache
+
+A Django cache backend storing entries in a memory-mapped file, so every
+worker process on a host shares one cache without an external service.
+Put ``LOCATION`` on a tmpfs (``/dev/shm``) to keep it off the disk.
+
+The file holds ``SLOTS`` fixed-size slots of ``SLOT_SIZE`` bytes, grouped
+into sets of ``WAYS``; a key can only live in the set its hash selects.
+Storing into a full set evicts an expired entry or else the least recently
+used one. Entries whose key and pickled value do not fit in a slot are not
+stored.
+
+Sets are guarded by ``STRIPES`` locks, each a thread lock plus an
+``fcntl`` byte-range lock on the file, so operations on different stripes
+run concurrently across threads and processes.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "api.cache_backends.SharedMemoryCache",
+            "LOCATION": "/dev/shm/nobus-cache",
+            "OPTIONS": {"SLOTS": 16384, "SLOT_SIZE": 1024, "STRIPES": 64},
+        }
+    }
+"""
+
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import fcntl
+except ImportError:  # Windows: threads of one process are still safe.
+    fcntl = None
+
+# Backends whose entries each worker process keeps to itself.
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+MAGIC = b"NBSHMC01"
+# magic, slots, slot size, ways, stripes
+FILE_HEADER = struct.Struct("<8sIIII")
+FILE_HEADER_SIZE = 64
+# key hash (0 = empty), expiry (0 = never), last access, key length, value length
+SLOT_HEADER = struct.Struct("<QddII")
+
+
+class _Segment:
+    """
+    One mapped cache file, shared by every cache instance of the process.
+
+    Django creates a cache instance per thread, but ``fcntl`` locks belong
+    to the process and are dropped when any descriptor of the file is
+    closed, so the file is opened once per process and never closed.
+    """
+
+    def __init__(self, path: Path, slots: int, slot_size: int, ways: int, stripes: int):
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.ways = ways
+        self.sets = slots // ways
+        self.stripes = stripes
+        self.size = FILE_HEADER_SIZE + slots * slot_size
+        self.thread_locks = [threading.Lock() for _ in range(stripes)]
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        # The byte after the stripe locks serializes initialization.
+        self._lock_range(stripes)
+        try:
+            self._initialize()
+        finally:
+            self._unlock_range(stripes)
+        self.map = mmap.mmap(self.fd, self.size)
+
+    def _initialize(self) -> None:
+        layout = (MAGIC, self.slots, self.slot_size, self.ways, self.stripes)
+        if os.fstat(self.fd).st_size == 0:
+            os.ftruncate(self.fd, self.size)
+            os.pwrite(self.fd, FILE_HEADER.pack(*layout), 0)
+            return
+        found = FILE_HEADER.unpack(os.pread(self.fd, FILE_HEADER.size, 0))
+        if found != layout:
+            raise ImproperlyConfigured(
+                f"Cache file {self.path} was created with a different layout {found[1:]}; "
+                f"remove it or change LOCATION"
+            )
+
+    def _lock_range(self, start: int) -> None:
+        if fcntl is not None:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, start)
+
+    def _unlock_range(self, start: int) -> None:
+        if fcntl is not None:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, start)
+
+    @contextmanager
+    def locked(self, stripe: int):
+        with self.thread_locks[stripe]:
+            self._lock_range(stripe)
+            try:
+                yield
+            finally:
+                self._unlock_range(stripe)
+
+    def reset_thread_locks(self) -> None:
+        # A forked child must not inherit a lock some other thread held at fork time.
+        self.thread_locks = [threading.Lock() for _ in range(self.stripes)]
+
+
+_segments: Dict[Path, _Segment] = {}
+_segments_lock = threading.Lock()
+
+
+def _get_segment(path: Path, slots: int, slot_size: int, ways: int, stripes: int) -> _Segment:
+    with _segments_lock:
+        segment = _segments.get(path)
+        if segment is None:
+            segment = _segments[path] = _Segment(path, slots, slot_size, ways, stripes)
+        elif (segment.slots, segment.slot_size, segment.ways, segment.stripes) != (slots, slot_size, ways, stripes):
+            raise ImproperlyConfigured(f"Cache file {path} is already mapped with a different layout")
+        return segment
+
+
+def _after_fork() -> None:
+    for segment in _segments.values():
+        segment.reset_thread_locks()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+class SharedMemoryCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        slots = int(options.get("SLOTS", 16384))
+        slot_size = int(options.get("SLOT_SIZE", 1024))
+        ways = int(options.get("WAYS", 8))
+        stripes = int(options.get("STRIPES", 64))
+        if slots % ways or slot_size <= SLOT_HEADER.size:
+            raise ImproperlyConfigured("SLOTS must be a multiple of WAYS and SLOT_SIZE larger than the slot header")
+        self._segment = _get_segment(Path(location).resolve(), slots, slot_size, ways, stripes)
+
+    # Slot access; callers hold the stripe lock of the slot's set.
+
+    def _locate(self, key: str) -> Tuple[bytes, int, int]:
+        """Return the encoded key, its hash and its set."""
+        encoded = key.encode("utf-8")
+        digest = int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), "little") | 1
+        return encoded, digest, digest % self._segment.sets
+
+    def _offset(self, slot: int) -> int:
+        return FILE_HEADER_SIZE + slot * self._segment.slot_size
+
+    def _stripe(self, set_index: int) -> int:
+        return set_index % self._segment.stripes
+
+    def _header(self, slot: int) -> Tuple[int, float, float, int, int]:
+        return SLOT_HEADER.unpack_from(self._segment.map, self._offset(slot))
+
+    def _find(self, encoded: bytes, digest: int, set_index: int) -> Optional[int]:
+        """The slot holding the key, live or expired, or None."""
+        segment = self._segment
+        first = set_index * segment.ways
+        for slot in range(first, first + segment.ways):
+            key_hash, _, _, key_len, _ = self._header(slot)
+            if key_hash == digest:
+                start = self._offset(slot) + SLOT_HEADER.size
+                if segment.map[start:start + key_len] == encoded:
+                    return slot
+        return None
+
+    def _victim(self, set_index: int, now: float) -> int:
+        """An empty or expired slot of the set, else its least recently used one."""
+        segment = self._segment
+        first = set_index * segment.ways
+        oldest, oldest_access = first, float("inf")
+        for slot in range(first, first + segment.ways):
+            key_hash, expires, accessed, _, _ = self._header(slot)
+            if key_hash == 0 or (expires and expires <= now):
+                return slot
+            if accessed < oldest_access:
+                oldest, oldest_access = slot, accessed
+        return oldest
+
+    def _read(self, slot: int, now: float):
+        """Return ``(found, value)`` for a slot, clearing it if it has expired."""
+        key_hash, expires, _, key_len, value_len = self._header(slot)
+        if expires and expires <= now:
+            self._clear_slot(slot)
+            return False, None
+        offset = self._offset(slot)
+        SLOT_HEADER.pack_into(self._segment.map, offset, key_hash, expires, now, key_len, value_len)
+        start = offset + SLOT_HEADER.size + key_len
+        return True, self._segment.map[start:start + value_len]
+
+    def _write(self, slot: int, encoded: bytes, digest: int, value: bytes, expires: float, now: float) -> None:
+        offset = self._offset(slot)
+        start = offset + SLOT_HEADER.size
+        segment = self._segment
+        segment.map[start:start + len(encoded)] = encoded
+        segment.map[start + len(encoded):start + len(encoded) + len(value)] = value
+        SLOT_HEADER.pack_into(segment.map, offset, digest, expires, now, len(encoded), len(value))
+
+    def _clear_slot(self, slot: int) -> None:
+        SLOT_HEADER.pack_into(self._segment.map, self._offset(slot), 0, 0.0, 0.0, 0, 0)
+
+    def _fits(self, encoded: bytes, value: bytes) -> bool:
+        return SLOT_HEADER.size + len(encoded) + len(value) <= self._segment.slot_size
+
+    def _expiry(self, timeout) -> float:
+        expiry = self.get_backend_timeout(timeout)
+        return 0.0 if expiry is None else expiry
+
+    def _store(self, key, value, timeout, only_if_missing: bool) -> bool:
+        encoded, digest, set_index = self._locate(key)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        if not self._fits(encoded, pickled):
+            return False
+        now = time.time()
+        with self._segment.locked(self._stripe(set_index)):
+            slot = self._find(encoded, digest, set_index)
+            if slot is not None:
+                _, expires, _, _, _ = self._header(slot)
+                if only_if_missing and not (expires and expires <= now):
+                    return False
+            else:
+                slot = self._victim(set_index, now)
+            self._write(slot, encoded, digest, pickled, self._expiry(timeout), now)
+        return True
+
+    # Cache API
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._store(key, value, timeout, only_if_missing=True)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        if not self._store(key, value, timeout, only_if_missing=False):
+            # A value too large for a slot must not leave a stale one behind.
+            self._remove(key)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        encoded, digest, set_index = self._locate(key)
+        with self._segment.locked(self._stripe(set_index)):
+            slot = self._find(encoded, digest, set_index)
+            if slot is None:
+                return default
+            found, pickled = self._read(slot, time.time())
+        return pickle.loads(pickled) if found else default
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        encoded, digest, set_index = self._locate(key)
+        now = time.time()
+        with self._segment.locked(self._stripe(set_index)):
+            slot = self._find(encoded, digest, set_index)
+            if slot is None:
+                return False
+            key_hash, expires, _, key_len, value_len = self._header(slot)
+            if expires and expires <= now:
+                self._clear_slot(slot)
+                return False
+            SLOT_HEADER.pack_into(
+                self._segment.map, self._offset(slot), key_hash, self._expiry(timeout), now, key_len, value_len
+            )
+            return True
+
+    def delete(self, key, version=None):
+        return self._remove(self.make_and_validate_key(key, version=version))
+
+    def _remove(self, key: str) -> bool:
+        encoded, digest, set_index = self._locate(key)
+        with self._segment.locked(self._stripe(set_index)):
+            slot = self._find(encoded, digest, set_index)
+            if slot is None:
+                return False
+            _, expires, _, _, _ = self._header(slot)
+            self._clear_slot(slot)
+        return not (expires and expires <= time.time())
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        encoded, digest, set_index = self._locate(key)
+        with self._segment.locked(self._stripe(set_index)):
+            slot = self._find(encoded, digest, set_index)
+            if slot is None:
+                return False
+            _, expires, _, _, _ = self._header(slot)
+            return not (expires and expires <= time.time())
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        encoded, digest, set_index = self._locate(key)
+        now = time.time()
+        with self._segment.locked(self._stripe(set_index)):
+            slot = self._find(encoded, digest, set_index)
+            found, pickled = self._read(slot, now) if slot is not None else (False, None)
+            if not found:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(pickled) + delta
+            new = pickle.dumps(value, self.pickle_protocol)
+            if not self._fits(encoded, new):
+                raise ValueError(f"Key '{key}' no longer fits in a cache slot")
+            _, expires, _, _, _ = self._header(slot)
+            self._write(slot, encoded, digest, new, expires, now)
+        return value
+
+    def clear(self):
+        segment = self._segment
+        for stripe in range(segment.stripes):
+            with segment.locked(stripe):
+                for set_index in range(stripe, segment.sets, segment.stripes):
+                    first = set_index * segment.ways
+                    for slot in range(first, first + segment.ways):
+                        self._clear_slot(slot)
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of live, expired and empty slots; reads without locking."""
+        now = time.time()
+        counts = {"live": 0, "expired": 0, "empty": 0}
+        for slot in range(self._segment.slots):
+            key_hash, expires, _, _, _ = self._header(slot)
+            if key_hash == 0:
+                counts["empty"] += 1
+            elif expires and expires <= now:
+                counts["expired"] += 1
+            else:
+                counts["live"] += 1
+        return counts
+
+
+def is_process_local(alias: str = "default") -> bool:
+    """Whether the cache ``alias`` is not shared between worker processes."""
+    return settings.CACHES[alias]["BACKEND"] in PROCESS_LOCAL_CACHES
@@ -0,0 +1,41 @@
+"""
+Database error helpers.
+
+Tells which unique constraint an ``IntegrityError`` violated, so callers
+can map an expected conflict to a response and re-raise anything else.
+"""
+
+from typing import Iterable, Optional, Type
+
+from django.db import IntegrityError, models
+
+
+def is_unique_violation(
+    error: IntegrityError,
+    model: Type[models.Model],
+    constraint: Optional[str] = None,
+    fields: Optional[Iterable[str]] = None,
+) -> bool:
+    """
+    Whether ``error`` is a violation of the unique constraint named
+    ``constraint`` on ``model``, or of the unique index on ``fields``.
+    """
+    message = str(error)
+    diag = getattr(error.__cause__, "diag", None)
+    if constraint is not None:
+        if diag is not None and getattr(diag, "constraint_name", None):
+            return diag.constraint_name == constraint
+        if constraint in message:
+            # PostgreSQL and MySQL name the constraint; SQLite names
+            # expression indexes ("UNIQUE constraint failed: index '<name>'").
+            return True
+        fields = next(c.fields for c in model._meta.constraints if c.name == constraint)
+    if not fields:
+        return False
+    columns = [model._meta.get_field(name).column for name in fields]
+    # SQLite lists the columns of a column-based unique index.
+    table = model._meta.db_table
+    if message == "UNIQUE constraint failed: " + ", ".join(f"{table}.{column}" for column in columns):
+        return True
+    # PostgreSQL: 'Key (col, col)=(...) already exists.'
+    return f"Key ({', '.join(columns)})=" in message
@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, router
+
+from api.models.admin_log import AdminLog
+from api.models.loan_application import LoanApplication
+from api.models.user import User
+from api.services import loan_shards, read_replicas
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a replica of the database the other routers pick (see
+    ``api.services.read_replicas``) and keeps writes on the primary, also
+    for objects that were read from a replica.
+
+    Must come first in ``DATABASE_ROUTERS``.
+    """
+
+    def _primary(self, model, hints):
+        for other in router.routers:
+            if isinstance(other, ReplicaRouter) or not hasattr(other, "db_for_write"):
+                continue
+            alias = other.db_for_write(model, **hints)
+            if alias:
+                return alias
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return read_replicas.primary_of(instance._state.db)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        return read_replicas.read_alias(self._primary(model, hints))
+
+    def db_for_write(self, model, **hints):
+        read_replicas.record_write()
+        return self._primary(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if read_replicas.primary_of(obj1._state.db) == read_replicas.primary_of(obj2._state.db):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        if read_replicas.is_replica(db):
+            return False
+        return None
+
+
+class AuditRouter:
+    """
+    Places AdminLog on the audit database (``AUDIT_DATABASE``) when one is
+    configured; the admin of an entry stays on the directory database.
+    """
+
+    def _alias(self):
+        return getattr(settings, "AUDIT_DATABASE", None)
+
+    def _route(self, model, hints):
+        alias = self._alias()
+        if alias is None:
+            return None
+        if model._meta.label_lower == "api.adminlog":
+            return alias
+        if isinstance(hints.get("instance"), AdminLog):
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {type(obj1), type(obj2)} == {AdminLog, User}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        alias = self._alias()
+        if alias is None:
+            return None
+        is_audit_model = app_label == "api" and model_name == "adminlog"
+        if db == alias:
+            return is_audit_model
+        return False if is_audit_model else None
+
+
+class LoanShardRouter:
+    """
+    Routes LoanApplication to the shard of its user (see
+    ``api.services.loan_shards``); everything reached from a loan, like
+    ``loan.user``, stays on the directory database.
+
+    Queries without a user or loan hint are not routed; use
+    ``user.loan_applications``, ``loan_shards.loan_queryset()`` or
+    ``loan_shards.scatter()``.
+    """
+
+    def _route(self, model, hints):
+        instance = hints.get("instance")
+        if model is LoanApplication:
+            if isinstance(instance, LoanApplication) and instance.user_id is not None:
+                return loan_shards.shard_for_user(instance.user_id)
+            if isinstance(instance, User) and instance.pk is not None:
+                return loan_shards.shard_for_user(instance.pk)
+            return None
+        if isinstance(instance, LoanApplication):
+            return loan_shards.DIRECTORY_DATABASE
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {type(obj1), type(obj2)} == {LoanApplication, User}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == loan_shards.DIRECTORY_DATABASE or db not in loan_shards.get_shard_aliases():
+            return None
+        return app_label == "api" and model_name == "loanapplication"
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.services.audit_archive import AdminLogArchive, archive_admin_logs
+
+
+class Command(BaseCommand):
+    help = "Move old AdminLog rows into compressed, date-partitioned JSONL archive files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=getattr(settings, "AUDIT_LOG_RETENTION_DAYS", 90),
+            help="Archive rows older than this many days (default: AUDIT_LOG_RETENTION_DAYS).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Number of rows read, written and deleted per chunk.",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            default=None,
+            help="Archive root directory (default: AUDIT_ARCHIVE_DIR).",
+        )
+
+    def handle(self, *args, **options):
+        archive = AdminLogArchive(options["archive_dir"])
+        stats = archive_admin_logs(
+            older_than_days=options["older_than_days"],
+            chunk_size=options["chunk_size"],
+            archive=archive,
+        )
+        if stats["resumed"]:
+            self.stdout.write("Resumed an interrupted archive run.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {stats['archived']} rows in {stats['chunks']} chunks "
+            f"({stats['deleted']} deleted) to {archive.root}"
+        ))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services import auto_decision
+
+
+class Command(BaseCommand):
+    help = "Approve or reject pending loans matching the LOAN_DECISION_RULES policies, in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many loans each rule would decide.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Loans decided per transaction.")
+        parser.add_argument("--send-emails", action="store_true", help="Send approval emails for approved loans.")
+
+    def handle(self, *args, **options):
+        try:
+            rules = auto_decision.get_rules()
+        except auto_decision.InvalidRule as e:
+            raise CommandError(str(e))
+        if not rules:
+            raise CommandError("No rules configured in LOAN_DECISION_RULES.")
+
+        started = time.perf_counter()
+        if options["dry_run"]:
+            counts = auto_decision.preview(rules)
+        else:
+            counts = auto_decision.apply(rules, chunk_size=options["chunk_size"], send_emails=options["send_emails"])
+        elapsed = time.perf_counter() - started
+
+        for rule in rules:
+            self.stdout.write(f"{rule.name:<30} {rule.decision:<9} {counts[rule.name]:>8}")
+        verb = "Would decide" if options["dry_run"] else "Decided"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {sum(counts.values())} loans in {elapsed:.2f}s"))
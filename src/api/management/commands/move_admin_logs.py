@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.audit_service import move_admin_logs
+
+
+class Command(BaseCommand):
+    help = "Move AdminLog rows written to the main database before AUDIT_DATABASE_PATH was set to the audit database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Number of rows read, written and deleted per chunk.",
+        )
+
+    def handle(self, *args, **options):
+        if not getattr(settings, "AUDIT_DATABASE", None):
+            raise CommandError("AUDIT_DATABASE_PATH is not set; AdminLog already lives in the main database.")
+        stats = move_admin_logs(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {stats['moved']} rows in {stats['chunks']} chunks "
+            f"({stats['present']} already present) to the {settings.AUDIT_DATABASE} database"
+        ))
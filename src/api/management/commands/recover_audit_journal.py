@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.services.audit_journal import get_journal
+
+
+class Command(BaseCommand):
+    help = "Write AdminLog entries left in the audit journal (after a crash or audit database outage)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-seconds",
+            type=float,
+            default=None,
+            help="Skip entries journaled more recently than this (default: AUDIT_JOURNAL_GRACE_SECONDS).",
+        )
+
+    def handle(self, *args, **options):
+        journal = get_journal()
+        if options["grace_seconds"] is not None:
+            journal.grace_seconds = options["grace_seconds"]
+        stats = journal.recover()
+        style = self.style.SUCCESS if not stats["failed"] else self.style.WARNING
+        self.stdout.write(style(
+            f"Wrote {stats['written']} entries ({stats['present']} already present, "
+            f"{stats['failed']} failed, {stats['deferred']} too recent) from {journal.path}"
+        ))
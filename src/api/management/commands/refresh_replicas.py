@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.read_replicas import copy_to_replica, get_replicas
+
+
+class Command(BaseCommand):
+    help = "Copy each SQLite primary database over its local read replicas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("aliases", nargs="*", help="Replica aliases to refresh (default: all).")
+
+    def handle(self, *args, **options):
+        configured = [alias for replicas in get_replicas().values() for alias in replicas]
+        aliases = options["aliases"] or configured
+        if not aliases:
+            self.stdout.write("No read replicas configured (set DATABASE_REPLICA_PATHS).")
+            return
+        for alias in aliases:
+            if alias not in configured:
+                raise CommandError(f"{alias} is not a configured replica")
+            copy_to_replica(alias)
+            self.stdout.write(self.style.SUCCESS(f"Refreshed {alias}"))
@@ -0,0 +1,62 @@
+from datetime import date, datetime, time, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.data_seeder import DataSeeder, parse_status_mix
+
+
+class Command(BaseCommand):
+    help = "Generate deterministic synthetic users, loans and audit logs for load and scale testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Number of regular users.")
+        parser.add_argument("--admins", type=int, default=5, help="Number of staff users that decide loans.")
+        parser.add_argument("--loans-per-user", type=float, default=2.0, help="Mean loans per user (Poisson).")
+        parser.add_argument(
+            "--status-mix",
+            default="PENDING=0.4,APPROVED=0.4,REJECTED=0.2",
+            help="Relative weights of loan statuses.",
+        )
+        parser.add_argument("--days", type=int, default=365, help="Spread created_at uniformly over this many days.")
+        parser.add_argument(
+            "--audit-density",
+            type=float,
+            default=1.0,
+            help="Fraction of decided loans that get an AdminLog entry.",
+        )
+        parser.add_argument(
+            "--end-date",
+            type=date.fromisoformat,
+            default=None,
+            help="Latest created_at (YYYY-MM-DD, default now). Fix it for byte-identical datasets.",
+        )
+        parser.add_argument("--seed", type=int, default=42, help="Random seed; the same seed gives the same data.")
+        parser.add_argument("--prefix", default="seed", help="Prefix of generated email addresses.")
+        parser.add_argument("--password", default="password123", help="Password shared by all generated users.")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per bulk_create call.")
+        parser.add_argument("--transaction-size", type=int, default=100000, help="Rows per transaction.")
+
+    def handle(self, *args, **options):
+        try:
+            seeder = DataSeeder(
+                users=options["users"],
+                admins=options["admins"],
+                loans_per_user=options["loans_per_user"],
+                status_mix=parse_status_mix(options["status_mix"]),
+                days=options["days"],
+                audit_density=options["audit_density"],
+                seed=options["seed"],
+                prefix=options["prefix"],
+                password=options["password"],
+                chunk_size=options["chunk_size"],
+                transaction_size=options["transaction_size"],
+                now=datetime.combine(options["end_date"], time.min, timezone.utc) if options["end_date"] else None,
+                progress=self.stdout.write,
+            )
+            counts = seeder.run()
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {counts['users']} users, {counts['admins']} admins, "
+            f"{counts['loans']} loans and {counts['audit_logs']} audit logs"
+        ))
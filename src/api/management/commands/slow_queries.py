@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.services.slow_query_log import summarize
+
+SORT_KEYS = {"total": "total_ms", "count": "count", "max": "max_ms", "avg": "avg_ms"}
+
+
+class Command(BaseCommand):
+    help = "Summarize the slow query log by SQL fingerprint."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default=None,
+            help="Slow query log to read, including its rotated backups (default: SLOW_QUERY_LOG_FILE).",
+        )
+        parser.add_argument("--top", type=int, default=20, help="Number of fingerprints to show.")
+        parser.add_argument("--sort", choices=sorted(SORT_KEYS), default="total", help="Ranking (default: total time).")
+
+    def handle(self, *args, **options):
+        path = options["file"] or getattr(settings, "SLOW_QUERY_LOG_FILE", settings.BASE_DIR / "logs" / "slow_queries.jsonl")
+        groups = summarize(path)
+        if not groups:
+            self.stdout.write(f"No slow queries logged in {path}")
+            return
+
+        groups.sort(key=lambda group: group[SORT_KEYS[options["sort"]]], reverse=True)
+        for group in groups[:options["top"]]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"[{group['fingerprint_id']}] {group['count']} calls, total {group['total_ms']:.1f} ms, "
+                f"avg {group['avg_ms']:.1f} ms, max {group['max_ms']:.1f} ms"
+            ))
+            self.stdout.write(f"  {group['fingerprint']}")
+            for route, count in list(group["routes"].items())[:3]:
+                self.stdout.write(f"  route:  {route} ({count})")
+            for caller, count in list(group["callers"].items())[:3]:
+                self.stdout.write(f"  caller: {caller} ({count})")
+            for line in group["plan"] or []:
+                style = self.style.WARNING if line in group["plan_warnings"] else str
+                self.stdout.write(style(f"  plan:   {line}"))
+        self.stdout.write(self.style.SUCCESS(f"{len(groups)} distinct slow queries in {path}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.services.loan_rollups import update_rollups
+
+
+class Command(BaseCommand):
+    help = "Fold loans and loan decisions added since the last run into the daily/weekly/monthly rollups."
+
+    def handle(self, *args, **options):
+        stats = update_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {stats['loans']} loans and {stats['decisions']} decisions "
+            f"({stats['buckets']} rollup buckets written)"
+        ))
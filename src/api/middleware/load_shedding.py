@@ -0,0 +1,127 @@
+"""
+Load Shedding Middleware
+
+Applies an adaptive concurrency limit per route class to ``/api/``
+requests. Requests beyond the limit, or that already waited longer than
+``CONCURRENCY_MAX_QUEUE_MS`` in front of the worker (per the proxy's
+``X-Request-Start`` header), are answered immediately with 503 and
+``Retry-After`` instead of joining the pile-up.
+
+Clients can send ``X-Request-Start`` themselves, so it is only read with
+``CONCURRENCY_TRUST_REQUEST_START`` set, i.e. behind a proxy that
+overwrites it. Even then the wait it claims never counts as a latency
+sample beyond ``CONCURRENCY_MAX_QUEUE_MS``.
+"""
+
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+
+from api.services.concurrency_limiter import (
+    ADMIN_WRITE,
+    AUTH,
+    INTROSPECT,
+    READ,
+    WRITE,
+    AIMDLimiter,
+    classify,
+    is_high_priority,
+    parse_request_start,
+)
+
+DEFAULT_INITIAL_LIMITS = {AUTH: 10, INTROSPECT: 20, READ: 50, WRITE: 10, ADMIN_WRITE: 10}
+# Login and register hash a password, which alone takes a few hundred ms.
+DEFAULT_TARGET_LATENCIES_MS = {AUTH: 1000}
+
+
+class LoadSheddingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "CONCURRENCY_LIMIT_ENABLED", True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.exempt_paths = tuple(getattr(settings, "CONCURRENCY_EXEMPT_PATHS", ("/api/loans/events",)))
+        self.max_queue_ms = getattr(settings, "CONCURRENCY_MAX_QUEUE_MS", 2000)
+        self.trust_request_start = getattr(settings, "CONCURRENCY_TRUST_REQUEST_START", False)
+        initial_limits = {**DEFAULT_INITIAL_LIMITS, **getattr(settings, "CONCURRENCY_INITIAL_LIMITS", {})}
+        target_latency_ms = getattr(settings, "CONCURRENCY_TARGET_LATENCY_MS", 250)
+        target_latencies_ms = {
+            **DEFAULT_TARGET_LATENCIES_MS,
+            **getattr(settings, "CONCURRENCY_TARGET_LATENCIES_MS", {}),
+        }
+        self.limiters = {
+            name: AIMDLimiter(
+                name,
+                initial_limit=initial,
+                min_limit=getattr(settings, "CONCURRENCY_MIN_LIMIT", 1),
+                max_limit=getattr(settings, "CONCURRENCY_MAX_LIMIT", 200),
+                target_latency_ms=target_latencies_ms.get(name, target_latency_ms),
+                backoff_ratio=getattr(settings, "CONCURRENCY_BACKOFF_RATIO", 0.9),
+                low_priority_share=getattr(settings, "CONCURRENCY_LOW_PRIORITY_SHARE", 0.5),
+                latency_tolerance=getattr(settings, "CONCURRENCY_LATENCY_TOLERANCE", 2.0),
+            )
+            for name, initial in initial_limits.items()
+        }
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _reject(self, limiter: AIMDLimiter) -> JsonResponse:
+        response = JsonResponse({"detail": "Server is busy, please retry shortly"}, status=503)
+        response["Retry-After"] = str(limiter.retry_after())
+        return response
+
+    def _admit(self, request):
+        """
+        Return ``(limiter, start, queued_ms)`` for an admitted request, a 503
+        response for a shed one, or None for requests that are not limited.
+        """
+        path = request.path
+        if not path.startswith("/api/") or path.startswith(self.exempt_paths):
+            return None
+
+        start = time.time()
+        queued_ms = 0.0
+        if self.trust_request_start:
+            request_start = parse_request_start(request.headers.get("X-Request-Start"))
+            if request_start:
+                queued_ms = max(0.0, (start - request_start) * 1000)
+
+        limiter = self.limiters[classify(request.method, path)]
+        if queued_ms > self.max_queue_ms:
+            # The client has likely given up already.
+            limiter.shed()
+            return self._reject(limiter)
+        if not limiter.try_acquire(is_high_priority(request.headers)):
+            return self._reject(limiter)
+        return limiter, start, queued_ms
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        admitted = self._admit(request)
+        if admitted is None:
+            return self.get_response(request)
+        if isinstance(admitted, JsonResponse):
+            return admitted
+        limiter, start, queued_ms = admitted
+        try:
+            return self.get_response(request)
+        finally:
+            limiter.release(queued_ms + (time.time() - start) * 1000)
+
+    async def __acall__(self, request):
+        admitted = self._admit(request)
+        if admitted is None:
+            return await self.get_response(request)
+        if isinstance(admitted, JsonResponse):
+            return admitted
+        limiter, start, queued_ms = admitted
+        try:
+            return await self.get_response(request)
+        finally:
+            limiter.release(queued_ms + (time.time() - start) * 1000)
@@ -0,0 +1,100 @@
+"""
+Profiling Middleware
+
+Profiles a request (see ``api.services.profiler``) when an admin sends the
+``X-Profile`` header or the request is sampled. Untriggered requests pay
+for one header lookup, plus one random draw when sampling is enabled.
+
+One request is profiled at a time; triggers arriving meanwhile are
+ignored. Async requests are profiled on the event loop thread, so the
+capture also contains whatever else the loop ran during the request.
+"""
+
+import threading
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from api.services import profiler
+from api.services.auth_service import AdminAuth
+
+HEADER = "X-Profile"
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.meta_key = "HTTP_" + HEADER.upper().replace("-", "_")
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+        self.mode = getattr(settings, "PROFILING_MODE", profiler.CPROFILE)
+        self.interval = getattr(settings, "PROFILING_SAMPLE_INTERVAL_MS", 1.0) / 1000
+        self.spool = profiler.get_spool()
+        self._busy = threading.Lock()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _trigger(self, request):
+        """Return why the request should be profiled, or None."""
+        if self.meta_key in request.META:
+            scheme, _, token = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+            if scheme.lower() == "bearer" and AdminAuth().authenticate(request, token):
+                return "header"
+            return None
+        if profiler.should_sample(self.sample_rate):
+            return "sample"
+        return None
+
+    def _save(self, capture, request, response, trigger):
+        match = getattr(request, "resolver_match", None)
+        route = f"/{match.route}" if match is not None and match.route else request.path
+        metadata = self.spool.save(capture, {
+            "method": request.method,
+            "route": route,
+            "path": request.path,
+            "status_code": response.status_code,
+            "trigger": trigger,
+        })
+        response["X-Profile-Id"] = metadata["id"]
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        trigger = self._trigger(request)
+        if trigger is None or not self._busy.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            capture = profiler.Capture(self.mode, self.interval)
+            capture.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                capture.stop()
+            self._save(capture, request, response, trigger)
+            return response
+        finally:
+            self._busy.release()
+
+    async def __acall__(self, request):
+        if self.meta_key in request.META:
+            trigger = await sync_to_async(self._trigger)(request)
+        else:
+            trigger = "sample" if profiler.should_sample(self.sample_rate) else None
+        if trigger is None or not self._busy.acquire(blocking=False):
+            return await self.get_response(request)
+        try:
+            capture = profiler.Capture(self.mode, self.interval)
+            capture.start()
+            try:
+                response = await self.get_response(request)
+            finally:
+                capture.stop()
+            await sync_to_async(self._save)(capture, request, response, trigger)
+            return response
+        finally:
+            self._busy.release()
@@ -0,0 +1,40 @@
+"""
+Read Replica Middleware
+
+Tells the replica router which request is being served, so reads of
+GET/HEAD/OPTIONS requests can go to a replica and all others stay on the
+primary.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+
+from api.services import read_replicas
+
+
+class ReadReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not any(read_replicas.get_replicas().values()):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = read_replicas.begin_request(request.method)
+        try:
+            return self.get_response(request)
+        finally:
+            read_replicas.end_request(token)
+
+    async def __acall__(self, request):
+        token = read_replicas.begin_request(request.method)
+        try:
+            return await self.get_response(request)
+        finally:
+            read_replicas.end_request(token)
@@ -0,0 +1,134 @@
+"""
+Site Middleware Stack
+
+Runs the browser-facing middleware (sessions, CSRF, authentication,
+messages, clickjacking protection) only for requests outside
+``LEAN_PATH_PREFIXES``. The Ninja API under ``/api/`` authenticates with
+bearer tokens and needs none of it, so API requests skip the session
+lookup, the lazy ``request.user``, cookie handling and the extra response
+processing.
+
+The wrapped middleware is chained exactly as Django's handler chains
+``MIDDLEWARE``, and its ``process_view``, ``process_exception`` and
+``process_template_response`` hooks are forwarded for site requests.
+
+The admin's own middleware checks (admin.E408-E410) only look at
+``MIDDLEWARE``, so they are silenced and ``check_site_middleware`` runs
+them against the middleware this stack actually runs.
+"""
+
+from typing import List
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.apps import apps
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+# Middleware the admin needs, with the id of the error when it is missing.
+ADMIN_MIDDLEWARE = {
+    "django.contrib.auth.middleware.AuthenticationMiddleware": "api.E003",
+    "django.contrib.messages.middleware.MessageMiddleware": "api.E004",
+    "django.contrib.sessions.middleware.SessionMiddleware": "api.E005",
+}
+
+
+class SiteMiddlewareStack:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lean_prefixes = tuple(getattr(settings, "LEAN_PATH_PREFIXES", ("/api/",)))
+        is_async = iscoroutinefunction(get_response)
+
+        self._view_hooks = []
+        self._template_response_hooks = []
+        self._exception_hooks = []
+        handler = get_response
+        for middleware_path in reversed(getattr(settings, "SITE_MIDDLEWARE", [])):
+            middleware = import_string(middleware_path)
+            if is_async and not getattr(middleware, "async_capable", False):
+                raise ImproperlyConfigured(f"SITE_MIDDLEWARE entry {middleware_path} must be async capable")
+            if not is_async and not getattr(middleware, "sync_capable", True):
+                raise ImproperlyConfigured(f"SITE_MIDDLEWARE entry {middleware_path} must be sync capable")
+            try:
+                instance = middleware(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(instance, "process_view"):
+                self._view_hooks.insert(0, instance.process_view)
+            if hasattr(instance, "process_template_response"):
+                self._template_response_hooks.append(instance.process_template_response)
+            if hasattr(instance, "process_exception"):
+                self._exception_hooks.append(instance.process_exception)
+            handler = convert_exception_to_response(instance)
+        self.site_handler = handler
+
+        if is_async:
+            markcoroutinefunction(self)
+
+    def is_lean(self, request) -> bool:
+        return request.path_info.startswith(self.lean_prefixes)
+
+    def __call__(self, request):
+        if self.is_lean(request):
+            return self.get_response(request)
+        return self.site_handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_lean(request):
+            return None
+        for hook in self._view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_exception(self, request, exception):
+        if self.is_lean(request):
+            return None
+        for hook in self._exception_hooks:
+            response = hook(request, exception)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        if self.is_lean(request):
+            return response
+        for hook in self._template_response_hooks:
+            response = hook(request, response)
+        return response
+
+
+def _contains_subclass(class_path: str, candidate_paths: List[str]) -> bool:
+    cls = import_string(class_path)
+    for path in candidate_paths:
+        try:
+            candidate = import_string(path)
+        except ImportError:
+            continue
+        if isinstance(candidate, type) and issubclass(candidate, cls):
+            return True
+    return False
+
+
+def check_site_middleware(app_configs, **kwargs) -> List[checks.Error]:
+    """System check: the admin's middleware runs, from MIDDLEWARE or through the site stack."""
+    if not apps.is_installed("django.contrib.admin"):
+        return []
+    middleware = list(settings.MIDDLEWARE)
+    if _contains_subclass(f"{__name__}.SiteMiddlewareStack", middleware):
+        middleware += getattr(settings, "SITE_MIDDLEWARE", [])
+    return [
+        checks.Error(
+            f"'{class_path}' must be in MIDDLEWARE, or in SITE_MIDDLEWARE with "
+            f"'{__name__}.SiteMiddlewareStack' in MIDDLEWARE, in order to use the admin application.",
+            id=error_id,
+        )
+        for class_path, error_id in ADMIN_MIDDLEWARE.items()
+        if not _contains_subclass(class_path, middleware)
+    ]
@@ -0,0 +1,40 @@
+"""
+Slow Query Route Middleware
+
+Makes the current request visible to the slow query log, so each slow
+query is reported with the route that issued it.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from api.services import slow_query_log
+
+
+class SlowQueryRouteMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "SLOW_QUERY_LOG_ENABLED", True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = slow_query_log.set_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            slow_query_log.reset_request(token)
+
+    async def __acall__(self, request):
+        token = slow_query_log.set_request(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            slow_query_log.reset_request(token)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-19 13:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_adminlog"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="adminlog",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
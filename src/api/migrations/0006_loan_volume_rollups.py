@@ -0,0 +1,37 @@
+# Generated by Django 5.2.10 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_adminlog_created_at_default"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("source", models.CharField(max_length=50, unique=True)),
+                ("last_id", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="LoanVolumeRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("granularity", models.CharField(choices=[("day", "Day"), ("week", "Week"), ("month", "Month")], max_length=10)),
+                ("bucket_start", models.DateField()),
+                ("applications", models.IntegerField(default=0)),
+                ("approvals", models.IntegerField(default=0)),
+                ("rejections", models.IntegerField(default=0)),
+                ("requested_amount", models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("granularity", "bucket_start"), name="unique_rollup_bucket")],
+            },
+        ),
+    ]
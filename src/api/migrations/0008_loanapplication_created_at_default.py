@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-19 13:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="loanapplication",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.10 on 2026-10-19 14:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_loanapplication_created_at_default"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="loanapplication",
+            name="user",
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name="loan_applications", to=settings.AUTH_USER_MODEL),
+        ),
+    ]
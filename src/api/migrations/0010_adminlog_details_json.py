@@ -0,0 +1,110 @@
+# Generated by Django 5.2.10 on 2026-10-19 14:26
+
+import json
+
+import django.db.models.deletion
+import django.db.models.fields.json
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 10000
+
+
+def _parse(text):
+    if not text:
+        return {}
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return {"text": text}
+    return value if isinstance(value, dict) else {"value": value}
+
+
+def _copy(apps, alias, convert, source, target):
+    AdminLog = apps.get_model("api", "AdminLog")
+    entries = AdminLog.objects.using(alias)
+    last_id = 0
+    while True:
+        batch = list(entries.filter(id__gt=last_id).order_by("id").only("id", source)[:BATCH_SIZE])
+        if not batch:
+            return
+        for entry in batch:
+            setattr(entry, target, convert(getattr(entry, source)))
+        entries.bulk_update(batch, [target])
+        last_id = batch[-1].id
+
+
+def backfill_details(apps, schema_editor):
+    _copy(apps, schema_editor.connection.alias, _parse, "details", "details_json")
+
+
+def _unparse(value):
+    if not value:
+        return ""
+    if set(value) == {"text"}:
+        return value["text"]
+    return json.dumps(value)
+
+
+def restore_details(apps, schema_editor):
+    _copy(apps, schema_editor.connection.alias, _unparse, "details_json", "details")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0009_loan_user_without_db_constraint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="adminlog",
+            name="details_json",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(backfill_details, restore_details, hints={"model_name": "adminlog"}),
+        migrations.RemoveField(
+            model_name="adminlog",
+            name="details",
+        ),
+        migrations.RenameField(
+            model_name="adminlog",
+            old_name="details_json",
+            new_name="details",
+        ),
+        migrations.AddField(
+            model_name="adminlog",
+            name="reason_lower",
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(django.db.models.fields.json.KeyTextTransform("reason", "details")), output_field=models.TextField(null=True)),
+        ),
+        migrations.AlterField(
+            model_name="adminlog",
+            name="admin",
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="admin_logs", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name="adminlog",
+            index=models.Index(fields=["admin", "created_at"], name="adminlog_admin_created"),
+        ),
+        migrations.AddIndex(
+            model_name="adminlog",
+            index=models.Index(fields=["admin", "action", "created_at"], name="adminlog_admin_action_created"),
+        ),
+        migrations.AddIndex(
+            model_name="adminlog",
+            index=models.Index(fields=["action", "created_at"], name="adminlog_action_created"),
+        ),
+        migrations.AddIndex(
+            model_name="adminlog",
+            index=models.Index(fields=["target_id", "target_model", "created_at"], name="adminlog_target_created"),
+        ),
+        migrations.AddIndex(
+            model_name="adminlog",
+            index=models.Index(fields=["reason_lower", "created_at"], name="adminlog_reason_created"),
+        ),
+        migrations.AddIndex(
+            model_name="adminlog",
+            index=models.Index(fields=["created_at"], name="adminlog_created"),
+        ),
+    ]
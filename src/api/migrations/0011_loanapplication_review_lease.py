@@ -0,0 +1,29 @@
+# Generated by Django 5.2.10 on 2026-10-19 14:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_adminlog_details_json"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="loanapplication",
+            name="lease_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="loanapplication",
+            name="lease_owner",
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name="+", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name="loanapplication",
+            index=models.Index(fields=["status", "lease_expires_at", "created_at"], name="loan_review_queue"),
+        ),
+    ]
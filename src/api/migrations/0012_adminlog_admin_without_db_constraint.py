@@ -0,0 +1,20 @@
+# Generated by Django 5.2.10 on 2026-10-19 14:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_loanapplication_review_lease"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="adminlog",
+            name="admin",
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name="admin_logs", to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.10 on 2026-10-19 15:08
+
+import django.db.models.functions.text
+from django.db import IntegrityError, migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+# Case-variant duplicates listed in the error.
+REPORT_LIMIT = 20
+
+
+def check_case_variant_emails(apps, schema_editor):
+    """
+    Emails used to be unique only as typed, so ``A@x.com`` and ``a@x.com``
+    may both exist. Which account to keep is an operator decision, so stop
+    with a list of them rather than fail halfway on the constraint.
+    """
+    User = apps.get_model("api", "User")
+    users = User.objects.using(schema_editor.connection.alias)
+    duplicates = (
+        users.values(email_lower=Lower("email"))
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .order_by("email_lower")
+    )
+    total = duplicates.count()
+    if not total:
+        return
+    lines = []
+    for duplicate in duplicates[:REPORT_LIMIT]:
+        accounts = users.annotate(email_lower=Lower("email")).filter(email_lower=duplicate["email_lower"]).order_by("id")
+        lines.append("  " + ", ".join(f"{user.email} (id {user.id})" for user in accounts))
+    if total > REPORT_LIMIT:
+        lines.append(f"  ... and {total - REPORT_LIMIT} more")
+    raise IntegrityError(
+        f"{total} email addresses belong to more than one user when case is ignored:\n"
+        + "\n".join(lines)
+        + "\nEmails are now unique ignoring case. Merge or rename these accounts "
+        "(e.g. change the email of the ones not in use), then run migrate again."
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_adminlog_admin_without_db_constraint"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_case_variant_emails, migrations.RunPython.noop, hints={"model_name": "user"}),
+        migrations.AddConstraint(
+            model_name="user",
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower("email"), name="user_email_ci_unique"),
+        ),
+    ]
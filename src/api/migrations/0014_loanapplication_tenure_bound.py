@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:24
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0013_user_email_ci_unique"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="loanapplication",
+            name="tenure_months",
+            field=models.IntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(480)]),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from .user import User
 from .loan_application import LoanApplication
+from .loan_rollup import LoanVolumeRollup, RollupWatermark
+from .idempotency_key import IdempotencyKey
 
-__all__ = ["User", "LoanApplication"]
\ No newline at end of file
+__all__ = ["User", "LoanApplication", "LoanVolumeRollup", "RollupWatermark", "IdempotencyKey"]
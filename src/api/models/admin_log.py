@@ -1,13 +1,40 @@
 from django.db import models
+from django.db.models.fields.json import KT
+from django.db.models.functions import Lower
+from django.utils import timezone
 from api.models.user import User
 
 class AdminLog(models.Model):
-    admin = models.ForeignKey(User, on_delete=models.CASCADE, related_name='admin_logs')
+    # Indexed through the composite indexes below. No database constraint:
+    # AdminLog may live on the audit database, apart from its admin, so the
+    # cascade on delete is done by audit_service.on_user_deleted.
+    admin = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, related_name='admin_logs', db_index=False, db_constraint=False
+    )
     action = models.CharField(max_length=255)
     target_id = models.IntegerField()
     target_model = models.CharField(max_length=255)
-    details = models.TextField(blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    details = models.JSONField(default=dict, blank=True)
+    # Lowercased details["reason"], stored so it can be indexed and matched
+    # by prefix on every backend.
+    reason_lower = models.GeneratedField(
+        expression=Lower(KT("details__reason")),
+        output_field=models.TextField(null=True),
+        db_persist=True,
+    )
+    # Set when the entry is built (not when it is inserted) so buffered
+    # writes keep the time of the action.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["admin", "created_at"], name="adminlog_admin_created"),
+            models.Index(fields=["admin", "action", "created_at"], name="adminlog_admin_action_created"),
+            models.Index(fields=["action", "created_at"], name="adminlog_action_created"),
+            models.Index(fields=["target_id", "target_model", "created_at"], name="adminlog_target_created"),
+            models.Index(fields=["reason_lower", "created_at"], name="adminlog_reason_created"),
+            models.Index(fields=["created_at"], name="adminlog_created"),
+        ]
 
     def __str__(self):
         return f"{self.admin.email} - {self.action} - {self.target_model} {self.target_id}"
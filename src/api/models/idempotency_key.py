@@ -0,0 +1,28 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from api.models.user import User
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stored outcome of a request sent with an `Idempotency-Key` header.
+
+    While the first request is in flight the row is a short-lived claim
+    (`completed=False`); once it finishes the response is stored and kept
+    until `expires_at`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_fingerprint = models.CharField(max_length=64)
+    completed = models.BooleanField(default=False)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
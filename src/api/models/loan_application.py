@@ -1,22 +1,39 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 from api.models.user import User
 
+# Longest tenure accepted (40 years); also bounds repayment schedules.
+MAX_TENURE_MONTHS = 480
+
 class LoanStatus(models.TextChoices):
     PENDING = 'PENDING', 'Pending'
     APPROVED = 'APPROVED', 'Approved'
     REJECTED = 'REJECTED', 'Rejected'
 
 class LoanApplication(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='loan_applications')
+    # No database constraint: loans may live on a different shard than their user.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='loan_applications', db_constraint=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
-    tenure_months = models.IntegerField()
+    tenure_months = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(MAX_TENURE_MONTHS)])
     purpose = models.TextField()
     status = models.CharField(
         max_length=20,
         choices=LoanStatus.choices,
         default=LoanStatus.PENDING
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Review queue lease (see api.services.review_queue). A deleted owner's
+    # leases are left to expire.
+    lease_owner = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, null=True, blank=True, related_name='+', db_constraint=False, db_index=False
+    )
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'lease_expires_at', 'created_at'], name='loan_review_queue'),
+        ]
 
     def __str__(self):
         return f"Loan {self.id} - {self.user.email} - {self.status}"
@@ -0,0 +1,41 @@
+from django.db import models
+
+
+class RollupGranularity(models.TextChoices):
+    DAY = 'day', 'Day'
+    WEEK = 'week', 'Week'
+    MONTH = 'month', 'Month'
+
+
+class LoanVolumeRollup(models.Model):
+    """
+    Pre-aggregated loan volume for one time bucket.
+
+    Maintained incrementally by `manage.py update_loan_rollups` from
+    LoanApplication (applications, requested amount) and AdminLog
+    (approvals, rejections).
+    """
+    granularity = models.CharField(max_length=10, choices=RollupGranularity.choices)
+    bucket_start = models.DateField()
+    applications = models.IntegerField(default=0)
+    approvals = models.IntegerField(default=0)
+    rejections = models.IntegerField(default=0)
+    requested_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'bucket_start'], name='unique_rollup_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket_start}"
+
+
+class RollupWatermark(models.Model):
+    """Highest source row id already folded into the rollups."""
+    source = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} @ {self.last_id}"
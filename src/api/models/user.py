@@ -1,6 +1,8 @@
 from typing import Optional
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Lower
 
 class UserManager(BaseUserManager):
     """Manager for custom User model using email as username."""
@@ -33,6 +35,18 @@ class UserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+    def with_email(self, email: str) -> models.QuerySet:
+        """
+        Users whose email matches ``email`` ignoring case, looked up through
+        the ``user_email_ci_unique`` index.
+        """
+        # Both sides go through the database's LOWER() so they fold case the
+        # same way the index does.
+        return self.alias(email_lower=Lower("email")).filter(email_lower=Lower(Value(email)))
+
+    def get_by_natural_key(self, username: str) -> "User":
+        return self.with_email(username).get()
+
     def create_superuser(
         self, 
         email: str, 
@@ -82,6 +96,13 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD: str = "email"
     REQUIRED_FIELDS: list[str] = []
 
+    class Meta:
+        constraints = [
+            # Emails are unique ignoring case; also the index behind
+            # ``User.objects.with_email``.
+            models.UniqueConstraint(Lower("email"), name="user_email_ci_unique"),
+        ]
+
     def __str__(self) -> str:
         """Return string representation of user."""
         return self.email
@@ -0,0 +1,11 @@
+from ninja.renderers import JSONRenderer
+
+from api.services.tracing import traced
+
+
+class TracedJSONRenderer(JSONRenderer):
+    """JSON renderer that records response serialization as a span."""
+
+    @traced("ninja.render")
+    def render(self, request, data, *, response_status):
+        return super().render(request, data, response_status=response_status)
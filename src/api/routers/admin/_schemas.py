@@ -1,18 +1,73 @@
 from ninja import Schema
 from pydantic import Field
-from typing import Optional, List
-from datetime import datetime
-from api.routers.loans._schemas import LoanApplicationResponse
+from typing import Any, Dict, Optional, List
+from datetime import date, datetime
+from api.routers.loans._schemas import LoanApplicationResponse, ScheduleRow
 
 class LoanStatusUpdate(Schema):
     status: str = Field(..., pattern="^(APPROVED|REJECTED)$", description="New status for the loan")
     reason: Optional[str] = Field(None, description="Reason for the status change")
 
+class QueuedLoanResponse(LoanApplicationResponse):
+    lease_expires_at: datetime
+
+class LeaseResponse(Schema):
+    loan_id: int
+    lease_expires_at: Optional[datetime] = None
+
 class AdminLogResponse(Schema):
     id: int
     admin_id: int
     action: str
     target_id: int
     target_model: str
-    details: Optional[str]
+    details: Dict[str, Any]
+    created_at: datetime
+
+class AuditMetricsResponse(Schema):
+    mode: str
+    buffer_depth: int
+    buffer_size: int
+    flush_interval_seconds: float
+    flushes: int
+    failed_flushes: int
+    max_buffer: int
+    spilled_entries: int
+    dropped_entries: int
+    entries_written: int
+    last_flush_ms: float
+    max_flush_ms: float
+    avg_flush_ms: float
+
+class PortfolioScheduleResponse(Schema):
+    status: str
+    annual_rate: float
+    loan_count: int
+    total_principal: float
+    total_interest: float
+    total_payable: float
+    monthly_installments_total: float
+    schedule: List[ScheduleRow]
+
+class TimeseriesPoint(Schema):
+    bucket_start: date
+    applications: int
+    approvals: int
+    rejections: int
+    requested_amount: float
+
+class TimeseriesResponse(Schema):
+    granularity: str
+    points: List[TimeseriesPoint]
+
+class ProfileCaptureResponse(Schema):
+    id: str
+    method: str
+    route: str
+    path: str
+    status_code: int
+    trigger: str
+    duration_ms: float
+    samples: int
+    files: Dict[str, str]
     created_at: datetime
@@ -1,69 +1,240 @@
-import json
-from ninja import Router
+import heapq
+from ninja import Router, Query
 from ninja.errors import HttpError
-from typing import List
+from datetime import date, datetime, timezone as dt_timezone
+from typing import List, Optional
 from django.db import transaction
-from api.models.loan_application import LoanApplication, LoanStatus
+from django.http import FileResponse
+from django.utils import timezone
+from api.models.loan_application import LoanStatus
 from api.models.admin_log import AdminLog
-from api.models.user import User
-from api.services.auth_service import AuthBearer
-from ._schemas import LoanStatusUpdate, AdminLogResponse
+from ._schemas import (
+    LoanStatusUpdate, AdminLogResponse, AuditMetricsResponse, PortfolioScheduleResponse, TimeseriesResponse,
+    ProfileCaptureResponse, QueuedLoanResponse, LeaseResponse,
+)
 from api.routers.loans._schemas import LoanApplicationResponse
+from api import sparse_fields
 from api.services.auth_service import AdminAuth
-from api.services.email_service import send_loan_approval_email
+from api.services.audit_service import AdminLogFilter, get_audit_writer
+from api.services.loan_state import transition_loan
+from api.services.audit_archive import AdminLogArchive
+from api.services import loan_rollups, loan_shards, profiler, review_queue
 router = Router(tags=["Admin"])
 
 
 @router.get("/loans", response=List[LoanApplicationResponse], auth=AdminAuth(), summary="List all loan applications")
-def list_all_loans(request):
+def list_all_loans(request, fields: Optional[str] = sparse_fields.fields_query()):
     """
     List all loan applications (Admin only).
+    With ?fields=, only those fields are read and returned.
     """
-    return LoanApplication.objects.all().order_by('-created_at')
+    selected = sparse_fields.parse_fields(LoanApplicationResponse, fields)
+    if selected is None:
+        return loan_shards.merge_ordered(
+            loan_shards.scatter(lambda loans: loans.order_by('-created_at')),
+            key=lambda loan: loan.created_at,
+            reverse=True,
+        )
+    # created_at is read either way: the shards are merged by it.
+    rows = loan_shards.merge_ordered(
+        loan_shards.scatter(lambda loans: loans.order_by('-created_at').values(*selected, 'created_at')),
+        key=lambda row: row['created_at'],
+        reverse=True,
+    )
+    return sparse_fields.render(request, LoanApplicationResponse, selected, rows)
+
+
+@router.get("/loans/portfolio", response=PortfolioScheduleResponse, auth=AdminAuth(), summary="Portfolio repayment schedule")
+def portfolio_schedule(
+    request,
+    status: LoanStatus = LoanStatus.PENDING,
+    annual_rate: Optional[float] = Query(None, ge=0, le=1, description="Nominal annual rate, e.g. 0.18 for 18%"),
+):
+    """
+    Aggregate repayment schedule of all loans with the given status,
+    computed in one vectorized pass over the queryset.
+    """
+    import numpy as np
+    from api.services import loan_math
+
+    rows = [
+        row
+        for loans in loan_shards.scatter(lambda loans: loans.filter(status=status))
+        for row in loans.values_list("amount", "tenure_months")
+    ]
+    data = np.array(rows, dtype=np.float64).reshape(-1, 2)
+    rate = loan_math.get_annual_rate() if annual_rate is None else annual_rate
+    return {
+        "status": status,
+        "annual_rate": rate,
+        **loan_math.portfolio_schedule(data[:, 0], data[:, 1].astype(np.int64), rate),
+    }
+
+
+@router.get("/loans/timeseries", response=TimeseriesResponse, auth=AdminAuth(), summary="Loan volume time series")
+def loan_timeseries(
+    request,
+    granularity: str = Query("auto", pattern="^(auto|day|week|month)$"),
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    max_points: int = Query(400, gt=0),
+):
+    """
+    Daily, weekly or monthly applications, approvals, rejections and
+    requested amount, read from the pre-aggregated rollups only.
+    With granularity=auto the finest granularity that keeps the range
+    within max_points buckets is used.
+    """
+    if granularity == "auto":
+        granularity = loan_rollups.pick_granularity(start, end, max_points)
+    return {
+        "granularity": granularity,
+        "points": loan_rollups.query_timeseries(granularity, start, end),
+    }
 
 
 @router.put("/loans/{loan_id}/status", response=LoanApplicationResponse, auth=AdminAuth(), summary="Approve or Reject a loan")
 def update_loan_status(request, loan_id: int, payload: LoanStatusUpdate):
     """
     Approve or Reject a loan application.
+    The status is changed with a single conditional UPDATE, so only one
+    of several concurrent admins can decide a loan. A loan another admin
+    holds a review lease on is refused with 409; deciding a loan ends
+    its lease.
     This action is logged in AdminLog.
-    If Approved, an email is sent to the user.
-    """
-    with transaction.atomic():
-        try:
-            loan = LoanApplication.objects.get(id=loan_id)
-        except LoanApplication.DoesNotExist:
-            raise HttpError(404, "Loan not found")
-            
-        if loan.status != LoanStatus.PENDING:
-            raise HttpError(400, f"Loan is already {loan.status}")
-            
-        loan.status = payload.status
-        loan.save()
-        
-        # Send Email if Approved
-        if payload.status == LoanStatus.APPROVED:
-            send_loan_approval_email(
-                user_email=loan.user.email,
-                user_name=loan.user.full_name,
-                amount=loan.amount,
-                tenure=loan.tenure_months
-            )
-        
-        # Audit Log
-        AdminLog.objects.create(
-            admin=request.auth,
-            action=f"{payload.status}_LOAN",
-            target_id=loan.id,
-            target_model="LoanApplication",
-            details=json.dumps({"reason": payload.reason}) if payload.reason else ""
-        )
-        
-        return loan
+    If Approved, an email is sent to the user once the change commits.
+    """
+    # The loan's shard commits first, then the audit log on the directory database.
+    shard = loan_shards.shard_for_loan(loan_id) or loan_shards.DIRECTORY_DATABASE
+    with transaction.atomic(), transaction.atomic(using=shard):
+        result = transition_loan(loan_id, payload.status, actor=request.auth, reason=payload.reason)
+
+    if result.not_found:
+        raise HttpError(404, "Loan not found")
+    if result.leased_by is not None:
+        raise HttpError(409, "Loan is under review by another admin")
+    if not result.applied:
+        raise HttpError(400, f"Loan is already {result.current_status}")
+
+    return loan_shards.loan_queryset(loan_id).get()
+
+@router.post("/queue/claim", response=List[QueuedLoanResponse], auth=AdminAuth(), summary="Claim pending loans to review")
+def claim_review_queue(
+    request,
+    n: int = Query(10, ge=1, le=100),
+    lease_seconds: Optional[int] = Query(None, ge=1, le=86400),
+):
+    """
+    Lease the next n oldest pending loans to the calling admin for
+    lease_seconds (REVIEW_LEASE_SECONDS by default). Leased loans are not
+    handed to other admins until the lease is released or expires.
+    """
+    return review_queue.claim(request.auth, n, lease_seconds)
+
+
+@router.post("/queue/{loan_id}/renew", response=LeaseResponse, auth=AdminAuth(), summary="Renew a review lease")
+def renew_review_lease(request, loan_id: int, lease_seconds: Optional[int] = Query(None, ge=1, le=86400)):
+    """
+    Extend the calling admin's lease on a loan they are still reviewing.
+    """
+    result = review_queue.renew(loan_id, request.auth, lease_seconds)
+    if not result.applied:
+        raise HttpError(409, "Loan is not leased to you")
+    return result
+
+
+@router.post("/queue/{loan_id}/release", response=LeaseResponse, auth=AdminAuth(), summary="Release a review lease")
+def release_review_lease(request, loan_id: int):
+    """
+    Return a loan leased by the calling admin to the queue.
+    """
+    result = review_queue.release(loan_id, request.auth)
+    if not result.applied:
+        raise HttpError(409, "Loan is not leased to you")
+    return result
+
 
 @router.get("/logs", response=List[AdminLogResponse], auth=AdminAuth(), summary="View admin logs")
-def list_admin_logs(request):
+def list_admin_logs(
+    request,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    admin_id: Optional[int] = None,
+    action: Optional[str] = None,
+    target_model: Optional[str] = None,
+    target_id: Optional[int] = None,
+    reason: Optional[str] = Query(None, min_length=1, description="Case-insensitive prefix of details.reason"),
+    fields: Optional[str] = sparse_fields.fields_query(),
+):
+    """
+    View audit logs of admin actions, optionally filtered by admin, action,
+    target, date range and reason. When the range starts at or before the
+    newest archived entry, archived entries are read from the archive and
+    merged in. With ?fields=, only those fields are read and returned.
+    """
+    selected = sparse_fields.parse_fields(AdminLogResponse, fields)
+    filters = AdminLogFilter(
+        admin_id=admin_id,
+        action=action,
+        target_model=target_model,
+        target_id=target_id,
+        reason=reason,
+        start=_aware(start),
+        end=_aware(end),
+    )
+    logs = filters.apply(AdminLog.objects.all()).order_by('-created_at')
+    if selected is not None:
+        logs = logs.values(*selected, 'created_at')
+
+    if filters.start:
+        archive = AdminLogArchive()
+        # Based on what was actually archived, whatever --older-than-days was used.
+        newest_archived = archive.newest_created_at()
+        if newest_archived is not None and filters.start <= newest_archived:
+            archived = (
+                row for row in archive.query(filters.start, filters.end, newest_first=True) if filters.matches(row)
+            )
+            logs = list(heapq.merge(logs.iterator(), archived, key=_created_at, reverse=True))
+
+    if selected is None:
+        return logs
+    return sparse_fields.render(request, AdminLogResponse, selected, logs)
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and timezone.is_naive(value):
+        return timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def _created_at(entry):
+    return entry["created_at"] if isinstance(entry, dict) else entry.created_at
+
+
+@router.get("/logs/metrics", response=AuditMetricsResponse, auth=AdminAuth(), summary="Audit log writer metrics")
+def audit_log_metrics(request):
+    """
+    Buffer depth and flush latency of the audit log writer.
+    """
+    return get_audit_writer().metrics()
+
+
+@router.get("/profiles", response=List[ProfileCaptureResponse], auth=AdminAuth(), summary="Recent request profiles")
+def list_profiles(request, limit: int = Query(20, ge=1, le=200)):
+    """
+    Recent profiled requests, newest first. Send the ``X-Profile`` header
+    with an admin token to profile a request.
+    """
+    return profiler.get_spool().list(limit)
+
+
+@router.get("/profiles/{capture_id}/{kind}", auth=AdminAuth(), summary="Download a request profile")
+def download_profile(request, capture_id: str, kind: str):
     """
-    View audit logs of admin actions.
+    Download a capture's ``pstats`` (cProfile) or ``collapsed`` (sampled
+    stacks) file.
     """
-    return AdminLog.objects.all().order_by('-created_at')
+    path = profiler.get_spool().file(capture_id, kind)
+    if path is None:
+        raise HttpError(404, "Profile not found")
+    return FileResponse(path.open("rb"), as_attachment=True, filename=path.name)
@@ -1,3 +1,4 @@
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, EmailStr, Field, constr
 
 Username = constr(min_length=3, max_length=50)
@@ -23,3 +24,22 @@ class UserResponse(BaseModel):
     id: int
     email: EmailStr
     full_name: str
+
+class IntrospectRequest(BaseModel):
+    tokens: List[str] = Field(..., min_length=1, max_length=500, description="Access tokens to check")
+
+class IntrospectedUser(BaseModel):
+    id: int
+    email: str
+    is_active: bool
+    is_staff: bool
+    is_admin: bool
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    claims: Optional[Dict[str, Any]] = None
+    user: Optional[IntrospectedUser] = None
+    error: Optional[str] = None
+
+class IntrospectResponse(BaseModel):
+    results: List[TokenIntrospection]
@@ -1,10 +1,14 @@
 from ninja.errors import HttpError
 from ._api  import router
-from ._schemas import Register, LoginRequest, TokenResponse, RefreshTokenRequest, UserResponse
+from ._schemas import (
+    Register, LoginRequest, TokenResponse, RefreshTokenRequest, UserResponse, IntrospectRequest, IntrospectResponse
+)
+from django.db import IntegrityError, transaction
 from django.http import HttpRequest
+from api.db_errors import is_unique_violation
 from api.models.user import User
-from api.services import JWTService
-from api.services.auth_service import AuthBearer
+from api.services import JWTService, read_replicas
+from api.services.auth_service import AuthBearer, ServiceKeyAuth, introspect_tokens
 
 @router.get("/me",
     summary="Get current user",
@@ -15,6 +19,15 @@ from api.services.auth_service import AuthBearer
 def get_me(request):
     return request.auth.to_dict
 
+@router.post("/introspect",
+    summary="Introspect access tokens",
+    description="Check up to 500 access tokens at once (internal services, authenticated with X-Service-Key).",
+    response=IntrospectResponse,
+    auth=ServiceKeyAuth()
+    )
+def introspect(request, introspect_request: IntrospectRequest):
+    return {"results": introspect_tokens(introspect_request.tokens)}
+
 @router.post("/login",
     summary="Login a user",
     description="Login a user with email and password.",
@@ -22,7 +35,7 @@ def get_me(request):
     )
 def login(request, login_data: LoginRequest):
     try:
-        user = User.objects.get(email=login_data.email)
+        user = User.objects.with_email(login_data.email).get()
     except User.DoesNotExist:
         raise HttpError(401, "Invalid email or password")
     
@@ -54,18 +67,25 @@ def refresh_token(request, refresh_data: RefreshTokenRequest):
 
 @router.post("/register",
     summary="Register a new user",
-    description="Register a new user with email, full_name, and password.",
+    description="Register a new user with email, full_name, and password. Emails are unique ignoring case (409 if taken).",
     )
 def register(request : HttpRequest,register_request: Register):
     """Register a new user."""
-    if User.objects.filter(email=register_request.email).exists():
-        return {"message": "User with this email already exists."}
-
-    User.objects.create_user(
-        email=register_request.email,
-        password=register_request.password,
-        full_name=register_request.full_name
-    )
+    # One INSERT: the case-insensitive unique index rejects a taken email,
+    # including one registered concurrently.
+    try:
+        with transaction.atomic():
+            user = User.objects.create_user(
+                email=register_request.email,
+                password=register_request.password,
+                full_name=register_request.full_name
+            )
+    except IntegrityError as e:
+        # Only a taken email is a conflict; any other constraint failing is a bug.
+        if is_unique_violation(e, User, "user_email_ci_unique") or is_unique_violation(e, User, fields=("email",)):
+            raise HttpError(409, "User with this email already exists.")
+        raise
+    # The new account must be readable before it reaches the replicas.
+    read_replicas.mark_written(user.id)
 
     return {"message": "Register successful"}
-
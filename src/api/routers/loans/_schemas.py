@@ -1,10 +1,12 @@
 from ninja import Schema
 from pydantic import Field
 from datetime import datetime
+from typing import List
+from api.models.loan_application import MAX_TENURE_MONTHS
 
 class LoanApplicationCreate(Schema):
     amount: float = Field(..., gt=0, description="Loan amount requested")
-    tenure_months: int = Field(..., gt=0, description="Tenure in months")
+    tenure_months: int = Field(..., gt=0, le=MAX_TENURE_MONTHS, description="Tenure in months")
     purpose: str = Field(..., min_length=5, description="Purpose of the loan")
 
 class LoanApplicationResponse(Schema):
@@ -15,3 +17,21 @@ class LoanApplicationResponse(Schema):
     purpose: str
     status: str
     created_at: datetime
+
+class ScheduleRow(Schema):
+    month: int
+    payment: float
+    principal: float
+    interest: float
+    balance: float
+
+class LoanScheduleResponse(Schema):
+    loan_id: int
+    amount: float
+    tenure_months: int
+    annual_rate: float
+    monthly_installment: float
+    total_interest: float
+    total_payable: float
+    required_monthly_income: float
+    schedule: List[ScheduleRow]
@@ -1,36 +1,110 @@
-from ninja import Router
-from typing import List
+from ninja import Router, Header, Query
+from ninja.errors import HttpError
+from typing import List, Optional
+from django.conf import settings
+from django.http import HttpResponse
+from api import sparse_fields
 from api.models.loan_application import LoanApplication
 from api.services.auth_service import AuthBearer
-from ._schemas import LoanApplicationCreate, LoanApplicationResponse
+from api.services import loan_shards
+from api.services.idempotency import IdempotencyError, run_idempotent
+from api.services.loan_write_coalescer import get_loan_write_coalescer
+from ._schemas import LoanApplicationCreate, LoanApplicationResponse, LoanScheduleResponse
 
 router = Router(tags=["Loans"])
 
+# Loans are reached through request.auth.loan_applications, which lets the
+# shard router send each query to the user's shard.
+
 @router.post("/", response=LoanApplicationResponse, auth=AuthBearer(), summary="Create a loan application")
-def create_loan_application(request, payload: LoanApplicationCreate):
+def create_loan_application(
+    request,
+    payload: LoanApplicationCreate,
+    response: HttpResponse,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+):
     """
     Create a new loan application.
     The default status will be PENDING.
+    With an Idempotency-Key header, retries of the same request return the
+    stored response instead of creating another application.
     """
-    loan = LoanApplication.objects.create(
-        user=request.auth,
-        amount=payload.amount,
-        tenure_months=payload.tenure_months,
-        purpose=payload.purpose
-    )
-    return loan
+    def create():
+        fields = {"amount": payload.amount, "tenure_months": payload.tenure_months, "purpose": payload.purpose}
+        if getattr(settings, "LOAN_WRITE_COALESCING", False):
+            return get_loan_write_coalescer().create(request.auth, **fields)
+        return request.auth.loan_applications.create(**fields)
+
+    if not idempotency_key:
+        return create()
+
+    try:
+        body, replayed = run_idempotent(
+            request.auth,
+            idempotency_key,
+            payload.model_dump(),
+            lambda: LoanApplicationResponse.from_orm(create()).model_dump(),
+            using=loan_shards.shard_for_user(request.auth.id),
+        )
+    except IdempotencyError as e:
+        raise HttpError(e.status_code, str(e))
+    if replayed:
+        response["Idempotent-Replayed"] = "true"
+    return body
 
 @router.get("/", response=List[LoanApplicationResponse], auth=AuthBearer(), summary="List my loan applications")
-def list_loan_applications(request):
+def list_loan_applications(request, fields: Optional[str] = sparse_fields.fields_query()):
     """
     List all loan applications for the authenticated user.
+    With ?fields=, only those fields are read and returned.
     """
-    return LoanApplication.objects.filter(user=request.auth).all()
+    selected = sparse_fields.parse_fields(LoanApplicationResponse, fields)
+    loans = request.auth.loan_applications.all()
+    if selected is None:
+        return loans
+    return sparse_fields.render(request, LoanApplicationResponse, selected, loans.values(*selected))
 
 @router.get("/{loan_id}", response=LoanApplicationResponse, auth=AuthBearer(), summary="Get loan application details")
-def get_loan_application(request, loan_id: int):
+def get_loan_application(request, loan_id: int, fields: Optional[str] = sparse_fields.fields_query()):
     """
     Get details of a specific loan application.
     Only the owner can view it.
+    With ?fields=, only those fields are read and returned.
+    """
+    selected = sparse_fields.parse_fields(LoanApplicationResponse, fields)
+    if selected is None:
+        return _own_loan(request.auth.loan_applications, loan_id)
+    loan = _own_loan(request.auth.loan_applications.values(*selected), loan_id)
+    return sparse_fields.render(request, LoanApplicationResponse, selected, loan, many=False)
+
+@router.get("/{loan_id}/schedule", response=LoanScheduleResponse, auth=AuthBearer(), summary="Get loan repayment schedule")
+def get_loan_schedule(
+    request,
+    loan_id: int,
+    annual_rate: Optional[float] = Query(None, ge=0, le=1, description="Nominal annual rate, e.g. 0.18 for 18%"),
+):
     """
-    return LoanApplication.objects.get(id=loan_id, user=request.auth)
+    Monthly installment, total interest and the full amortization schedule
+    of a loan application. Only the owner can view it.
+    """
+    # Imported here so NumPy is only loaded by workers that serve this route.
+    from api.services import loan_math
+
+    loan = _own_loan(request.auth.loan_applications, loan_id)
+    rate = loan_math.get_annual_rate() if annual_rate is None else annual_rate
+    return {
+        "loan_id": loan.id,
+        "amount": loan.amount,
+        "tenure_months": loan.tenure_months,
+        "annual_rate": rate,
+        **loan_math.loan_summary(loan.amount, loan.tenure_months, rate),
+        "schedule": loan_math.amortization_schedule(loan.amount, loan.tenure_months, rate),
+    }
+
+
+def _own_loan(loans, loan_id: int):
+    # Missing and other users' loans look the same to the caller.
+    try:
+        return loans.get(id=loan_id)
+    except LoanApplication.DoesNotExist:
+        raise HttpError(404, "Loan not found")
@@ -0,0 +1,261 @@
+"""
+Audit Log Archive
+
+Moves old AdminLog rows out of the hot table into gzip-compressed JSONL
+files partitioned by day, and reads them back by date range.
+
+Layout under ``AUDIT_ARCHIVE_DIR``::
+
+    2026/01/30/part-000000000001-000000005000.jsonl.gz
+    2026/01/30/part-000000000001-000000005000.idx.json
+    _progress.json
+
+Each part file has a small ``.idx.json`` sidecar (row count, id and
+created_at bounds) so range queries can skip files without opening them.
+``_progress.json`` records the state of an unfinished archive run so it can
+be resumed after a crash without duplicating or losing rows.
+"""
+
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from api.models.admin_log import AdminLog
+from api.services.audit_service import audit_database
+
+ARCHIVE_FIELDS = ["id", "admin_id", "action", "target_id", "target_model", "details", "created_at"]
+PROGRESS_FILE = "_progress.json"
+
+
+def _get_archive_dir() -> Path:
+    return Path(getattr(settings, "AUDIT_ARCHIVE_DIR", Path(settings.BASE_DIR) / "archive" / "admin_logs"))
+
+
+def _details(value) -> Dict:
+    # Parts archived before details became a JSONField hold it as JSON text.
+    if isinstance(value, dict):
+        return value
+    if not value:
+        return {}
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return {"text": value}
+    return parsed if isinstance(parsed, dict) else {"value": parsed}
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+class AdminLogArchive:
+    """Date-partitioned, compressed store of archived AdminLog rows."""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root) if root is not None else _get_archive_dir()
+
+    def _day_dir(self, day: date) -> Path:
+        return self.root / f"{day:%Y}" / f"{day:%m}" / f"{day:%d}"
+
+    def write_partition(self, day: date, rows: List[Dict]) -> Path:
+        """
+        Write rows for a single day to a part file named after their id range.
+
+        The name is deterministic, so rewriting the same chunk after a crash
+        replaces the earlier file instead of duplicating it.
+        """
+        day_dir = self._day_dir(day)
+        day_dir.mkdir(parents=True, exist_ok=True)
+        first_id, last_id = rows[0]["id"], rows[-1]["id"]
+        stem = f"part-{first_id:012d}-{last_id:012d}"
+
+        lines = "".join(json.dumps(row, default=str) + "\n" for row in rows)
+        part_path = day_dir / f"{stem}.jsonl.gz"
+        _write_atomic(part_path, gzip.compress(lines.encode("utf-8")))
+
+        index = {
+            "count": len(rows),
+            "min_id": first_id,
+            "max_id": last_id,
+            "min_created_at": min(row["created_at"] for row in rows),
+            "max_created_at": max(row["created_at"] for row in rows),
+            "bytes": part_path.stat().st_size,
+        }
+        _write_atomic(day_dir / f"{stem}.idx.json", json.dumps(index).encode("utf-8"))
+        return part_path
+
+    def _days(self, start: Optional[date], end: Optional[date], reverse: bool = False) -> Iterator[Path]:
+        if not self.root.exists():
+            return
+        for year_dir in sorted((p for p in self.root.iterdir() if p.is_dir() and p.name.isdigit()), reverse=reverse):
+            year = int(year_dir.name)
+            if (start and year < start.year) or (end and year > end.year):
+                continue
+            for month_dir in sorted((p for p in year_dir.iterdir() if p.is_dir()), reverse=reverse):
+                for day_dir in sorted((p for p in month_dir.iterdir() if p.is_dir()), reverse=reverse):
+                    day = date(year, int(month_dir.name), int(day_dir.name))
+                    if (start and day < start) or (end and day > end):
+                        continue
+                    yield day_dir
+
+    def partitions(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None, newest_first: bool = False
+    ) -> Iterator[Dict]:
+        """
+        Yield index entries of part files that may hold rows in [start, end],
+        day by day.
+        """
+        start_day = start.astimezone(dt_timezone.utc).date() if start else None
+        end_day = end.astimezone(dt_timezone.utc).date() if end else None
+        for day_dir in self._days(start_day, end_day, reverse=newest_first):
+            for idx_path in sorted(day_dir.glob("*.idx.json")):
+                index = json.loads(idx_path.read_text())
+                if start and datetime.fromisoformat(index["max_created_at"]) < start:
+                    continue
+                if end and datetime.fromisoformat(index["min_created_at"]) > end:
+                    continue
+                index["path"] = str(idx_path.with_name(idx_path.name.replace(".idx.json", ".jsonl.gz")))
+                index["day"] = day_dir
+                yield index
+
+    def newest_created_at(self) -> Optional[datetime]:
+        """created_at of the newest archived row, or None if nothing is archived."""
+        for day_dir in self._days(None, None, reverse=True):
+            newest = [
+                datetime.fromisoformat(json.loads(idx_path.read_text())["max_created_at"])
+                for idx_path in day_dir.glob("*.idx.json")
+            ]
+            if newest:
+                return max(newest)
+        return None
+
+    def _rows(self, index: Dict, start: Optional[datetime], end: Optional[datetime]) -> Iterator[Dict]:
+        with gzip.open(index["path"], "rt", encoding="utf-8") as fh:
+            for line in fh:
+                row = json.loads(line)
+                row["created_at"] = datetime.fromisoformat(row["created_at"])
+                row["details"] = _details(row.get("details"))
+                if start and row["created_at"] < start:
+                    continue
+                if end and row["created_at"] > end:
+                    continue
+                yield row
+
+    def query(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None, newest_first: bool = False
+    ) -> Iterator[Dict]:
+        """
+        Yield archived rows with ``start <= created_at <= end``: in id order
+        within each day, oldest day first, or with ``newest_first`` strictly
+        by descending created_at (one day is held in memory at a time).
+        """
+        if not newest_first:
+            for index in self.partitions(start, end):
+                yield from self._rows(index, start, end)
+            return
+        day_dir, day_rows = None, []
+        for index in self.partitions(start, end, newest_first=True):
+            if index["day"] != day_dir:
+                yield from sorted(day_rows, key=lambda row: row["created_at"], reverse=True)
+                day_dir, day_rows = index["day"], []
+            day_rows.extend(self._rows(index, start, end))
+        yield from sorted(day_rows, key=lambda row: row["created_at"], reverse=True)
+
+    def load_progress(self) -> Optional[Dict]:
+        path = self.root / PROGRESS_FILE
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def save_progress(self, progress: Optional[Dict]) -> None:
+        path = self.root / PROGRESS_FILE
+        if progress is None:
+            path.unlink(missing_ok=True)
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        _write_atomic(path, json.dumps(progress).encode("utf-8"))
+
+
+def _delete_chunk(progress: Dict) -> int:
+    pending = progress["pending"]
+    with transaction.atomic(using=audit_database()):
+        deleted, _ = AdminLog.objects.filter(
+            id__gte=pending["first_id"],
+            id__lte=pending["last_id"],
+            created_at__lt=datetime.fromisoformat(progress["cutoff"]),
+        ).delete()
+    return deleted
+
+
+def archive_admin_logs(
+    older_than_days: int,
+    chunk_size: int = 5000,
+    archive: Optional[AdminLogArchive] = None,
+) -> Dict[str, int]:
+    """
+    Move AdminLog rows older than ``older_than_days`` into the archive.
+
+    Rows are processed ``chunk_size`` at a time in id order. For each chunk
+    the part files are written first, then the chunk is recorded as pending,
+    then the rows are deleted. An interrupted run is resumed with the
+    original cutoff and chunk size on the next call.
+
+    Returns:
+        dict: Counts of archived rows, deleted rows and chunks.
+    """
+    archive = archive or AdminLogArchive()
+    progress = archive.load_progress()
+    stats = {"archived": 0, "deleted": 0, "chunks": 0, "resumed": int(progress is not None)}
+
+    if progress is None:
+        cutoff = timezone.now() - timedelta(days=older_than_days)
+        progress = {"cutoff": cutoff.isoformat(), "chunk_size": chunk_size, "last_id": 0, "pending": None}
+        archive.save_progress(progress)
+    elif progress["pending"]:
+        stats["deleted"] += _delete_chunk(progress)
+        progress["last_id"], progress["pending"] = progress["pending"]["last_id"], None
+        archive.save_progress(progress)
+
+    cutoff = datetime.fromisoformat(progress["cutoff"])
+    chunk_size = progress["chunk_size"]
+
+    while True:
+        rows = list(
+            AdminLog.objects.filter(created_at__lt=cutoff, id__gt=progress["last_id"])
+            .order_by("id")
+            .values(*ARCHIVE_FIELDS)[:chunk_size]
+        )
+        if not rows:
+            break
+
+        by_day: Dict[date, List[Dict]] = {}
+        for row in rows:
+            row["created_at"] = row["created_at"].astimezone(dt_timezone.utc).isoformat()
+            by_day.setdefault(date.fromisoformat(row["created_at"][:10]), []).append(row)
+        for day, day_rows in by_day.items():
+            archive.write_partition(day, day_rows)
+
+        progress["pending"] = {"first_id": rows[0]["id"], "last_id": rows[-1]["id"]}
+        archive.save_progress(progress)
+
+        stats["deleted"] += _delete_chunk(progress)
+        progress["last_id"], progress["pending"] = rows[-1]["id"], None
+        archive.save_progress(progress)
+
+        stats["archived"] += len(rows)
+        stats["chunks"] += 1
+
+    archive.save_progress(None)
+    return stats
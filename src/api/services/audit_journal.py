@@ -0,0 +1,203 @@
+"""
+Audit Journal
+
+Recovery journal for AdminLog entries written after the audited change has
+committed (``AUDIT_LOG_MODE = "after-commit"``, the default with a separate
+audit database). Once the change commits, the entry is appended to the
+journal and fsynced, then inserted into the audit database, then marked
+done. If the insert fails or the process dies before it, the entry stays
+pending in the journal; ``manage.py recover_audit_journal`` inserts pending
+entries older than ``AUDIT_JOURNAL_GRACE_SECONDS`` (so entries other
+processes are still writing are left alone), skipping any that did reach
+the audit database.
+
+The journal is a JSON-lines file shared by all worker processes: appends
+and compaction hold an exclusive ``flock``, and compaction rewrites the
+file in place, so open descriptors in other processes stay valid. Without
+``fcntl`` (Windows) only the threads of one process are kept apart, so run
+a single worker process there.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import router, transaction
+
+from api.models.admin_log import AdminLog
+
+try:
+    import fcntl
+except ImportError:  # Windows: threads of one process are still safe.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Compact the journal when it grows past this size (or twice its size after
+# the last compaction).
+COMPACT_BYTES = 1 << 20
+
+
+class AuditJournal:
+    """Append-only journal of AdminLog entries not yet known to be written."""
+
+    def __init__(self, path, grace_seconds: float = 60.0):
+        self.path = Path(path)
+        self.grace_seconds = grace_seconds
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._compact_at = COMPACT_BYTES
+
+    def _open(self) -> int:
+        if self._fd is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    @contextmanager
+    def _locked(self):
+        """Hold the thread lock and the journal's file lock; yields the descriptor."""
+        with self._lock:
+            fd = self._open()
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield fd
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _append(self, records: List[Dict], sync: bool) -> int:
+        data = b"".join((json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8") for record in records)
+        with self._locked() as fd:
+            os.write(fd, data)
+            if sync:
+                os.fsync(fd)
+            return os.fstat(fd).st_size
+
+    @staticmethod
+    def _record(entry: AdminLog) -> Dict:
+        return {
+            "key": uuid.uuid4().hex,
+            "at": time.time(),
+            "entry": {
+                "admin_id": entry.admin_id,
+                "action": entry.action,
+                "target_model": entry.target_model,
+                "target_id": entry.target_id,
+                "details": entry.details,
+                "created_at": entry.created_at.isoformat(),
+            },
+        }
+
+    def append(self, entry: AdminLog) -> str:
+        """Durably record an entry about to be written. Returns its journal key."""
+        record = self._record(entry)
+        self._append([record], sync=True)
+        return record["key"]
+
+    def append_many(self, entries: List[AdminLog]) -> List[str]:
+        """Durably record several entries with one write and one fsync."""
+        records = [self._record(entry) for entry in entries]
+        if records:
+            self._append(records, sync=True)
+        return [record["key"] for record in records]
+
+    def mark_done(self, *keys: str) -> None:
+        """Record that entries reached the audit database, with one write."""
+        # Not fsynced: a lost marker only makes recovery check the entry again.
+        if keys and self._append([{"done": key} for key in keys], sync=False) > self._compact_at:
+            self.compact()
+
+    def _read(self, fd: int) -> Dict[str, Dict]:
+        os.lseek(fd, 0, os.SEEK_SET)
+        data = b""
+        while chunk := os.read(fd, 1 << 16):
+            data += chunk
+        pending: Dict[str, Dict] = {}
+        for line in data.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn write from a crash
+            if "done" in record:
+                pending.pop(record["done"], None)
+            else:
+                pending[record["key"]] = record
+        return pending
+
+    def pending(self) -> List[Dict]:
+        """Journaled entries not marked done, oldest first."""
+        if not self.path.exists():
+            return []
+        with self._locked() as fd:
+            return sorted(self._read(fd).values(), key=lambda record: record["at"])
+
+    def compact(self) -> int:
+        """Drop finished entries from the journal. Returns the entries kept."""
+        with self._locked() as fd:
+            pending = self._read(fd)
+            os.ftruncate(fd, 0)
+            if pending:
+                os.write(fd, b"".join(
+                    (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+                    for record in sorted(pending.values(), key=lambda record: record["at"])
+                ))
+            os.fsync(fd)
+            # Entries still pending (e.g. the audit database is down) are
+            # not re-read on every append.
+            self._compact_at = max(COMPACT_BYTES, 2 * os.fstat(fd).st_size)
+            return len(pending)
+
+    def recover(self) -> Dict[str, int]:
+        """
+        Write pending entries older than the grace period to the audit
+        database, unless they are already there.
+
+        Returns:
+            dict: Counts of entries written, already present, failed and
+                left for later (too recent).
+        """
+        stats = {"written": 0, "present": 0, "failed": 0, "deferred": 0}
+        alias = router.db_for_write(AdminLog)
+        horizon = time.time() - self.grace_seconds
+        for record in self.pending():
+            if record["at"] > horizon:
+                stats["deferred"] += 1
+                continue
+            fields = dict(record["entry"], created_at=datetime.fromisoformat(record["entry"]["created_at"]))
+            try:
+                with transaction.atomic(using=alias):
+                    entries = AdminLog.objects.using(alias)
+                    # Matched on the (target_id, target_model, created_at) index.
+                    if entries.filter(**{name: fields[name] for name in (
+                        "target_id", "target_model", "created_at", "action", "admin_id"
+                    )}).exists():
+                        stats["present"] += 1
+                    else:
+                        entries.create(**fields)
+                        stats["written"] += 1
+            except Exception:
+                logger.exception("Failed to recover audit log entry %s", record["key"])
+                stats["failed"] += 1
+                continue
+            self.mark_done(record["key"])
+        self.compact()
+        return stats
+
+
+def get_journal() -> AuditJournal:
+    return AuditJournal(
+        getattr(settings, "AUDIT_JOURNAL_PATH", settings.BASE_DIR / "logs" / "audit_journal.jsonl"),
+        grace_seconds=getattr(settings, "AUDIT_JOURNAL_GRACE_SECONDS", 60.0),
+    )
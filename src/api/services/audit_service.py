@@ -0,0 +1,394 @@
+"""
+Audit Log Service
+
+Writes AdminLog entries in one of three durability modes:
+
+- ``in-transaction``: the entry is inserted inside the caller's transaction,
+  so it commits or rolls back together with the audited change.
+- ``after-commit``: once the caller's transaction commits, the entry is
+  journaled (see ``api.services.audit_journal``) and inserted in its own
+  transaction. For AdminLog on a separate audit database (``AUDIT_DATABASE``),
+  where it cannot share the caller's transaction.
+- ``buffered``: the entry is queued once the caller's transaction commits
+  and written later with ``bulk_create``, when the buffer reaches
+  ``AUDIT_LOG_BUFFER_SIZE`` entries or every
+  ``AUDIT_LOG_FLUSH_INTERVAL_SECONDS``. Pending entries are flushed at
+  interpreter shutdown. While flushes fail the buffer is capped at
+  ``AUDIT_LOG_MAX_BUFFER`` entries; the oldest entries beyond it are spilled
+  to the audit journal for ``manage.py recover_audit_journal``.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from api.models.admin_log import AdminLog
+from api.services.audit_journal import AuditJournal, get_journal
+from api.services.loan_rollups import discount_moved_logs
+
+logger = logging.getLogger(__name__)
+
+IN_TRANSACTION = "in-transaction"
+AFTER_COMMIT = "after-commit"
+BUFFERED = "buffered"
+
+
+def audit_database() -> str:
+    """The database alias AdminLog is written to."""
+    return router.db_for_write(AdminLog)
+
+
+# The fields identifying an entry, as in the audit journal's recovery.
+NATURAL_KEY = ("target_id", "target_model", "created_at", "action", "admin_id")
+
+
+def move_admin_logs(source: str = "default", chunk_size: int = 5000) -> Dict[str, int]:
+    """
+    Move the AdminLog rows of ``source`` to the audit database, for
+    deployments that set ``AUDIT_DATABASE_PATH`` after AdminLog was written
+    to the main database.
+
+    Each chunk is inserted on the audit database, without its id (the audit
+    database may have ids of its own by now), then deleted from ``source``.
+    Rows already on the audit database are not inserted again, so a run
+    interrupted between the two steps can simply be repeated. Decisions
+    already in the loan rollups are taken out of them as their rows are
+    deleted, since the rollups count them again under their new ids.
+
+    Returns:
+        dict: Rows ``moved``, rows ``present`` already, and ``chunks``.
+    """
+    target = audit_database()
+    stats = {"moved": 0, "present": 0, "chunks": 0}
+    if target == source or AdminLog._meta.db_table not in connections[source].introspection.table_names():
+        return stats
+    fields = ("id", *NATURAL_KEY, "details")
+    while True:
+        rows = list(AdminLog.objects.using(source).order_by("id").values(*fields)[:chunk_size])
+        if not rows:
+            return stats
+        present = set(
+            AdminLog.objects.using(target)
+            .filter(
+                target_id__in={row["target_id"] for row in rows},
+                created_at__range=(min(row["created_at"] for row in rows), max(row["created_at"] for row in rows)),
+            )
+            .values_list(*NATURAL_KEY)
+        )
+        missing = [row for row in rows if tuple(row[field] for field in NATURAL_KEY) not in present]
+        ids = [row["id"] for row in rows]
+        # The rollups live on the main database, which commits last.
+        with transaction.atomic(), transaction.atomic(using=source):
+            with transaction.atomic(using=target):
+                AdminLog.objects.using(target).bulk_create(
+                    [AdminLog(**{field: row[field] for field in fields if field != "id"}) for row in missing]
+                )
+            # Under their new ids the rows are rolled up again.
+            discount_moved_logs(source, ids)
+            AdminLog.objects.using(source).filter(id__in=ids).delete()
+        stats["moved"] += len(missing)
+        stats["present"] += len(rows) - len(missing)
+        stats["chunks"] += 1
+
+
+def on_user_deleted(sender, instance, **kwargs) -> None:
+    """``pre_delete`` receiver for User: delete the user's AdminLog entries wherever they live."""
+    AdminLog.objects.using(audit_database()).filter(admin_id=instance.pk).delete()
+
+
+class AuditLogWriter:
+    """Writer for AdminLog entries with a selectable durability mode."""
+
+    def __init__(
+        self,
+        mode: str = IN_TRANSACTION,
+        buffer_size: int = 100,
+        flush_interval: float = 1.0,
+        journal: Optional[AuditJournal] = None,
+        max_buffer: int = 10000,
+    ):
+        if mode not in (IN_TRANSACTION, AFTER_COMMIT, BUFFERED):
+            raise ValueError(f"Unknown audit log mode '{mode}'")
+        self.mode = mode
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max(max_buffer, buffer_size)
+        self.journal = journal if journal is not None or mode != AFTER_COMMIT else get_journal()
+
+        self._buffer: List[AdminLog] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._atexit_registered = False
+
+        self._flushes = 0
+        self._entries_written = 0
+        self._failed_flushes = 0
+        self._spilled = 0
+        self._dropped = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def record(
+        self,
+        admin,
+        action: str,
+        target_model: str,
+        target_id: int,
+        details: Optional[Dict] = None,
+        using: Optional[str] = None,
+    ) -> AdminLog:
+        """
+        Record an admin action.
+
+        Args:
+            using: Database of the transaction making the audited change;
+                after-commit and buffered entries wait for it to commit.
+
+        Returns:
+            AdminLog: The entry. In after-commit and buffered mode it is
+                not saved yet.
+        """
+        entry = AdminLog(
+            admin=admin,
+            action=action,
+            target_id=target_id,
+            target_model=target_model,
+            details=details or {},
+        )
+        self.record_many([entry], using=using)
+        return entry
+
+    def record_many(self, entries: List[AdminLog], using: Optional[str] = None) -> None:
+        """
+        Record several admin actions at once, in the writer's mode: one
+        insert in-transaction, or one journal write and one insert after
+        commit.
+
+        Args:
+            entries: Unsaved AdminLog entries.
+            using: Database of the transaction making the audited changes.
+        """
+        if not entries:
+            return
+        if self.mode == IN_TRANSACTION:
+            AdminLog.objects.bulk_create(entries)
+            with self._lock:
+                self._entries_written += len(entries)
+        elif self.mode == AFTER_COMMIT:
+            transaction.on_commit(lambda: self._write_after_commit(entries), using=using)
+        else:
+            # Only audit changes that actually commit.
+            transaction.on_commit(lambda: self._enqueue(entries), using=using)
+
+    def _write_after_commit(self, entries: List[AdminLog]) -> None:
+        keys = self.journal.append_many(entries)
+        try:
+            with transaction.atomic(using=audit_database()):
+                AdminLog.objects.bulk_create(entries)
+        except Exception:
+            logger.exception("Failed to write %d audit log entries; they stay in the journal for recovery", len(entries))
+            with self._lock:
+                self._failed_flushes += 1
+            return
+        self.journal.mark_done(*keys)
+        with self._lock:
+            self._entries_written += len(entries)
+
+    def _enqueue(self, entries: List[AdminLog]) -> None:
+        with self._lock:
+            self._buffer.extend(entries)
+            full = len(self._buffer) >= self.buffer_size
+        self._ensure_started()
+        if full:
+            self.flush()
+        self._shed_overflow()
+
+    def _shed_overflow(self) -> None:
+        """Spill the oldest entries beyond ``max_buffer`` to the journal."""
+        with self._lock:
+            excess = len(self._buffer) - self.max_buffer
+            if excess <= 0:
+                return
+            overflow, self._buffer = self._buffer[:excess], self._buffer[excess:]
+        try:
+            if self.journal is None:
+                self.journal = get_journal()
+            self.journal.append_many(overflow)
+            spilled = True
+        except Exception:
+            logger.exception("Failed to spill %d audit log entries; dropping them", len(overflow))
+            spilled = False
+        with self._lock:
+            if spilled:
+                self._spilled += len(overflow)
+            else:
+                self._dropped += len(overflow)
+
+    def _ensure_started(self) -> None:
+        if not self._atexit_registered:
+            atexit.register(self.close)
+            self._atexit_registered = True
+        if self.flush_interval > 0 and (self._thread is None or not self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-log-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        from django.db import connection
+
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self.flush()
+        finally:
+            connection.close()
+
+    def flush(self) -> int:
+        """
+        Write all buffered entries with a single bulk insert.
+
+        Returns:
+            int: Number of entries written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                AdminLog.objects.bulk_create(batch)
+            except Exception:
+                logger.exception("Failed to flush %d audit log entries", len(batch))
+                with self._lock:
+                    self._buffer[:0] = batch
+                    self._failed_flushes += 1
+                self._shed_overflow()
+                return 0
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._flushes += 1
+                self._entries_written += len(batch)
+                self._last_flush_ms = elapsed_ms
+                self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+                self._total_flush_ms += elapsed_ms
+            return len(batch)
+
+    def close(self) -> None:
+        """Stop the background flusher and write anything still buffered."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self._thread = None
+        self.flush()
+
+    def metrics(self) -> Dict:
+        """Return buffer depth and flush latency counters."""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "buffer_depth": len(self._buffer),
+                "buffer_size": self.buffer_size,
+                "flush_interval_seconds": self.flush_interval,
+                "flushes": self._flushes,
+                "failed_flushes": self._failed_flushes,
+                "max_buffer": self.max_buffer,
+                "spilled_entries": self._spilled,
+                "dropped_entries": self._dropped,
+                "entries_written": self._entries_written,
+                "last_flush_ms": self._last_flush_ms,
+                "max_flush_ms": self._max_flush_ms,
+                "avg_flush_ms": self._total_flush_ms / self._flushes if self._flushes else 0.0,
+            }
+
+
+_writer: Optional[AuditLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer() -> AuditLogWriter:
+    """Return the process-wide audit log writer configured from settings."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditLogWriter(
+                    mode=getattr(settings, "AUDIT_LOG_MODE", IN_TRANSACTION),
+                    buffer_size=getattr(settings, "AUDIT_LOG_BUFFER_SIZE", 100),
+                    flush_interval=getattr(settings, "AUDIT_LOG_FLUSH_INTERVAL_SECONDS", 1.0),
+                    max_buffer=getattr(settings, "AUDIT_LOG_MAX_BUFFER", 10000),
+                )
+    return _writer
+
+
+def _prefix_end(prefix: str) -> str:
+    """The smallest string greater than every string starting with ``prefix``."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+@dataclass
+class AdminLogFilter:
+    """
+    Filters for listing AdminLog entries; unset fields match everything.
+
+    Each combination is served by an index on AdminLog. ``reason`` matches
+    entries whose ``details["reason"]`` starts with it, ignoring case.
+    """
+    admin_id: Optional[int] = None
+    action: Optional[str] = None
+    target_model: Optional[str] = None
+    target_id: Optional[int] = None
+    reason: Optional[str] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+    def apply(self, queryset):
+        """Filter a queryset of AdminLog."""
+        if self.admin_id is not None:
+            queryset = queryset.filter(admin_id=self.admin_id)
+        if self.action:
+            queryset = queryset.filter(action=self.action)
+        if self.target_model:
+            queryset = queryset.filter(target_model=self.target_model)
+        if self.target_id is not None:
+            queryset = queryset.filter(target_id=self.target_id)
+        if self.reason:
+            # A range on the stored lowercased reason, which (unlike LIKE) can use its index.
+            prefix = self.reason.lower()
+            queryset = queryset.filter(reason_lower__gte=prefix, reason_lower__lt=_prefix_end(prefix))
+        if self.start:
+            queryset = queryset.filter(created_at__gte=self.start)
+        if self.end:
+            queryset = queryset.filter(created_at__lte=self.end)
+        return queryset
+
+    def matches(self, row: Dict) -> bool:
+        """Whether an archived entry (a dict of AdminLog fields) passes the filters."""
+        if self.admin_id is not None and row["admin_id"] != self.admin_id:
+            return False
+        if self.action and row["action"] != self.action:
+            return False
+        if self.target_model and row["target_model"] != self.target_model:
+            return False
+        if self.target_id is not None and row["target_id"] != self.target_id:
+            return False
+        if self.reason:
+            reason = row["details"].get("reason")
+            if not isinstance(reason, str) or not reason.lower().startswith(self.reason.lower()):
+                return False
+        if self.start and row["created_at"] < self.start:
+            return False
+        if self.end and row["created_at"] > self.end:
+            return False
+        return True
@@ -1,19 +1,141 @@
-from ninja.security import HttpBearer
+import hmac
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+from ninja.security import APIKeyHeader, HttpBearer
+from api.cache_backends import is_process_local
 from .jwt_service import JWTService
 from api.models.user import User
+from . import read_replicas
+from .tracing import traced
+
+USER_CACHE_KEY = "auth:user:{}"
+
+
+def user_cache_timeout() -> int:
+    """
+    Seconds to cache users for, or 0 when the cache is off: when
+    ``AUTH_USER_CACHE_SECONDS`` is 0 or the default cache is process-local
+    (a user deactivated through another worker would stay cached there).
+    """
+    timeout = getattr(settings, "AUTH_USER_CACHE_SECONDS", 30)
+    if is_process_local():
+        return 0
+    return timeout
+
+
+def get_user(user_id: int):
+    """
+    Load a user for authentication, through the cache for
+    ``AUTH_USER_CACHE_SECONDS`` if the cache is shared by the workers.
+    Saving or deleting a user drops the cached copy for every worker;
+    bulk updates that skip signals show up once it expires.
+    """
+    timeout = user_cache_timeout()
+    if not timeout:
+        return User.objects.filter(id=user_id).first()
+    key = USER_CACHE_KEY.format(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.filter(id=user_id).first()
+        if user is not None:
+            cache.set(key, user, timeout)
+    return user
+
+
+def get_users(user_ids: Iterable[int]) -> Dict[int, User]:
+    """
+    Load many users by id, through the same cache as ``get_user``; the
+    users not cached are loaded with one ``id__in`` query.
+    """
+    ids = set(user_ids)
+    timeout = user_cache_timeout()
+    users = {}
+    if timeout:
+        keys = {USER_CACHE_KEY.format(user_id): user_id for user_id in ids}
+        users = {keys[key]: user for key, user in cache.get_many(keys).items()}
+    missing = ids - users.keys()
+    if missing:
+        loaded = {user.id: user for user in User.objects.filter(id__in=missing)}
+        if timeout and loaded:
+            cache.set_many({USER_CACHE_KEY.format(user_id): user for user_id, user in loaded.items()}, timeout)
+        users.update(loaded)
+    return users
+
+
+@traced("auth.introspect")
+def introspect_tokens(tokens: List[str]) -> List[Dict]:
+    """
+    Check a batch of access tokens, as an internal service would before
+    trusting them. Returns one result per token, in order: ``active`` with
+    the token's claims and user flags, or ``active: False`` with the reason.
+    """
+    payloads = JWTService.validate_access_tokens(tokens)
+    users = get_users(
+        payload["user_id"] for payload in payloads.values()
+        if isinstance(payload, dict) and isinstance(payload.get("user_id"), int)
+    )
+    results = []
+    for token in tokens:
+        payload = payloads[token]
+        if isinstance(payload, Exception):
+            results.append({"active": False, "error": str(payload)})
+            continue
+        user = users.get(payload.get("user_id"))
+        if user is None or not user.is_active:
+            results.append({"active": False, "error": "User not found or inactive"})
+            continue
+        results.append({
+            "active": True,
+            "claims": payload,
+            "user": {
+                "id": user.id,
+                "email": user.email,
+                "is_active": user.is_active,
+                "is_staff": user.is_staff,
+                "is_admin": user.is_admin,
+            },
+        })
+    return results
+
+
+def forget_user(sender, instance, **kwargs):
+    """``post_save``/``post_delete`` receiver for User dropping its cached copy."""
+    cache.delete(USER_CACHE_KEY.format(instance.pk))
+
 
 class AuthBearer(HttpBearer):
+    @traced("auth.authenticate")
     def authenticate(self, request, token):
         try:
             payload = JWTService.validate_access_token(token)
             if payload:
-                user = User.objects.filter(id=payload["user_id"]).first()
+                read_replicas.bind_user(payload["user_id"])
+                user = get_user(payload["user_id"])
                 if user and user.is_active:
                     return user
             return None
         except Exception:
            return None
 
+def is_service_key(key: str) -> bool:
+    """Whether ``key`` is one of ``SERVICE_API_KEYS`` (compared in constant time)."""
+    return any(
+        hmac.compare_digest(key.encode(), service_key.encode())
+        for service_key in getattr(settings, "SERVICE_API_KEYS", [])
+    )
+
+
+class ServiceKeyAuth(APIKeyHeader):
+    """Authenticates internal services by an ``X-Service-Key`` listed in ``SERVICE_API_KEYS``."""
+    param_name = "X-Service-Key"
+
+    def authenticate(self, request, key):
+        if key and is_service_key(key):
+            return key
+        return None
+
 class AdminAuth(AuthBearer):
     def authenticate(self, request, token):
         user = super().authenticate(request, token)
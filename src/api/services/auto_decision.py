@@ -0,0 +1,176 @@
+"""
+Loan Auto-Decision
+
+Decides pending loans by declarative rules (``LOAN_DECISION_RULES``). Each
+rule compiles to one ORM filter, so a run evaluates it set-wise in SQL over
+every pending loan instead of loan by loan:
+
+    {"name": "small_clean", "decision": "APPROVED", "max_amount": 50000,
+     "min_tenure_months": 3, "max_tenure_months": 12,
+     "no_prior_rejections": True, "reason": "Small, short loan"}
+
+Rules are applied in order and a loan is decided by the first rule that
+matches it; rejections made by earlier rules count for
+``no_prior_rejections`` in later ones. Loans an admin has leased from the review queue are skipped.
+
+Decisions are applied in chunks through ``LoanStateMachine.transition_many``:
+one conditional UPDATE per chunk on the loan's shard that re-checks the
+rule, then the same hooks as ``update_loan_status``. Those write the
+AdminLog entries, attributed to the system actor
+(``LOAN_DECISION_ACTOR_EMAIL``), through the configured audit writer and
+publish status events; approval emails are only sent when asked for.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, QuerySet
+from django.utils import timezone
+
+from api.models.loan_application import LoanApplication, LoanStatus
+from api.models.user import User
+from api.services import loan_shards, review_queue
+from api.services.audit_service import audit_database
+from api.services.loan_state import loan_state_machine
+
+DECISIONS = (LoanStatus.APPROVED, LoanStatus.REJECTED)
+
+
+class InvalidRule(ValueError):
+    """Raised when a decision rule is malformed."""
+
+
+@dataclass(frozen=True)
+class DecisionRule:
+    """
+    A loan policy: every pending loan matching all of the set conditions
+    gets ``decision``.
+
+    Attributes:
+        name: Identifies the rule in reports and AdminLog details.
+        decision: APPROVED or REJECTED.
+        min_amount / max_amount: Inclusive bounds on the amount.
+        min_tenure_months / max_tenure_months: Inclusive bounds on the tenure.
+        no_prior_rejections: Only match users without a rejected loan.
+        reason: Recorded as the AdminLog reason (default: the rule name).
+    """
+    name: str
+    decision: str
+    min_amount: Optional[Decimal] = None
+    max_amount: Optional[Decimal] = None
+    min_tenure_months: Optional[int] = None
+    max_tenure_months: Optional[int] = None
+    no_prior_rejections: bool = False
+    reason: str = ""
+
+    def __post_init__(self):
+        if self.decision not in DECISIONS:
+            raise InvalidRule(f"Rule '{self.name}' has unknown decision '{self.decision}'")
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> "DecisionRule":
+        try:
+            rule = cls(**spec)
+        except TypeError as e:
+            raise InvalidRule(f"Invalid rule {spec!r}: {e}") from None
+        if not rule.to_q():
+            raise InvalidRule(f"Rule '{rule.name}' has no conditions")
+        return rule
+
+    def to_q(self) -> Q:
+        """Compile the rule's conditions into a filter on LoanApplication."""
+        q = Q()
+        for field, lookup, value in (
+            ("amount", "gte", self.min_amount),
+            ("amount", "lte", self.max_amount),
+            ("tenure_months", "gte", self.min_tenure_months),
+            ("tenure_months", "lte", self.max_tenure_months),
+        ):
+            if value is not None:
+                q &= Q(**{f"{field}__{lookup}": value})
+        if self.no_prior_rejections:
+            # A user's loans all live on one shard, so this stays shard-local.
+            q &= ~Exists(
+                LoanApplication.objects.filter(user_id=OuterRef("user_id"), status=LoanStatus.REJECTED)
+            )
+        return q
+
+
+def get_rules() -> List[DecisionRule]:
+    return [DecisionRule.from_dict(spec) for spec in getattr(settings, "LOAN_DECISION_RULES", [])]
+
+
+def get_system_actor() -> User:
+    """The user auto-decisions are attributed to. It cannot log in."""
+    email = getattr(settings, "LOAN_DECISION_ACTOR_EMAIL", "auto-decision@system.local")
+    actor, created = User.objects.get_or_create(
+        email=email, defaults={"full_name": "Auto-decision", "is_staff": True, "is_active": False}
+    )
+    if created:
+        actor.set_unusable_password()
+        actor.save(update_fields=["password"])
+    return actor
+
+
+def _undecided(alias: str) -> QuerySet:
+    return LoanApplication.objects.using(alias).filter(review_queue.available(timezone.now()))
+
+
+def preview(rules: List[DecisionRule]) -> Dict[str, int]:
+    """
+    Count the loans each rule would decide, leaving earlier rules' matches
+    to them. Counts ignore how earlier rejections affect
+    ``no_prior_rejections`` later in the same run.
+    """
+    counts = {}
+    earlier = Q(pk__in=[])
+    for rule in rules:
+        q = rule.to_q()
+        counts[rule.name] = sum(
+            _undecided(alias).filter(q).exclude(earlier).count() for alias in loan_shards.get_shard_aliases()
+        )
+        earlier |= q
+    return counts
+
+
+def _chunks(alias: str, rule: DecisionRule, chunk_size: int) -> Iterator[List[int]]:
+    """The ids of the loans ``rule`` matches on a shard, selected in one query, in chunks."""
+    ids = list(_undecided(alias).filter(rule.to_q()).values_list("id", flat=True))
+    for start in range(0, len(ids), chunk_size):
+        yield ids[start:start + chunk_size]
+
+
+def _decide(alias: str, rule: DecisionRule, ids: List[int], actor: User, send_emails: bool) -> int:
+    """Decide the loans of ``ids`` that still match ``rule``; returns how many were decided."""
+    # The loans' shard commits first, then the audit log, as in update_loan_status.
+    with transaction.atomic(using=audit_database()), transaction.atomic(using=alias):
+        results = loan_state_machine.transition_many(
+            ids,
+            rule.decision,
+            actor=actor,
+            reason=rule.reason or rule.name,
+            from_status=LoanStatus.PENDING,
+            where=rule.to_q(),
+            details={"rule": rule.name},
+            notify=send_emails,
+        )
+    return len(results)
+
+
+def apply(rules: List[DecisionRule], chunk_size: int = 2000, send_emails: bool = False) -> Dict[str, int]:
+    """
+    Decide every pending loan some rule matches.
+
+    Returns:
+        dict: Loans decided per rule name.
+    """
+    actor = get_system_actor()
+    decided = {rule.name: 0 for rule in rules}
+    for rule in rules:
+        for alias in loan_shards.get_shard_aliases():
+            for ids in _chunks(alias, rule, chunk_size):
+                decided[rule.name] += _decide(alias, rule, ids, actor, send_emails)
+    return decided
@@ -0,0 +1,201 @@
+"""
+Adaptive Concurrency Limiter
+
+Per route class, admits at most ``limit`` requests at a time and adapts the
+limit to observed latency with AIMD: while responses stay under the target
+latency and the limit is in use, it grows by about one slot per full window
+of requests; when a response is slower than the target, it shrinks by
+``backoff_ratio`` (at most once per target-latency interval, so one stall
+is not punished once per waiting request).
+
+The target is the class's configured latency or ``latency_tolerance``
+times its baseline, whichever is higher. The baseline is the fastest
+response of the last ``baseline_window`` requests, i.e. what the class
+costs without queueing, so a class that is slow by nature (password
+hashing on login) is not held at its minimum limit forever.
+
+Low-priority requests may only fill ``low_priority_share`` of the limit,
+which keeps the remaining slots free for high-priority traffic when the
+class is saturated.
+"""
+
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+from .auth_service import is_service_key
+from .jwt_service import JWTService
+
+AUTH = "auth"
+INTROSPECT = "introspect"
+READ = "read"
+WRITE = "write"
+ADMIN_WRITE = "admin_write"
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class AIMDLimiter:
+    """Concurrency limit for one route class."""
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        target_latency_ms: float = 250,
+        backoff_ratio: float = 0.9,
+        low_priority_share: float = 0.5,
+        latency_tolerance: float = 2.0,
+        baseline_window: int = 100,
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency_ms = target_latency_ms
+        self.backoff_ratio = backoff_ratio
+        self.low_priority_share = low_priority_share
+        self.latency_tolerance = latency_tolerance
+        self.baseline_window = baseline_window
+        self.baseline_ms: Optional[float] = None
+        self._window_min_ms = math.inf
+        self._window_count = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.latency_ewma_ms = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def capacity(self, high_priority: bool) -> int:
+        limit = int(self.limit)
+        if high_priority:
+            return limit
+        return max(1, int(limit * self.low_priority_share))
+
+    def try_acquire(self, high_priority: bool = True) -> bool:
+        """Take a slot, or return False if the class is at its limit for this priority."""
+        with self._lock:
+            if self.in_flight >= self.capacity(high_priority):
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+    def release(self, latency_ms: float) -> None:
+        """Free a slot and adjust the limit from the request's latency."""
+        with self._lock:
+            in_use = self.in_flight
+            self.in_flight -= 1
+            self._adjust(latency_ms, in_use)
+
+    def shed(self) -> None:
+        """
+        Count a request rejected for waiting too long before it reached the
+        worker. Its wait comes from a header, so it is not taken as a latency
+        sample: the limit and ``Retry-After`` only follow requests served.
+        """
+        with self._lock:
+            self.rejected += 1
+
+    def effective_target_ms(self) -> float:
+        if self.baseline_ms is None:
+            return self.target_latency_ms
+        return max(self.target_latency_ms, self.baseline_ms * self.latency_tolerance)
+
+    def _observe(self, latency_ms: float) -> None:
+        self._window_min_ms = min(self._window_min_ms, latency_ms)
+        self._window_count += 1
+        if self._window_count >= self.baseline_window:
+            self.baseline_ms = self._window_min_ms
+            self._window_min_ms = math.inf
+            self._window_count = 0
+
+    def _adjust(self, latency_ms: float, in_use: int) -> None:
+        self.latency_ewma_ms += 0.1 * (latency_ms - self.latency_ewma_ms)
+        self._observe(latency_ms)
+        target_ms = self.effective_target_ms()
+        if latency_ms > target_ms:
+            now = time.monotonic()
+            if now - self._last_decrease >= target_ms / 1000:
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                self._last_decrease = now
+        elif in_use * 2 >= self.limit:
+            # Only grow a limit that is actually being used.
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait: roughly one drain of the current queue."""
+        with self._lock:
+            return max(1, math.ceil(self.latency_ewma_ms / 1000))
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "latency_ewma_ms": round(self.latency_ewma_ms, 3),
+                "target_latency_ms": round(self.effective_target_ms(), 3),
+            }
+
+
+def classify(method: str, path: str) -> str:
+    """Map an API request to its route class."""
+    if path.rstrip("/") == "/api/auth/introspect":
+        # Internal services checking tokens; no password hashing.
+        return INTROSPECT
+    if path.startswith("/api/auth/"):
+        return AUTH
+    if method in SAFE_METHODS:
+        return READ
+    if path.startswith("/api/admin/"):
+        return ADMIN_WRITE
+    return WRITE
+
+
+def is_high_priority(headers) -> bool:
+    """
+    Requests carrying a valid access token or service key outrank
+    anonymous ones.
+
+    Only the token's signature and expiry are checked (one HMAC, no
+    database query); endpoints still authenticate as usual. Anything else,
+    including a made-up ``Bearer`` header or an admin path, is low priority.
+    """
+    service_key = headers.get("X-Service-Key")
+    if service_key and is_service_key(service_key):
+        return True
+    authorization = headers.get("Authorization", "")
+    if authorization[:7].lower() != "bearer ":
+        return False
+    try:
+        JWTService.validate_access_token(authorization[7:].strip())
+    except Exception:
+        return False
+    return True
+
+
+def parse_request_start(value: Optional[str]) -> Optional[float]:
+    """
+    Parse an ``X-Request-Start`` header set by the proxy into epoch seconds.
+
+    Accepts ``t=<value>`` or a bare number in seconds, milliseconds or
+    microseconds.
+    """
+    if not value:
+        return None
+    try:
+        stamp = float(value.strip().removeprefix("t="))
+    except ValueError:
+        return None
+    if stamp > 1e14:
+        return stamp / 1e6
+    if stamp > 1e11:
+        return stamp / 1e3
+    return stamp
@@ -0,0 +1,205 @@
+"""
+Synthetic Data Seeder
+
+Generates production-shaped users, loan applications and audit log entries
+for load and scale testing. Output is fully determined by the seed.
+
+Inserts go through chunked ``bulk_create`` calls grouped into large
+transactions, and every user shares one precomputed password hash, so the
+cost per row is an ORM object rather than a password hash and a commit.
+"""
+
+import itertools
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from api.models.admin_log import AdminLog
+from api.models.loan_application import LoanApplication, LoanStatus
+from api.models.user import User
+from api.services import loan_shards
+from api.services.audit_service import audit_database
+
+TENURES = [3, 6, 9, 12, 18, 24, 36, 48, 60]
+PURPOSES = [
+    "Working capital for my retail shop",
+    "School fees for the new academic session",
+    "Medical expenses",
+    "Home renovation",
+    "Purchase of farming equipment",
+    "Vehicle repair",
+    "Inventory restock ahead of the holiday season",
+    "Rent payment",
+    "Wedding expenses",
+    "Expansion of a small business",
+]
+
+
+def parse_status_mix(value: str) -> Dict[str, float]:
+    """
+    Parse ``"PENDING=0.5,APPROVED=0.3,REJECTED=0.2"`` into normalized weights.
+    """
+    mix = {}
+    for part in value.split(","):
+        status, _, weight = part.partition("=")
+        status = status.strip().upper()
+        if status not in LoanStatus.values:
+            raise ValueError(f"Unknown loan status '{status}'")
+        mix[status] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Status weights must add up to more than zero")
+    return {status: weight / total for status, weight in mix.items()}
+
+
+class DataSeeder:
+    """Deterministic generator of users, loans and audit logs."""
+
+    def __init__(
+        self,
+        users: int,
+        loans_per_user: float,
+        status_mix: Dict[str, float],
+        days: int,
+        audit_density: float,
+        admins: int = 5,
+        seed: int = 42,
+        prefix: str = "seed",
+        password: str = "password123",
+        chunk_size: int = 5000,
+        transaction_size: int = 100000,
+        now: Optional[datetime] = None,
+        progress: Optional[Callable[[str], None]] = None,
+    ):
+        self.users = users
+        self.loans_per_user = loans_per_user
+        self.status_mix = status_mix
+        self.days = days
+        self.audit_density = audit_density
+        self.admins = admins
+        self.seed = seed
+        self.prefix = prefix
+        self.password = password
+        self.chunk_size = chunk_size
+        self.transaction_size = transaction_size
+        self.now = now or timezone.now()
+        self.progress = progress or (lambda message: None)
+        self.rng = random.Random(seed)
+
+    def _poisson(self, mean: float) -> int:
+        # Knuth's method; fine for the small means used here.
+        limit, k, p = math.exp(-mean), 0, 1.0
+        while True:
+            p *= self.rng.random()
+            if p <= limit:
+                return k
+            k += 1
+
+    def _chunks(self, objects: Iterator) -> Iterator[List]:
+        chunk = []
+        for obj in objects:
+            chunk.append(obj)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _insert(
+        self, model, objects: Iterator, counts: Dict[str, int], name: str, ids_only: bool = False, using: str = "default"
+    ) -> List:
+        """
+        Insert objects in chunks, committing every ``transaction_size`` rows.
+
+        Returns the created objects, or only their ids with ``ids_only``.
+        """
+        created = []
+        chunks = self._chunks(objects)
+        chunks_per_transaction = max(1, self.transaction_size // self.chunk_size)
+        for batch in iter(lambda: list(itertools.islice(chunks, chunks_per_transaction)), []):
+            with transaction.atomic(using=using):
+                for chunk in batch:
+                    objs = model.objects.using(using).bulk_create(chunk)
+                    created.extend([obj.id for obj in objs] if ids_only else objs)
+                    counts[name] += len(chunk)
+        return created
+
+    def _users(self, password_hash: str, count: int, kind: str, **flags) -> Iterator[User]:
+        for i in range(count):
+            yield User(
+                email=f"{self.prefix}-{kind}-{self.seed}-{i}@example.com",
+                full_name=f"{kind.title()} {i}",
+                password=password_hash,
+                **flags,
+            )
+
+    def _loans(self, user_ids: List[int], statuses: List[str], weights: List[float]) -> Iterator[LoanApplication]:
+        span = timedelta(days=self.days).total_seconds()
+        for user_id in user_ids:
+            for _ in range(self._poisson(self.loans_per_user)):
+                amount = min(round(self.rng.lognormvariate(math.log(5000), 0.9), 2), 9_999_999.99)
+                yield LoanApplication(
+                    user_id=user_id,
+                    amount=max(amount, 100),
+                    tenure_months=self.rng.choice(TENURES),
+                    purpose=self.rng.choice(PURPOSES),
+                    status=self.rng.choices(statuses, weights)[0],
+                    created_at=self.now - timedelta(seconds=self.rng.random() * span),
+                )
+
+    def _audit_logs(self, loans: List[LoanApplication], admin_ids: List[int]) -> Iterator[AdminLog]:
+        for loan in loans:
+            if loan.status == LoanStatus.PENDING or self.rng.random() >= self.audit_density:
+                continue
+            decided_at = min(loan.created_at + timedelta(seconds=self.rng.uniform(3600, 7 * 86400)), self.now)
+            yield AdminLog(
+                admin_id=self.rng.choice(admin_ids),
+                action=f"{loan.status}_LOAN",
+                target_id=loan.id,
+                target_model="LoanApplication",
+                details={},
+                created_at=decided_at,
+            )
+
+    def run(self) -> Dict[str, int]:
+        """
+        Generate and insert the dataset.
+
+        Returns:
+            dict: Number of users, admins, loans and audit logs created.
+        """
+        if User.objects.filter(email__startswith=f"{self.prefix}-user-{self.seed}-").exists():
+            raise ValueError(f"Data for prefix '{self.prefix}' and seed {self.seed} already exists")
+
+        counts = {"admins": 0, "users": 0, "loans": 0, "audit_logs": 0}
+        password_hash = make_password(self.password)
+        statuses, weights = list(self.status_mix), list(self.status_mix.values())
+
+        admin_ids = self._insert(
+            User, self._users(password_hash, self.admins, "admin", is_staff=True), counts, "admins", ids_only=True
+        )
+        user_ids = self._insert(User, self._users(password_hash, self.users, "user"), counts, "users", ids_only=True)
+        self.progress(f"Created {counts['users']} users and {counts['admins']} admins")
+
+        # Loans are generated and logged one batch of users at a time so
+        # memory stays bounded by the batch, not the dataset.
+        batch = max(1, self.transaction_size // max(1, math.ceil(self.loans_per_user)))
+        for start in range(0, len(user_ids), batch):
+            # Generated in one pass so the data does not depend on the shard count.
+            by_shard: Dict[str, List[LoanApplication]] = {}
+            for loan in self._loans(user_ids[start:start + batch], statuses, weights):
+                by_shard.setdefault(loan_shards.shard_for_user(loan.user_id), []).append(loan)
+            loans = []
+            for alias, shard_loans in by_shard.items():
+                loans.extend(self._insert(LoanApplication, iter(shard_loans), counts, "loans", using=alias))
+            if admin_ids:
+                self._insert(
+                    AdminLog, self._audit_logs(loans, admin_ids), counts, "audit_logs", using=audit_database()
+                )
+            self.progress(f"Created {counts['loans']} loans and {counts['audit_logs']} audit logs")
+        return counts
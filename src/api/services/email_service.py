@@ -1,8 +1,21 @@
-from django.core.mail import send_mail
 from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 
+from .tracing import traced
+
+
+def send_mail(*args, **kwargs):
+    """
+    Proxy to django.core.mail.send_mail.
+
+    The mail stack (email.mime, smtplib, backends) is only imported on the
+    first send, so processes that never send mail don't pay for it at startup.
+    """
+    from django.core.mail import send_mail as _send_mail
+
+    return _send_mail(*args, **kwargs)
+
+
+@traced("email.send_loan_approval")
 def send_loan_approval_email(user_email: str, user_name: str, amount: float, tenure: int):
     """
     Send a nice HTML email to the user when their loan is approved.
@@ -91,6 +104,8 @@ def send_loan_approval_email(user_email: str, user_name: str, amount: float, ten
     </html>
     """
     
+    from django.utils.html import strip_tags
+
     plain_message = strip_tags(html_message)
     
     try:
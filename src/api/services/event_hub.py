@@ -0,0 +1,160 @@
+"""
+Event Hub
+
+In-process broadcast hub for Server-Sent Events. Publishers (any thread)
+push events for a user; every open stream of that user receives them
+through its own bounded asyncio queue on the event loop that owns it.
+
+- Event ids are ``<epoch>-<seq>``; the epoch changes when the process
+  restarts, so a client resuming with an id from another process gets a
+  ``reset`` instead of silently missing events.
+- The last ``SSE_REPLAY_BUFFER_SIZE`` events are kept for ``Last-Event-ID``
+  resume.
+- A subscriber whose queue fills up (a client not reading) is disconnected;
+  it can reconnect and resume from the replay buffer.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+
+
+class TooManyConnections(Exception):
+    """Raised when a user already has the maximum number of open streams."""
+
+
+class Event:
+    __slots__ = ("seq", "id", "user_id", "type", "data")
+
+    def __init__(self, seq: int, event_id: str, user_id: int, event_type: str, data: Dict):
+        self.seq = seq
+        self.id = event_id
+        self.user_id = user_id
+        self.type = event_type
+        self.data = data
+
+    def encode(self) -> str:
+        """Serialize the event in the text/event-stream format."""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+class Subscriber:
+    """A single open stream with its own bounded queue."""
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, event: Event) -> None:
+        """Queue an event; runs on the subscriber's event loop."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Make room for the sentinel that tells the stream to close.
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class EventHub:
+    """Fan-out of per-user events to subscribers, with a bounded replay buffer."""
+
+    def __init__(self, replay_size: int = 1000, queue_size: int = 100, max_connections_per_user: int = 5):
+        self.queue_size = queue_size
+        self.max_connections_per_user = max_connections_per_user
+        self.epoch = str(int(time.time() * 1000))
+        self._seq = itertools.count(1)
+        self._replay: deque = deque(maxlen=replay_size)
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, user_id: int, event_type: str, data: Dict) -> Event:
+        """Publish an event to all of a user's streams. Safe to call from any thread."""
+        with self._lock:
+            seq = next(self._seq)
+            event = Event(seq, f"{self.epoch}-{seq}", user_id, event_type, data)
+            self._replay.append(event)
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop has closed; it will be unsubscribed.
+                pass
+        return event
+
+    def subscribe(self, user_id: int, last_event_id: Optional[str] = None) -> Tuple[Subscriber, List[Event], bool]:
+        """
+        Register a stream for ``user_id`` on the running event loop.
+
+        Returns:
+            tuple: The subscriber, the events to replay after
+                ``last_event_id``, and whether events may have been missed
+                (the client should refetch its state).
+
+        Raises:
+            TooManyConnections: If the user has too many open streams.
+        """
+        subscriber = Subscriber(user_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            streams = self._subscribers.setdefault(user_id, set())
+            if len(streams) >= self.max_connections_per_user:
+                raise TooManyConnections(f"At most {self.max_connections_per_user} open streams per user")
+            backlog, missed = self._replay_after(user_id, last_event_id)
+            streams.add(subscriber)
+        return subscriber, backlog, missed
+
+    def _replay_after(self, user_id: int, last_event_id: Optional[str]) -> Tuple[List[Event], bool]:
+        if not last_event_id:
+            return [], False
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return [], True
+        last_seq = int(seq)
+        missed = bool(self._replay) and last_seq < self._replay[0].seq - 1
+        backlog = [event for event in self._replay if event.seq > last_seq and event.user_id == user_id]
+        return backlog, missed
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            streams = self._subscribers.get(subscriber.user_id)
+            if streams is not None:
+                streams.discard(subscriber)
+                if not streams:
+                    del self._subscribers[subscriber.user_id]
+
+    def connection_count(self, user_id: int) -> int:
+        with self._lock:
+            return len(self._subscribers.get(user_id, ()))
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(streams) for streams in self._subscribers.values())
+
+
+_hub: Optional[EventHub] = None
+_hub_lock = threading.Lock()
+
+
+def get_event_hub() -> EventHub:
+    """Return the process-wide event hub configured from settings."""
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = EventHub(
+                    replay_size=getattr(settings, "SSE_REPLAY_BUFFER_SIZE", 1000),
+                    queue_size=getattr(settings, "SSE_QUEUE_SIZE", 100),
+                    max_connections_per_user=getattr(settings, "SSE_MAX_CONNECTIONS_PER_USER", 5),
+                )
+    return _hub
@@ -0,0 +1,176 @@
+"""
+Idempotency Service
+
+Runs a request handler at most once per (user, Idempotency-Key):
+
+- A replay of a completed request returns the stored response after a
+  single indexed lookup, without running the handler.
+- The first request inserts a short-lived claim row; concurrent duplicates
+  fail the unique constraint and wait for the claim to complete instead of
+  running the handler themselves.
+- The handler runs in a transaction on the database it writes to (the
+  user's loan shard), nested in the key's transaction on the main
+  database. If the handler fails, both roll back and the claim is removed
+  so the client can retry. When the two are one database, the handler's
+  writes and the stored response commit together; otherwise the handler's
+  database commits first, and a crash before the key's commit leaves the
+  write with an unfinished claim: a retry after
+  ``IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS`` runs the handler again.
+"""
+
+import hashlib
+import json
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.utils import timezone
+
+from api.db_errors import is_unique_violation
+from api.models.idempotency_key import IdempotencyKey
+
+# Claims lost to a concurrent request before its row can be read back;
+# beyond this the key is treated as in progress.
+MAX_LOST_CLAIMS = 5
+
+
+class IdempotencyError(Exception):
+    """Base class for idempotency failures, carrying an HTTP status code."""
+    status_code = 409
+
+
+class KeyReusedError(IdempotencyError):
+    """The key was already used with a different request payload."""
+    status_code = 422
+
+
+class RequestInProgressError(IdempotencyError):
+    """Another request with the same key did not finish in time."""
+    status_code = 409
+
+
+def _get_ttl() -> timedelta:
+    """Get how long completed responses are kept."""
+    return timedelta(hours=getattr(settings, "IDEMPOTENCY_KEY_TTL_HOURS", 24))
+
+
+def _get_claim_timeout() -> timedelta:
+    """Get how long an in-flight claim blocks duplicates before it is considered abandoned."""
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS", 60))
+
+
+def _get_wait_seconds() -> float:
+    """Get how long a duplicate waits for the in-flight request."""
+    return getattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 10)
+
+
+def fingerprint(payload: Dict) -> str:
+    """Return a stable hash of a request payload."""
+    canonical = json.dumps(payload, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _claim(user, key: str, request_fingerprint: str):
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                request_fingerprint=request_fingerprint,
+                expires_at=timezone.now() + _get_claim_timeout(),
+            )
+    except IntegrityError as e:
+        # Only "someone else holds this key" is a lost race; anything else
+        # (e.g. the user was deleted) is a real error.
+        if is_unique_violation(e, IdempotencyKey, "unique_idempotency_key_per_user"):
+            return None
+        raise
+
+
+def run_idempotent(
+    user, key: str, payload: Dict, handler: Callable[[], Dict], using: Optional[str] = None
+) -> Tuple[Dict, bool]:
+    """
+    Run ``handler`` once for ``(user, key)`` and store its response.
+
+    Args:
+        user: The authenticated user.
+        key: The client's Idempotency-Key.
+        payload: The request payload, used to detect key reuse.
+        handler: Performs the request and returns the JSON response body.
+        using: Database the handler writes to (default: the main database).
+
+    Returns:
+        tuple: The response body and whether it was replayed.
+
+    Raises:
+        KeyReusedError: If the key was used with a different payload.
+        RequestInProgressError: If a concurrent request with the key is
+            still running after IDEMPOTENCY_WAIT_SECONDS (or keeps winning
+            the claim without its row being visible).
+    """
+    request_fingerprint = fingerprint(payload)
+    deadline = time.monotonic() + _get_wait_seconds()
+    delay = 0.01
+    lost_claims = 0
+
+    while True:
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is not None and record.expires_at <= timezone.now():
+            # Expired response or abandoned claim: free the key.
+            IdempotencyKey.objects.filter(id=record.id, expires_at__lte=timezone.now()).delete()
+            record = None
+
+        if record is None:
+            claim = _claim(user, key, request_fingerprint)
+            if claim is not None:
+                break
+            lost_claims += 1
+            if lost_claims >= MAX_LOST_CLAIMS or time.monotonic() >= deadline:
+                raise RequestInProgressError("A request with this Idempotency-Key is still in progress")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+            continue
+
+        if record.request_fingerprint != request_fingerprint:
+            raise KeyReusedError("Idempotency-Key was already used with a different request")
+        if record.completed:
+            return record.response_body, True
+        if time.monotonic() >= deadline:
+            raise RequestInProgressError("A request with this Idempotency-Key is still in progress")
+        time.sleep(delay)
+        delay = min(delay * 2, 0.25)
+
+    try:
+        # The handler's database commits first, then the key's.
+        with transaction.atomic(), transaction.atomic(using=using or DEFAULT_DB_ALIAS):
+            body = handler()
+            IdempotencyKey.objects.filter(id=claim.id).update(
+                completed=True,
+                response_body=body,
+                expires_at=timezone.now() + _get_ttl(),
+            )
+    except Exception:
+        IdempotencyKey.objects.filter(id=claim.id).delete()
+        raise
+    return body, False
+
+
+def purge_expired_keys(batch_size: int = 10000) -> int:
+    """
+    Delete expired keys in batches.
+
+    Returns:
+        int: Number of rows deleted.
+    """
+    total = 0
+    now = timezone.now()
+    while True:
+        ids = list(IdempotencyKey.objects.filter(expires_at__lte=now).values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return total
+        deleted, _ = IdempotencyKey.objects.filter(id__in=ids).delete()
+        total += deleted
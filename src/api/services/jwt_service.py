@@ -7,9 +7,11 @@ Supports both access tokens (short-lived) and refresh tokens (long-lived).
 
 import jwt
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterable, Optional, Tuple, Union
 from django.conf import settings
 
+from .tracing import traced
+
 
 class JWTService:
     """Service for creating and validating JWT tokens."""
@@ -121,6 +123,7 @@ class JWTService:
         }
     
     @classmethod
+    @traced("jwt.validate")
     def validate_token(cls, token: str, expected_type: Optional[str] = None) -> Dict:
         """
         Validate and decode a JWT token.
@@ -176,6 +179,38 @@ class JWTService:
         """
         return cls.validate_token(token, expected_type='access')
     
+    @classmethod
+    @traced("jwt.validate_batch")
+    def validate_access_tokens(cls, tokens: Iterable[str]) -> Dict[str, Union[Dict, Exception]]:
+        """
+        Validate many access tokens in one pass.
+        
+        Each distinct token is verified once, and the key and algorithm
+        are looked up once for the whole batch.
+        
+        Args:
+            tokens: The JWT access tokens to validate
+            
+        Returns:
+            dict: Each token mapped to its decoded payload, or to the
+                exception that rejected it
+        """
+        key = cls._get_secret_key()
+        algorithms = [cls._get_algorithm()]
+        results = {}
+        for token in dict.fromkeys(tokens):
+            try:
+                payload = jwt.decode(token, key, algorithms=algorithms)
+                if payload.get('type') != 'access':
+                    raise ValueError(
+                        f"Invalid token type. Expected 'access', "
+                        f"got '{payload.get('type')}'"
+                    )
+                results[token] = payload
+            except (jwt.InvalidTokenError, ValueError) as e:
+                results[token] = e
+        return results
+    
     @classmethod
     def validate_refresh_token(cls, token: str) -> Dict:
         """
@@ -0,0 +1,176 @@
+"""
+Loan Math
+
+Installment, interest and amortization calculations for fully amortizing
+loans with fixed monthly payments. Every function is vectorized with NumPy:
+a single loan's schedule is computed over all months at once, and the batch
+functions work on whole arrays of loans (e.g. from ``values_list``).
+
+For a principal ``P``, monthly rate ``r`` and tenure ``n`` months:
+
+    installment   A   = P * r / (1 - (1 + r) ** -n)     (P / n when r == 0)
+    balance after k   = P * (1 + r) ** k - A * ((1 + r) ** k - 1) / r
+
+Schedules stop after ``MAX_TENURE_MONTHS`` months, so a loan stored with a
+longer tenure (before the limit existed) cannot blow up their size.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+from django.conf import settings
+
+from api.models.loan_application import MAX_TENURE_MONTHS
+
+
+def get_annual_rate() -> float:
+    """Get the default annual interest rate from settings."""
+    return getattr(settings, "LOAN_ANNUAL_INTEREST_RATE", 0.18)
+
+
+def get_max_debt_to_income() -> float:
+    """Get the maximum installment-to-income ratio used for affordability."""
+    return getattr(settings, "LOAN_MAX_DEBT_TO_INCOME", 0.4)
+
+
+def installments(principals, months, annual_rate: float) -> np.ndarray:
+    """
+    Monthly installment for each loan.
+
+    Args:
+        principals: Loan amounts (scalar or array).
+        months: Tenures in months (scalar or array).
+        annual_rate: Nominal annual interest rate, e.g. 0.18 for 18%.
+
+    Returns:
+        np.ndarray: Installments, one per loan.
+    """
+    principals = np.asarray(principals, dtype=np.float64)
+    months = np.asarray(months, dtype=np.float64)
+    rate = annual_rate / 12
+    if rate == 0:
+        return principals / months
+    return principals * rate / -np.expm1(-months * np.log1p(rate))
+
+
+def balances(principals, installment, months_elapsed, annual_rate: float) -> np.ndarray:
+    """
+    Outstanding balance after ``months_elapsed`` payments (broadcasts).
+    """
+    principals = np.asarray(principals, dtype=np.float64)
+    months_elapsed = np.asarray(months_elapsed, dtype=np.float64)
+    rate = annual_rate / 12
+    if rate == 0:
+        return principals - installment * months_elapsed
+    growth = np.power(1 + rate, months_elapsed)
+    return principals * growth - installment * (growth - 1) / rate
+
+
+def loan_summary(principal: float, months: int, annual_rate: float) -> Dict[str, float]:
+    """
+    Installment, total interest, total payable and the minimum monthly
+    income at which the installment stays within LOAN_MAX_DEBT_TO_INCOME.
+    """
+    installment = float(installments(principal, months, annual_rate))
+    total_payable = installment * months
+    return {
+        "monthly_installment": round(installment, 2),
+        "total_interest": round(total_payable - float(principal), 2),
+        "total_payable": round(total_payable, 2),
+        "required_monthly_income": round(installment / get_max_debt_to_income(), 2),
+    }
+
+
+def amortization_schedule(principal: float, months: int, annual_rate: float) -> List[Dict]:
+    """
+    Full month-by-month schedule for a single loan, for at most
+    ``MAX_TENURE_MONTHS`` months.
+
+    Returns:
+        list: One dict per month with payment, principal, interest and
+            remaining balance.
+    """
+    principal = float(principal)
+    installment = float(installments(principal, months, annual_rate))
+    horizon = min(int(months), MAX_TENURE_MONTHS)
+    period = np.arange(horizon + 1)
+    balance = np.clip(balances(principal, installment, period, annual_rate), 0, None)
+    if horizon == months:
+        balance[-1] = 0.0
+    principal_paid = balance[:-1] - balance[1:]
+    interest = installment - principal_paid
+
+    return [
+        {
+            "month": int(month),
+            "payment": round(principal_part + interest_part, 2),
+            "principal": round(principal_part, 2),
+            "interest": round(interest_part, 2),
+            "balance": round(remaining, 2),
+        }
+        for month, principal_part, interest_part, remaining in zip(
+            period[1:].tolist(), principal_paid.tolist(), interest.tolist(), balance[1:].tolist()
+        )
+    ]
+
+
+def portfolio_schedule(principals, months, annual_rate: float, chunk_size: int = 10000) -> Dict:
+    """
+    Aggregate cash-flow schedule for a batch of loans.
+
+    Schedules are computed as a (loans x months) matrix per chunk, so memory
+    stays bounded at ``chunk_size * max(months)`` values; the schedule stops
+    after ``MAX_TENURE_MONTHS`` months.
+
+    Returns:
+        dict: Portfolio totals and per-month sums of payment, principal,
+            interest and outstanding balance.
+    """
+    principals = np.asarray(principals, dtype=np.float64)
+    months = np.asarray(months, dtype=np.int64)
+    horizon = min(int(months.max()), MAX_TENURE_MONTHS) if months.size else 0
+
+    payment = np.zeros(horizon)
+    principal_paid = np.zeros(horizon)
+    interest = np.zeros(horizon)
+    balance = np.zeros(horizon)
+    all_installments = installments(principals, months, annual_rate) if months.size else np.zeros(0)
+
+    period = np.arange(horizon + 1)
+    for start in range(0, principals.size, chunk_size):
+        p = principals[start:start + chunk_size, None]
+        n = months[start:start + chunk_size, None]
+        a = all_installments[start:start + chunk_size, None]
+
+        chunk_balance = np.clip(balances(p, a, np.minimum(period, n), annual_rate), 0, None)
+        chunk_balance[period >= n] = 0.0
+        chunk_principal = chunk_balance[:, :-1] - chunk_balance[:, 1:]
+        active = period[1:] <= n
+        chunk_payment = np.where(active, a, 0.0)
+
+        payment += chunk_payment.sum(axis=0)
+        principal_paid += chunk_principal.sum(axis=0)
+        interest += (chunk_payment - chunk_principal).sum(axis=0)
+        balance += chunk_balance[:, 1:].sum(axis=0)
+
+    total_payable = float((all_installments * months).sum())
+    return {
+        "loan_count": int(principals.size),
+        "total_principal": round(float(principals.sum()), 2),
+        "total_interest": round(total_payable - float(principals.sum()), 2),
+        "total_payable": round(total_payable, 2),
+        "monthly_installments_total": round(float(all_installments.sum()), 2),
+        "schedule": [
+            {
+                "month": month,
+                "payment": round(pay, 2),
+                "principal": round(prin, 2),
+                "interest": round(intr, 2),
+                "balance": round(bal, 2),
+            }
+            for month, pay, prin, intr, bal in zip(
+                range(1, horizon + 1), payment.tolist(), principal_paid.tolist(),
+                interest.tolist(), balance.tolist()
+            )
+        ],
+    }
@@ -0,0 +1,203 @@
+"""
+Loan Volume Rollups
+
+Maintains daily, weekly and monthly LoanVolumeRollup rows incrementally.
+Each source (LoanApplication for applications and requested amount,
+AdminLog for approvals and rejections) has a RollupWatermark holding the
+highest id already counted; an update only aggregates rows above it, and
+the rollup changes and the new watermark commit together. Every loan shard
+has its own LoanApplication watermark, and every database AdminLog has
+lived in (the main one, then ``AUDIT_DATABASE``) its own AdminLog watermark.
+Rows moved between databases get new ids there and are counted again, so
+``discount_moved_logs`` first takes the ones already counted back out.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from django.db import router, transaction
+from django.db.models import Count, DateField, Max, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from api.models.admin_log import AdminLog
+from api.models.loan_application import LoanApplication, LoanStatus
+from api.models.loan_rollup import LoanVolumeRollup, RollupGranularity, RollupWatermark
+from api.services import loan_shards
+
+TRUNCATORS = {
+    RollupGranularity.DAY: TruncDay,
+    RollupGranularity.WEEK: TruncWeek,
+    RollupGranularity.MONTH: TruncMonth,
+}
+
+# Approximate bucket widths, used to pick a granularity for a date range.
+BUCKET_DAYS = {
+    RollupGranularity.DAY: 1,
+    RollupGranularity.WEEK: 7,
+    RollupGranularity.MONTH: 30,
+}
+
+APPROVED_ACTION = f"{LoanStatus.APPROVED}_LOAN"
+REJECTED_ACTION = f"{LoanStatus.REJECTED}_LOAN"
+
+Deltas = Dict[Tuple[str, date], Dict[str, object]]
+
+
+def _bucket(granularity: str):
+    return TRUNCATORS[granularity]("created_at", output_field=DateField())
+
+
+def _add(deltas: Deltas, granularity: str, bucket: date, field: str, value) -> None:
+    entry = deltas.setdefault((granularity, bucket), {})
+    entry[field] = entry.get(field, 0) + value
+
+
+def _watermark(source: str) -> RollupWatermark:
+    watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(source=source)
+    return watermark
+
+
+def _loan_source(alias: str) -> str:
+    if alias == loan_shards.DIRECTORY_DATABASE:
+        return "loan_application"
+    return f"loan_application@{alias}"
+
+
+def _log_source(alias: str) -> str:
+    if alias == loan_shards.DIRECTORY_DATABASE:
+        return "admin_log"
+    return f"admin_log@{alias}"
+
+
+def _collect_loans(deltas: Deltas, alias: str, after_id: int, up_to_id: int) -> None:
+    loans = LoanApplication.objects.using(alias).filter(id__gt=after_id, id__lte=up_to_id)
+    for granularity in TRUNCATORS:
+        rows = (
+            loans.annotate(bucket=_bucket(granularity))
+            .values("bucket")
+            .annotate(count=Count("id"), amount=Sum("amount"))
+        )
+        for row in rows:
+            _add(deltas, granularity, row["bucket"], "applications", row["count"])
+            _add(deltas, granularity, row["bucket"], "requested_amount", row["amount"] or Decimal("0"))
+
+
+def _collect_decisions(deltas: Deltas, logs, sign: int = 1) -> None:
+    logs = logs.filter(target_model="LoanApplication", action__in=[APPROVED_ACTION, REJECTED_ACTION])
+    for granularity in TRUNCATORS:
+        rows = logs.annotate(bucket=_bucket(granularity)).values("bucket", "action").annotate(count=Count("id"))
+        for row in rows:
+            field = "approvals" if row["action"] == APPROVED_ACTION else "rejections"
+            _add(deltas, granularity, row["bucket"], field, sign * row["count"])
+
+
+def _apply(deltas: Deltas) -> int:
+    if not deltas:
+        return 0
+    existing = {}
+    for granularity in {key[0] for key in deltas}:
+        buckets = [bucket for g, bucket in deltas if g == granularity]
+        for rollup in LoanVolumeRollup.objects.filter(granularity=granularity, bucket_start__in=buckets):
+            existing[(granularity, rollup.bucket_start)] = rollup
+
+    to_create, to_update = [], []
+    for (granularity, bucket), changes in deltas.items():
+        rollup = existing.get((granularity, bucket))
+        if rollup is None:
+            to_create.append(LoanVolumeRollup(granularity=granularity, bucket_start=bucket, **changes))
+            continue
+        for field, value in changes.items():
+            setattr(rollup, field, getattr(rollup, field) + value)
+        to_update.append(rollup)
+
+    LoanVolumeRollup.objects.bulk_create(to_create)
+    LoanVolumeRollup.objects.bulk_update(
+        to_update, ["applications", "approvals", "rejections", "requested_amount"]
+    )
+    return len(to_create) + len(to_update)
+
+
+def update_rollups() -> Dict[str, int]:
+    """
+    Fold rows added since the last run into the rollup tables.
+
+    Returns:
+        dict: Number of new loans and decision logs processed, and the
+            number of rollup buckets written.
+    """
+    with transaction.atomic():
+        logs = AdminLog.objects.using(router.db_for_write(AdminLog))
+        logs_mark = _watermark(_log_source(logs.db))
+        max_log_id = logs.aggregate(max_id=Max("id"))["max_id"] or logs_mark.last_id
+        marks = [(logs_mark, max_log_id)]
+
+        deltas: Deltas = {}
+        for alias in loan_shards.get_shard_aliases():
+            loans_mark = _watermark(_loan_source(alias))
+            loans = LoanApplication.objects.using(alias)
+            max_loan_id = loans.aggregate(max_id=Max("id"))["max_id"] or loans_mark.last_id
+            if max_loan_id > loans_mark.last_id:
+                _collect_loans(deltas, alias, loans_mark.last_id, max_loan_id)
+            marks.append((loans_mark, max_loan_id))
+        if max_log_id > logs_mark.last_id:
+            _collect_decisions(deltas, logs.filter(id__gt=logs_mark.last_id, id__lte=max_log_id))
+        buckets = _apply(deltas)
+
+        daily = [changes for (g, _), changes in deltas.items() if g == RollupGranularity.DAY]
+        stats = {
+            "loans": sum(changes.get("applications", 0) for changes in daily),
+            "decisions": sum(changes.get("approvals", 0) + changes.get("rejections", 0) for changes in daily),
+            "buckets": buckets,
+        }
+        for mark, max_id in marks:
+            if max_id > mark.last_id:
+                mark.last_id = max_id
+                mark.save(update_fields=["last_id", "updated_at"])
+    return stats
+
+
+def discount_moved_logs(alias: str, log_ids: List[int]) -> int:
+    """
+    Take the AdminLog rows ``log_ids`` of ``alias`` that are already counted
+    out of the rollups, because they are being moved to another database
+    and will be counted there again. Call it in the (main database)
+    transaction that deletes them from ``alias``.
+
+    Returns:
+        int: Number of rollup buckets written.
+    """
+    mark = _watermark(_log_source(alias))
+    deltas: Deltas = {}
+    _collect_decisions(deltas, AdminLog.objects.using(alias).filter(id__in=log_ids, id__lte=mark.last_id), sign=-1)
+    return _apply(deltas)
+
+
+def pick_granularity(start: Optional[date], end: Optional[date], max_points: int) -> str:
+    """Return the finest granularity that keeps the range within ``max_points`` buckets."""
+    if start is None or end is None:
+        return RollupGranularity.DAY
+    days = (end - start).days + 1
+    for granularity in (RollupGranularity.DAY, RollupGranularity.WEEK, RollupGranularity.MONTH):
+        if days / BUCKET_DAYS[granularity] <= max_points:
+            return granularity
+    return RollupGranularity.MONTH
+
+
+def bucket_start(granularity: str, day: date) -> date:
+    """Return the start of the bucket containing ``day``."""
+    if granularity == RollupGranularity.WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == RollupGranularity.MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def query_timeseries(granularity: str, start: Optional[date] = None, end: Optional[date] = None) -> List[LoanVolumeRollup]:
+    """Read a series from the rollup table only."""
+    rollups = LoanVolumeRollup.objects.filter(granularity=granularity)
+    if start:
+        rollups = rollups.filter(bucket_start__gte=bucket_start(granularity, start))
+    if end:
+        rollups = rollups.filter(bucket_start__lte=end)
+    return list(rollups.order_by("bucket_start"))
@@ -0,0 +1,155 @@
+"""
+Loan Shards
+
+Loan applications are spread over the databases in ``LOAN_SHARDS`` by a
+hash of their ``user_id``; users and everything else stay on the directory
+database (``default``, which is also shard 0).
+
+Every shard numbers its loans from ``index << SHARD_ID_BITS``, so a loan id
+alone identifies its shard and ids stay unique across shards. With a
+single shard (the default) everything lives on ``default`` as before.
+
+Changing the number of shards moves users between shards; existing loans
+must then be copied to their new shard.
+"""
+
+import heapq
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models import QuerySet
+
+from api.models.loan_application import LoanApplication
+from api.services import read_replicas
+
+DIRECTORY_DATABASE = "default"
+SHARD_ID_BITS = 40
+# Backends ``ensure_id_offset`` can move the loan id sequence on.
+ID_OFFSET_VENDORS = ("sqlite", "postgresql")
+
+
+def get_shard_aliases() -> List[str]:
+    """Get the database aliases holding loan applications, shard 0 first."""
+    return list(getattr(settings, "LOAN_SHARDS", [DIRECTORY_DATABASE]))
+
+
+def is_sharded() -> bool:
+    return len(get_shard_aliases()) > 1
+
+
+def _hash(user_id: int) -> int:
+    # Fibonacci hashing: spreads sequential ids evenly and is the same in every process.
+    return ((user_id * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 32
+
+
+def shard_for_user(user_id: int) -> str:
+    """Return the alias of the shard holding a user's loans."""
+    shards = get_shard_aliases()
+    return shards[_hash(user_id) % len(shards)]
+
+
+def shard_for_loan(loan_id: int) -> Optional[str]:
+    """Return the alias of the shard a loan id was allocated on, or None if there is no such shard."""
+    shards = get_shard_aliases()
+    index = loan_id >> SHARD_ID_BITS
+    return shards[index] if 0 <= index < len(shards) else None
+
+
+def loan_queryset(loan_id: int) -> QuerySet:
+    """Loans with ``loan_id``, read from the shard that owns the id."""
+    alias = shard_for_loan(loan_id)
+    if alias is None:
+        return LoanApplication.objects.none()
+    return LoanApplication.objects.using(alias).filter(id=loan_id)
+
+
+def scatter(build: Callable[[QuerySet], QuerySet]) -> List[QuerySet]:
+    """
+    Apply ``build`` to the loan queryset of every shard, read from a replica
+    of the shard where the request allows it.
+    """
+    return [build(LoanApplication.objects.using(read_replicas.read_alias(alias))) for alias in get_shard_aliases()]
+
+
+def merge_ordered(querysets: List[QuerySet], key: Callable, reverse: bool = False) -> Iterable:
+    """
+    Merge per-shard querysets that are already sorted by ``key``.
+
+    Rows are streamed from each shard, so memory stays bounded by the
+    shards' fetch size. A single queryset is returned unchanged.
+    """
+    if len(querysets) == 1:
+        return querysets[0]
+    return _merge(querysets, key, reverse)
+
+
+def _merge(querysets: List[QuerySet], key: Callable, reverse: bool) -> Iterator:
+    yield from heapq.merge(*(qs.iterator(chunk_size=1000) for qs in querysets), key=key, reverse=reverse)
+
+
+def id_offset(alias: str) -> int:
+    return get_shard_aliases().index(alias) << SHARD_ID_BITS
+
+
+def ensure_id_offset(alias: str) -> None:
+    """
+    Make the loan id sequence of shard ``alias`` start at its offset.
+
+    Idempotent; only moves the sequence forward.
+    """
+    offset = id_offset(alias)
+    if not offset:
+        return
+    connection = connections[alias]
+    table = LoanApplication._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, offset])
+            elif row[0] < offset:
+                cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", [offset, table])
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                f"GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM {connection.ops.quote_name(table)})))",
+                [table, offset],
+            )
+        else:
+            raise ImproperlyConfigured(f"Loan shard {alias} uses {connection.vendor}, which has no loan id offsets")
+
+
+def check_shard_databases(app_configs, **kwargs) -> List[checks.Error]:
+    """System check: every shard after the first must be on a backend with loan id offsets."""
+    errors = []
+    for alias in get_shard_aliases()[1:]:
+        if alias not in connections:
+            errors.append(checks.Error(f"Loan shard {alias} is not in DATABASES", id="api.E001"))
+        elif connections[alias].vendor not in ID_OFFSET_VENDORS:
+            errors.append(checks.Error(
+                f"Loan shard {alias} uses {connections[alias].vendor}; loan id offsets need one of "
+                f"{', '.join(ID_OFFSET_VENDORS)}",
+                id="api.E002",
+            ))
+    return errors
+
+
+def on_post_migrate(sender, using, **kwargs) -> None:
+    """``post_migrate`` receiver setting the id offset of a migrated shard."""
+    if using in get_shard_aliases():
+        ensure_id_offset(using)
+
+
+def on_user_deleted(sender, instance, using, **kwargs) -> None:
+    """
+    ``pre_delete`` receiver for User: delete loans on other shards.
+
+    The ORM cascade only sees the database the user is deleted from.
+    """
+    alias = shard_for_user(instance.id)
+    if alias != using:
+        LoanApplication.objects.using(alias).filter(user_id=instance.id).delete()
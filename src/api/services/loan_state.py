@@ -0,0 +1,313 @@
+"""
+Loan State Machine
+
+Applies loan status transitions as a single conditional UPDATE
+(``UPDATE ... WHERE id = ? AND status IN (<allowed sources>)``), so two
+admins racing on the same loan cannot both win, and a transition costs one
+round trip. Hooks registered for a target status run after a transition
+has applied (e.g. approval emails, audit logging).
+
+The same UPDATE refuses loans another admin holds an unexpired review
+lease on (see ``api.services.review_queue``) and clears the lease of the
+loans it decides.
+
+``transition_many`` decides a batch of loans with one UPDATE per shard and
+runs the hooks once for all of them, so hooks work set-wise (one audit
+insert, one query for the emails) rather than loan by loan.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models.admin_log import AdminLog
+from api.models.loan_application import LoanApplication, LoanStatus
+from api.models.user import User
+from api.services import email_service, loan_shards, review_queue
+from api.services.audit_service import get_audit_writer
+from api.services.event_hub import get_event_hub
+
+# Allowed transitions, keyed by source status.
+TRANSITIONS: Dict[str, set] = {
+    LoanStatus.PENDING: {LoanStatus.APPROVED, LoanStatus.REJECTED},
+    LoanStatus.APPROVED: set(),
+    LoanStatus.REJECTED: set(),
+}
+
+
+class InvalidTransition(ValueError):
+    """Raised when a target status cannot be reached from any status."""
+
+
+class _BatchRaced(Exception):
+    """Some loans of a batch changed between selecting and updating them."""
+
+
+@dataclass
+class TransitionResult:
+    """
+    Outcome of a transition attempt.
+
+    Attributes:
+        loan_id: The loan the transition targeted.
+        to_status: The requested status.
+        applied: Whether this call changed the loan's status.
+        from_status: The status the loan left, when it applied.
+        current_status: The loan's status when it did not apply,
+            or None if the loan does not exist.
+        leased_by: When it did not apply because another admin holds
+            the loan's review lease, that admin's id.
+        details: Extra AdminLog details for the transition.
+        notify: Whether the loan's user is told (approval email).
+    """
+    loan_id: int
+    to_status: str
+    applied: bool
+    from_status: Optional[str] = None
+    current_status: Optional[str] = None
+    leased_by: Optional[int] = None
+    details: Optional[Dict] = None
+    notify: bool = True
+
+    @property
+    def not_found(self) -> bool:
+        return not self.applied and self.current_status is None
+
+
+Hook = Callable[[List[TransitionResult], object, Optional[str]], None]
+
+
+class LoanStateMachine:
+    """Executes declared loan transitions with compare-and-swap updates."""
+
+    def __init__(self, transitions: Dict[str, set]):
+        self.transitions = transitions
+        self._hooks: Dict[Optional[str], List[Hook]] = {}
+
+    def sources_for(self, to_status: str) -> List[str]:
+        """Return the statuses from which ``to_status`` can be reached."""
+        return [source for source, targets in self.transitions.items() if to_status in targets]
+
+    def register_hook(self, to_status: Optional[str] = None) -> Callable[[Hook], Hook]:
+        """
+        Register a post-transition hook for ``to_status`` (or every status).
+
+        Hooks are called as ``hook(results, actor, reason)`` with the
+        applied transitions of one call, inside the caller's transaction;
+        use ``transaction.on_commit`` on the loans' shard for side effects
+        that must not happen on rollback.
+        """
+        def decorator(hook: Hook) -> Hook:
+            self._hooks.setdefault(to_status, []).append(hook)
+            return hook
+        return decorator
+
+    def transition(
+        self,
+        loan_id: int,
+        to_status: str,
+        actor=None,
+        reason: Optional[str] = None,
+        from_status: Optional[str] = None,
+    ) -> TransitionResult:
+        """
+        Move a loan to ``to_status`` if its current status allows it and
+        nobody but ``actor`` holds an unexpired review lease on it.
+
+        Args:
+            loan_id: ID of the loan.
+            to_status: Target status.
+            actor: The user performing the transition, passed to hooks.
+                Their own lease does not block the transition.
+            reason: Optional reason, passed to hooks.
+            from_status: Only apply if the loan is currently in this status.
+
+        Returns:
+            TransitionResult: Whether the transition applied.
+
+        Raises:
+            InvalidTransition: If ``to_status`` is not reachable from
+                ``from_status`` (or from any status).
+        """
+        sources = self._sources(to_status, from_status)
+        now = timezone.now()
+        loans = loan_shards.loan_queryset(loan_id)
+        updated = loans.filter(review_queue.decidable_by(actor, now), status__in=sources).update(
+            status=to_status, lease_owner=None, lease_expires_at=None
+        )
+        if not updated:
+            row = loans.values_list("status", "lease_owner_id", "lease_expires_at").first()
+            if row is None:
+                return TransitionResult(loan_id, to_status, applied=False)
+            current, lease_owner_id, lease_expires_at = row
+            leased = current in sources and lease_expires_at is not None and lease_expires_at > now
+            return TransitionResult(
+                loan_id, to_status, applied=False, current_status=current,
+                leased_by=lease_owner_id if leased else None,
+            )
+
+        result = TransitionResult(
+            loan_id,
+            to_status,
+            applied=True,
+            from_status=sources[0] if len(sources) == 1 else None,
+        )
+        self._run_hooks([result], actor, reason)
+        return result
+
+    def transition_many(
+        self,
+        loan_ids: Iterable[int],
+        to_status: str,
+        actor=None,
+        reason: Optional[str] = None,
+        from_status: Optional[str] = None,
+        where: Optional[Q] = None,
+        details: Optional[Dict] = None,
+        notify: bool = True,
+    ) -> List[TransitionResult]:
+        """
+        Move every loan of ``loan_ids`` that qualifies to ``to_status``, as
+        ``transition`` would one by one, with one UPDATE per shard, then run
+        the hooks once for all of them. Loans that do not qualify (wrong
+        status, leased to someone else, missing) are skipped.
+
+        Args:
+            where: An extra condition the loans must meet, checked by the
+                same UPDATE.
+            details: Extra AdminLog details recorded for every loan.
+            notify: Whether to tell the loans' users (approval emails).
+
+        Returns:
+            List[TransitionResult]: The applied transitions.
+        """
+        sources = self._sources(to_status, from_status)
+        by_shard: Dict[str, List[int]] = {}
+        for loan_id in loan_ids:
+            alias = loan_shards.shard_for_loan(loan_id)
+            if alias is not None:
+                by_shard.setdefault(alias, []).append(loan_id)
+
+        results = []
+        for alias, ids in by_shard.items():
+            while True:
+                try:
+                    rows = self._update_batch(alias, ids, to_status, sources, actor, where)
+                    break
+                except _BatchRaced:
+                    # Someone decided or leased some of them meanwhile: select again.
+                    continue
+            results += [
+                TransitionResult(loan_id, to_status, applied=True, from_status=status, details=details, notify=notify)
+                for loan_id, status in rows
+            ]
+        if results:
+            self._run_hooks(results, actor, reason)
+        return results
+
+    def _update_batch(self, alias: str, ids: List[int], to_status: str, sources: List[str], actor, where):
+        """Select the loans of ``ids`` on a shard that qualify and update exactly those, or raise ``_BatchRaced``."""
+        loans = LoanApplication.objects.using(alias).filter(
+            review_queue.decidable_by(actor, timezone.now()), where or Q(), status__in=sources
+        )
+        with transaction.atomic(using=alias):
+            rows = list(loans.filter(id__in=ids).values_list("id", "status"))
+            updated = loans.filter(id__in=[loan_id for loan_id, _ in rows]).update(
+                status=to_status, lease_owner=None, lease_expires_at=None
+            )
+            if updated != len(rows):
+                raise _BatchRaced()
+        return rows
+
+    def _sources(self, to_status: str, from_status: Optional[str]) -> List[str]:
+        sources = self.sources_for(to_status)
+        if from_status is not None:
+            if from_status not in sources:
+                raise InvalidTransition(f"Cannot move a loan from {from_status} to {to_status}")
+            sources = [from_status]
+        if not sources:
+            raise InvalidTransition(f"No transition leads to {to_status}")
+        return sources
+
+    def _run_hooks(self, results: List[TransitionResult], actor, reason: Optional[str]) -> None:
+        for hook in [*self._hooks.get(results[0].to_status, []), *self._hooks.get(None, [])]:
+            hook(results, actor, reason)
+
+
+loan_state_machine = LoanStateMachine(TRANSITIONS)
+
+
+def transition_loan(loan_id: int, to_status: str, actor=None, reason: Optional[str] = None) -> TransitionResult:
+    """Apply a transition with the default loan state machine."""
+    return loan_state_machine.transition(loan_id, to_status, actor=actor, reason=reason)
+
+
+def _by_shard(results: List[TransitionResult]) -> Dict[str, List[TransitionResult]]:
+    shards: Dict[str, List[TransitionResult]] = {}
+    for result in results:
+        shards.setdefault(loan_shards.shard_for_loan(result.loan_id), []).append(result)
+    return shards
+
+
+@loan_state_machine.register_hook(LoanStatus.APPROVED)
+def _send_approval_emails(results: List[TransitionResult], actor, reason: Optional[str]) -> None:
+    for alias, approved in _by_shard([result for result in results if result.notify]).items():
+        def send(alias=alias, ids=[result.loan_id for result in approved]):
+            loans = list(LoanApplication.objects.using(alias).filter(id__in=ids))
+            # Users live on the directory database.
+            users = User.objects.in_bulk({loan.user_id for loan in loans})
+            for loan in loans:
+                user = users.get(loan.user_id)
+                if user is not None:
+                    email_service.send_loan_approval_email(
+                        user_email=user.email,
+                        user_name=user.full_name,
+                        amount=loan.amount,
+                        tenure=loan.tenure_months
+                    )
+
+        transaction.on_commit(send, using=alias)
+
+
+@loan_state_machine.register_hook()
+def _record_audit_log(results: List[TransitionResult], actor, reason: Optional[str]) -> None:
+    if actor is None:
+        return
+    for alias, decided in _by_shard(results).items():
+        get_audit_writer().record_many(
+            [
+                AdminLog(
+                    admin=actor,
+                    action=f"{result.to_status}_LOAN",
+                    target_model="LoanApplication",
+                    target_id=result.loan_id,
+                    details={**({"reason": reason} if reason else {}), **(result.details or {})},
+                )
+                for result in decided
+            ],
+            using=alias,
+        )
+
+
+@loan_state_machine.register_hook()
+def _publish_status_events(results: List[TransitionResult], actor, reason: Optional[str]) -> None:
+    for alias, changed in _by_shard(results).items():
+        def publish(alias=alias, changed=changed):
+            user_ids = dict(
+                LoanApplication.objects.using(alias)
+                .filter(id__in=[result.loan_id for result in changed])
+                .values_list("id", "user_id")
+            )
+            hub = get_event_hub()
+            for result in changed:
+                if result.loan_id in user_ids:
+                    hub.publish(user_ids[result.loan_id], "loan.status", {
+                        "loan_id": result.loan_id,
+                        "status": result.to_status,
+                        "previous_status": result.from_status,
+                    })
+
+        transaction.on_commit(publish, using=alias)
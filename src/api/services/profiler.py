@@ -0,0 +1,164 @@
+"""
+Request Profiler
+
+Profiles single requests on demand: when an admin sends the
+``X-Profile`` header, or for a ``PROFILING_SAMPLE_RATE`` share of requests.
+A profiled request runs under ``cProfile`` while a background thread samples
+its stack every ``PROFILING_SAMPLE_INTERVAL_MS``. Each capture is written
+to ``PROFILING_DIR`` as:
+
+- ``<id>.pstats``: the cProfile statistics (``python -m pstats``, snakeviz),
+- ``<id>.collapsed``: sampled stacks in collapsed format, one
+  ``frame;frame;frame count`` line per stack (flamegraph.pl, speedscope),
+- ``<id>.json``: route, status, duration and trigger.
+
+Only the newest ``PROFILING_MAX_CAPTURES`` captures are kept. With
+``PROFILING_MODE = "sampler"`` cProfile is skipped and only the stack
+sampler runs, which perturbs timings much less.
+"""
+
+import cProfile
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+CPROFILE = "cprofile"
+SAMPLER = "sampler"
+
+_EXTENSIONS = (".json", ".pstats", ".collapsed")
+
+
+class StackSampler:
+    """Samples the stack of one thread from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Capture:
+    """One profiled request."""
+
+    def __init__(self, mode: str = CPROFILE, interval: float = 0.001):
+        now = time.time()
+        # Sortable by start time, so the spool can list and prune by name.
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))}-{int(now % 1 * 1e6):06d}-{uuid.uuid4().hex[:6]}"
+        self.profile = cProfile.Profile() if mode == CPROFILE else None
+        self.sampler = StackSampler(threading.get_ident(), interval)
+        self.started = 0.0
+        self.duration_ms = 0.0
+
+    def start(self) -> None:
+        self.sampler.start()
+        self.started = time.perf_counter()
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self) -> None:
+        if self.profile is not None:
+            self.profile.disable()
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        self.sampler.stop()
+
+
+class ProfileSpool:
+    """Bounded directory of captures."""
+
+    def __init__(self, path, max_captures: int = 50):
+        self.path = Path(path)
+        self.max_captures = max_captures
+        self._lock = threading.Lock()
+
+    def save(self, capture: Capture, metadata: Dict) -> Dict:
+        self.path.mkdir(parents=True, exist_ok=True)
+        files = {"collapsed": f"{capture.id}.collapsed"}
+        (self.path / files["collapsed"]).write_text(capture.sampler.collapsed(), encoding="utf-8")
+        if capture.profile is not None:
+            files["pstats"] = f"{capture.id}.pstats"
+            capture.profile.dump_stats(self.path / files["pstats"])
+        metadata = {
+            "id": capture.id,
+            **metadata,
+            "duration_ms": round(capture.duration_ms, 3),
+            "samples": capture.sampler.samples,
+            "files": files,
+            "created_at": timezone.now().isoformat(),
+        }
+        # Written last: a capture is listed only once all of its files exist.
+        (self.path / f"{capture.id}.json").write_text(json.dumps(metadata), encoding="utf-8")
+        self._prune()
+        return metadata
+
+    def _prune(self) -> None:
+        with self._lock:
+            captures = sorted(self.path.glob("*.json"))
+            for stale in captures[:-self.max_captures] if self.max_captures else captures:
+                for extension in _EXTENSIONS:
+                    stale.with_suffix(extension).unlink(missing_ok=True)
+
+    def list(self, limit: Optional[int] = None) -> List[Dict]:
+        """Capture metadata, newest first."""
+        if not self.path.exists():
+            return []
+        captures = []
+        for path in sorted(self.path.glob("*.json"), reverse=True)[:limit]:
+            try:
+                captures.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue  # pruned or being written
+        return captures
+
+    def file(self, capture_id: str, kind: str) -> Optional[Path]:
+        """Path of one capture file, or None if there is no such capture."""
+        if kind not in ("pstats", "collapsed") or not capture_id.replace("-", "").isalnum():
+            return None
+        path = self.path / f"{capture_id}.{kind}"
+        return path if path.exists() else None
+
+
+def get_spool() -> ProfileSpool:
+    return ProfileSpool(
+        getattr(settings, "PROFILING_DIR", settings.BASE_DIR / "profiles"),
+        max_captures=getattr(settings, "PROFILING_MAX_CAPTURES", 50),
+    )
+
+
+def should_sample(rate: float) -> bool:
+    return rate > 0 and random.random() < rate
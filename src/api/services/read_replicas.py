@@ -0,0 +1,275 @@
+"""
+Read Replicas
+
+Reads made while serving a GET/HEAD/OPTIONS request go to a replica of the
+database they would otherwise use (``DATABASE_REPLICAS`` maps each primary
+alias to its replicas). Everything else reads from the primary:
+
+- reads outside a request (commands, background threads),
+- reads in requests with other methods, and inside transactions,
+- reads by a user who wrote in the last ``READ_YOUR_WRITES_SECONDS``, so
+  they see their own changes despite replication lag. The marker is kept
+  in the Django cache, which must be shared between worker processes for
+  the pin to hold across them; a system check (api.E006) refuses replicas
+  with a process-local default cache.
+
+Replicas are picked round-robin or by lowest observed query latency
+(``REPLICA_SELECTION``). A replica that cannot be connected to, or fails
+with a connection error, is skipped for ``REPLICA_RETRY_SECONDS``; with no
+replica available, reads fall back to the primary.
+"""
+
+import itertools
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import InterfaceError, OperationalError, connections
+
+from api.cache_backends import is_process_local
+
+ROUND_ROBIN = "round_robin"
+LEAST_LATENCY = "least_latency"
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_MARKER_KEY = "read_replicas:wrote:{}"
+
+
+class ReadContext:
+    """What the router needs to know about the request being served."""
+
+    __slots__ = ("replica_reads", "user_id", "pinned")
+
+    def __init__(self, replica_reads: bool):
+        self.replica_reads = replica_reads
+        self.user_id: Optional[int] = None
+        self.pinned = False
+
+
+_context: ContextVar[Optional[ReadContext]] = ContextVar("read_replicas_context", default=None)
+
+
+def get_replicas() -> Dict[str, List[str]]:
+    """Map of primary alias to its replica aliases."""
+    return getattr(settings, "DATABASE_REPLICAS", {})
+
+
+def primary_of(alias: str) -> str:
+    """The primary a replica alias copies; other aliases are returned unchanged."""
+    for primary, replicas in get_replicas().items():
+        if alias in replicas:
+            return primary
+    return alias
+
+
+def is_replica(alias: str) -> bool:
+    return primary_of(alias) != alias
+
+
+def begin_request(method: str):
+    """Start routing the reads of a request; returns a token for ``end_request``."""
+    return _context.set(ReadContext(replica_reads=method in SAFE_METHODS))
+
+
+def end_request(token) -> None:
+    _context.reset(token)
+
+
+def _window() -> float:
+    return getattr(settings, "READ_YOUR_WRITES_SECONDS", 5)
+
+
+def bind_user(user_id: int) -> None:
+    """
+    Attach the authenticated user to the current request; their reads stay
+    on the primary if they wrote recently.
+    """
+    context = _context.get()
+    if context is None:
+        return
+    context.user_id = user_id
+    if context.replica_reads and cache.get(_MARKER_KEY.format(user_id)):
+        context.pinned = True
+
+
+def check_replica_cache(app_configs, **kwargs) -> List[checks.Error]:
+    """System check: with replicas, the read-your-writes markers need a cache shared by the workers."""
+    if not any(get_replicas().values()) or not is_process_local():
+        return []
+    return [checks.Error(
+        f"Read replicas pin recent writers to the primary through the default cache, which is "
+        f"process-local ({settings.CACHES['default']['BACKEND']}); other workers would serve them stale reads",
+        hint="Use a cache shared by the workers, e.g. CACHE_BACKEND=shared_memory.",
+        id="api.E006",
+    )]
+
+
+def mark_written(user_id: int) -> None:
+    """Pin ``user_id``'s reads to the primary for the read-your-writes window."""
+    cache.set(_MARKER_KEY.format(user_id), 1, timeout=_window())
+
+
+def record_write() -> None:
+    """Called by the router for every write; pins the current user, once per request."""
+    context = _context.get()
+    if context is None:
+        return
+    # Later reads in the same request must see the write.
+    context.replica_reads = False
+    if context.user_id is not None and not context.pinned:
+        context.pinned = True
+        mark_written(context.user_id)
+
+
+def _connectable(alias: str) -> bool:
+    try:
+        connections[alias].ensure_connection()
+    except Exception:
+        return False
+    return True
+
+
+class ReplicaSelector:
+    """Picks a healthy replica and tracks replica latency and failures."""
+
+    def __init__(
+        self,
+        strategy: str = ROUND_ROBIN,
+        retry_seconds: float = 30,
+        check: Callable[[str], bool] = _connectable,
+    ):
+        if strategy not in (ROUND_ROBIN, LEAST_LATENCY):
+            raise ValueError(f"Unknown replica selection strategy: {strategy}")
+        self.strategy = strategy
+        self.retry_seconds = retry_seconds
+        self.check = check
+        self._counter = itertools.count()
+        self._latency_ms: Dict[str, float] = {}
+        self._down_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def is_available(self, alias: str) -> bool:
+        return self._down_until.get(alias, 0.0) <= time.monotonic()
+
+    def choose(self, replicas: List[str]) -> Optional[str]:
+        """Return a reachable replica, or None if none is."""
+        candidates = [alias for alias in replicas if self.is_available(alias)]
+        if not candidates:
+            return None
+        if self.strategy == LEAST_LATENCY:
+            # Replicas without measurements sort first, so every replica gets measured.
+            candidates.sort(key=lambda alias: self._latency_ms.get(alias, 0.0))
+        else:
+            start = next(self._counter) % len(candidates)
+            candidates = candidates[start:] + candidates[:start]
+        for alias in candidates:
+            if self.check(alias):
+                return alias
+            self.mark_down(alias)
+        return None
+
+    def record(self, alias: str, latency_ms: float) -> None:
+        with self._lock:
+            previous = self._latency_ms.get(alias)
+            self._latency_ms[alias] = latency_ms if previous is None else previous + 0.2 * (latency_ms - previous)
+
+    def mark_down(self, alias: str) -> None:
+        with self._lock:
+            self._down_until[alias] = time.monotonic() + self.retry_seconds
+
+    def snapshot(self) -> Dict[str, Dict]:
+        now = time.monotonic()
+        return {
+            alias: {
+                "latency_ewma_ms": round(self._latency_ms.get(alias, 0.0), 3),
+                "available": self._down_until.get(alias, 0.0) <= now,
+            }
+            for replicas in get_replicas().values()
+            for alias in replicas
+        }
+
+
+_selector: Optional[ReplicaSelector] = None
+_selector_lock = threading.Lock()
+
+
+def get_replica_selector() -> ReplicaSelector:
+    """Get the process-wide replica selector."""
+    global _selector
+    if _selector is None:
+        with _selector_lock:
+            if _selector is None:
+                _selector = ReplicaSelector(
+                    strategy=getattr(settings, "REPLICA_SELECTION", ROUND_ROBIN),
+                    retry_seconds=getattr(settings, "REPLICA_RETRY_SECONDS", 30),
+                )
+    return _selector
+
+
+def read_alias(primary: str) -> str:
+    """The database the current context should read ``primary``'s data from."""
+    replicas = get_replicas().get(primary)
+    if not replicas:
+        return primary
+    context = _context.get()
+    if context is None or not context.replica_reads or context.pinned:
+        return primary
+    if connections[primary].in_atomic_block:
+        return primary
+    return get_replica_selector().choose(replicas) or primary
+
+
+class ReplicaMonitor:
+    """Execute wrapper timing replica queries and taking failing replicas out of rotation."""
+
+    def __init__(self, alias: str, selector: ReplicaSelector):
+        self.alias = alias
+        self.selector = selector
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            result = execute(sql, params, many, context)
+        except (OperationalError, InterfaceError):
+            self.selector.mark_down(self.alias)
+            raise
+        self.selector.record(self.alias, (time.perf_counter() - start) * 1000)
+        return result
+
+
+def on_connection_created(sender, connection, **kwargs) -> None:
+    """``connection_created`` receiver monitoring replica connections."""
+    if is_replica(connection.alias):
+        connection.execute_wrappers.append(ReplicaMonitor(connection.alias, get_replica_selector()))
+
+
+def sqlite_path(alias: str) -> str:
+    """Filesystem path of an SQLite database alias, with any ``file:`` URI stripped."""
+    name = str(connections[alias].settings_dict["NAME"])
+    return name.removeprefix("file:").split("?", 1)[0]
+
+
+def copy_to_replica(alias: str) -> None:
+    """
+    Overwrite an SQLite replica with a consistent snapshot of its primary.
+
+    Stands in for replication when developing against local copies.
+    """
+    primary = primary_of(alias)
+    if primary == alias:
+        raise ValueError(f"{alias} is not a replica")
+    if connections[primary].vendor != "sqlite":
+        raise NotImplementedError("Only SQLite replicas can be refreshed by copying")
+    source = sqlite3.connect(sqlite_path(primary))
+    target = sqlite3.connect(sqlite_path(alias))
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
@@ -0,0 +1,153 @@
+"""
+Review Queue
+
+Hands pending loans out to reviewing admins under leases, so concurrent
+reviewers work on different loans instead of colliding on the same ones.
+
+``claim()`` leases the oldest available PENDING loans to an admin until
+``lease_expires_at``; a loan is available when it has no lease or its
+lease has expired, so abandoned leases return to the queue by themselves.
+Loans whose lease expired are handed out before never-leased ones.
+A loan under someone else's unexpired lease cannot be decided (see
+``api.services.loan_state``), and deciding a loan ends its lease.
+
+Every change is a conditional UPDATE (``... WHERE status = 'PENDING' AND
+<lease still available / still ours>``), so two admins claiming at once
+can never lease the same loan, and neither waits on the other beyond its
+single statement. Candidates are found through the
+``(status, lease_expires_at, created_at)`` index: never-leased loans are an
+index range already ordered by ``created_at``, and expired leases a range
+on ``lease_expires_at``.
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from api.models.loan_application import LoanApplication, LoanStatus
+from api.services import loan_shards
+
+# Passes over the shards when some shard ran dry before its quota was met.
+_CLAIM_ROUNDS = 3
+
+
+@dataclass
+class LeaseResult:
+    """
+    Outcome of renewing or releasing a lease.
+
+    Attributes:
+        loan_id: The loan the lease is on.
+        applied: Whether the caller held the lease and it was changed.
+        lease_expires_at: The new expiry, for an applied renewal.
+    """
+    loan_id: int
+    applied: bool
+    lease_expires_at: Optional[datetime] = None
+
+
+def lease_duration(lease_seconds: Optional[int] = None) -> timedelta:
+    return timedelta(seconds=lease_seconds or getattr(settings, "REVIEW_LEASE_SECONDS", 300))
+
+
+def not_leased(now: datetime) -> Q:
+    """Loans without an unexpired lease at ``now``."""
+    return Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+
+
+def available(now: datetime) -> Q:
+    """Pending loans that nobody holds a lease on at ``now``."""
+    return Q(status=LoanStatus.PENDING) & not_leased(now)
+
+
+def decidable_by(admin, now: datetime) -> Q:
+    """Loans on which nobody but ``admin`` holds an unexpired lease at ``now``."""
+    if admin is None:
+        return not_leased(now)
+    return not_leased(now) | Q(lease_owner=admin)
+
+
+def _queues(alias: str, now: datetime) -> List[QuerySet]:
+    """Available loans on a shard in claim order: expired leases, then never-leased loans."""
+    loans = LoanApplication.objects.using(alias).filter(status=LoanStatus.PENDING).order_by("created_at")
+    return [loans.filter(lease_expires_at__lte=now), loans.filter(lease_expires_at__isnull=True)]
+
+
+def _quotas(now: datetime, n: int) -> Dict[str, int]:
+    """How many of the ``n`` best available loans each shard holds."""
+    shards = loan_shards.get_shard_aliases()
+    if len(shards) == 1:
+        return {shards[0]: n}
+    best = sorted(
+        (never_leased, created_at, alias)
+        for alias in shards
+        for never_leased, queue in enumerate(_queues(alias, now))
+        for created_at in queue.values_list("created_at", flat=True)[:n]
+    )[:n]
+    return dict(Counter(alias for _, _, alias in best))
+
+
+def claim(admin, n: int, lease_seconds: Optional[int] = None) -> List[LoanApplication]:
+    """
+    Lease up to ``n`` of the oldest available pending loans to ``admin``.
+
+    Each lease is one ``UPDATE ... WHERE id IN (SELECT id ... ORDER BY
+    created_at LIMIT k)`` per shard and queue that re-checks availability,
+    so the candidates are picked in the same statement that leases them.
+
+    Returns:
+        List[LoanApplication]: The leased loans, oldest first; fewer than
+            ``n`` if the queue runs dry.
+    """
+    now = timezone.now()
+    expires = now + lease_duration(lease_seconds)
+    leased = 0
+    for _ in range(_CLAIM_ROUNDS):
+        quotas = _quotas(now, n - leased)
+        for alias, quota in quotas.items():
+            for queue in _queues(alias, now):
+                if quota:
+                    loans = LoanApplication.objects.using(alias).filter(available(now))
+                    updated = loans.filter(id__in=queue.values("id")[:quota]).update(
+                        lease_owner=admin, lease_expires_at=expires
+                    )
+                    quota -= updated
+                    leased += updated
+        if leased >= n or not quotas or not loan_shards.is_sharded():
+            break
+
+    return sorted(
+        (
+            loan
+            for alias in loan_shards.get_shard_aliases()
+            for loan in LoanApplication.objects.using(alias).filter(
+                status=LoanStatus.PENDING, lease_expires_at=expires, lease_owner=admin
+            )
+        ),
+        key=lambda loan: (loan.created_at, loan.id),
+    )
+
+
+def _held(loan_id: int, admin, now: datetime):
+    return loan_shards.loan_queryset(loan_id).filter(
+        status=LoanStatus.PENDING, lease_owner=admin, lease_expires_at__gt=now
+    )
+
+
+def renew(loan_id: int, admin, lease_seconds: Optional[int] = None) -> LeaseResult:
+    """Extend ``admin``'s unexpired lease on a pending loan."""
+    now = timezone.now()
+    expires = now + lease_duration(lease_seconds)
+    applied = bool(_held(loan_id, admin, now).update(lease_expires_at=expires))
+    return LeaseResult(loan_id, applied, expires if applied else None)
+
+
+def release(loan_id: int, admin) -> LeaseResult:
+    """Return a loan leased by ``admin`` to the queue."""
+    applied = bool(_held(loan_id, admin, timezone.now()).update(lease_owner=None, lease_expires_at=None))
+    return LeaseResult(loan_id, applied)
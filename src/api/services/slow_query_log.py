@@ -0,0 +1,323 @@
+"""
+Slow Query Log
+
+A ``connection.execute_wrapper`` hook, installed on every database
+connection when it is created, that records each query slower than
+``SLOW_QUERY_THRESHOLD_MS``:
+
+- the SQL fingerprint (literals and parameter lists replaced by ``?``),
+- the duration, the route being served and the first application frame
+  that ran the query,
+- the query plan (``EXPLAIN QUERY PLAN`` on SQLite), captured the first
+  time each fingerprint is seen by the process.
+
+Only statements that succeeded are recorded. The plan is captured by a
+background thread on its own connection, so the request that ran the
+query neither waits for it nor has it run inside its transaction; if
+that thread falls more than ``SLOW_QUERY_EXPLAIN_QUEUE`` queries behind,
+entries are written without a plan.
+
+Records are JSON lines in a size-rotated file; ``manage.py slow_queries``
+groups them by fingerprint.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import queue
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+_current_request: ContextVar = ContextVar("slow_query_request", default=None)
+_explaining: ContextVar[bool] = ContextVar("slow_query_explaining", default=False)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Frames from these paths are skipped when looking for the code that ran a query.
+_LIBRARY_MARKERS = ("/django/", "/ninja/", "/pydantic/", "/asgiref/", "/site-packages/", "<frozen")
+# Frames above the middleware belong to the request handler, not to the code that ran the query.
+_MIDDLEWARE_MARKER = "/api/middleware/"
+
+
+def fingerprint(sql: str) -> str:
+    """Normalize SQL so queries differing only in literal values group together."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def fingerprint_id(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def set_request(request):
+    """Set the request whose route is reported for queries in this context; returns a reset token."""
+    return _current_request.set(request)
+
+
+def reset_request(token) -> None:
+    _current_request.reset(token)
+
+
+def _route() -> Optional[str]:
+    request = _current_request.get()
+    if request is None:
+        return None
+    match = getattr(request, "resolver_match", None)
+    if match is not None and match.route:
+        return f"{request.method} /{match.route}"
+    return f"{request.method} {request.path}"
+
+
+def _caller() -> Optional[str]:
+    """
+    Return ``file:line in function`` of the innermost application frame.
+
+    Querysets returned by an endpoint are evaluated later, while Ninja
+    serializes the response; those queries are attributed to the endpoint
+    function instead.
+    """
+    frame = sys._getframe(2)
+    endpoint = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if _MIDDLEWARE_MARKER in filename:
+            break
+        if "/ninja/" in filename and endpoint is None:
+            view_func = getattr(frame.f_locals.get("self"), "view_func", None)
+            if view_func is not None:
+                code = inspect.unwrap(view_func).__code__
+                endpoint = f"{code.co_filename}:{code.co_firstlineno} in {code.co_name} (response serialization)"
+        elif filename != __file__ and not any(marker in filename for marker in _LIBRARY_MARKERS):
+            if filename.startswith(str(settings.BASE_DIR)):
+                return f"{filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return endpoint
+
+
+def plan_warnings(plan: List[str]) -> List[str]:
+    """Plan lines that usually mean a missing index: table scans and temporary sorts."""
+    return [
+        line for line in plan
+        if (line.startswith("SCAN ") and " USING " not in line) or "TEMP B-TREE" in line or line.startswith("Seq Scan")
+    ]
+
+
+class SlowQueryLogger:
+    """Execute wrapper that logs slow queries to a rotating JSONL file."""
+
+    def __init__(self, threshold_ms: float, path, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5, explain: bool = True, max_explained: int = 10000,
+                 explain_queue_size: int = 100):
+        self.threshold_ms = threshold_ms
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.explain = explain
+        self.max_explained = max_explained
+        self._explained = set()
+        self._lock = threading.Lock()
+        self._logger: Optional[logging.Logger] = None
+        self._queue: queue.Queue = queue.Queue(maxsize=explain_queue_size)
+        self._worker: Optional[threading.Thread] = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms >= self.threshold_ms and not _explaining.get():
+            self.record(sql, params, many, context["connection"], duration_ms)
+        return result
+
+    def _get_logger(self) -> logging.Logger:
+        if self._logger is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            logger = logging.getLogger(f"{__name__}.{self.path}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            if not logger.handlers:
+                handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backup_count)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def _first_sighting(self, key: str) -> bool:
+        with self._lock:
+            if key in self._explained:
+                return False
+            if len(self._explained) >= self.max_explained:
+                self._explained.clear()
+            self._explained.add(key)
+            return True
+
+    def _explain(self, alias: str, sql: str, params) -> List[str]:
+        # Runs on the worker thread, so this is the worker's own connection.
+        connection = connections[alias]
+        token = _explaining.set(True)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+                return [str(row[-1]) for row in cursor.fetchall()]
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+        finally:
+            _explaining.reset(token)
+
+    def _run(self) -> None:
+        while True:
+            entry, sql, params = self._queue.get()
+            try:
+                entry["plan"] = self._explain(entry["database"], sql, params)
+                entry["plan_warnings"] = plan_warnings(entry["plan"])
+                self._write(entry)
+            finally:
+                self._queue.task_done()
+                if self._queue.empty():
+                    connections.close_all()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name="slow-query-explain", daemon=True)
+                    self._worker.start()
+
+    def drain(self) -> None:
+        """Wait until every queued plan has been captured and written."""
+        self._queue.join()
+
+    def _write(self, entry: Dict) -> None:
+        self._get_logger().warning(json.dumps(entry, default=str))
+
+    def record(self, sql: str, params, many: bool, connection, duration_ms: float) -> Dict:
+        normalized = fingerprint(sql)
+        entry = {
+            "ts": timezone.now().isoformat(),
+            "fingerprint_id": fingerprint_id(normalized),
+            "fingerprint": normalized,
+            "duration_ms": round(duration_ms, 3),
+            "database": connection.alias,
+            "route": _route(),
+            "caller": _caller(),
+        }
+        is_read = normalized.split(" ", 1)[0].upper() in ("SELECT", "WITH")
+        if self.explain and not many and is_read and self._first_sighting(entry["fingerprint_id"]):
+            self._ensure_worker()
+            try:
+                self._queue.put_nowait((entry, sql, params))
+                return entry
+            except queue.Full:
+                # Let a later occurrence capture the plan.
+                with self._lock:
+                    self._explained.discard(entry["fingerprint_id"])
+        self._write(entry)
+        return entry
+
+
+def install(connection, logger: SlowQueryLogger) -> None:
+    """Add ``logger`` to a connection's execute wrappers once."""
+    if logger not in connection.execute_wrappers:
+        connection.execute_wrappers.append(logger)
+
+
+def on_connection_created(sender, connection, **kwargs) -> None:
+    """``connection_created`` receiver installing the process-wide logger."""
+    if getattr(settings, "SLOW_QUERY_LOG_ENABLED", True):
+        install(connection, get_slow_query_logger())
+
+
+def log_files(path) -> List[Path]:
+    """The log file and its rotated backups, oldest first."""
+    path = Path(path)
+    backups = [p for p in path.parent.glob(f"{path.name}.*") if p.suffix[1:].isdigit()]
+    backups.sort(key=lambda p: -int(p.suffix[1:]))
+    return backups + ([path] if path.exists() else [])
+
+
+def summarize(path) -> List[Dict]:
+    """
+    Group logged slow queries by fingerprint.
+
+    Returns:
+        list: One dict per fingerprint with count, total/avg/max duration,
+            the routes and callers seen, and the captured plan.
+    """
+    groups: Dict[str, Dict] = {}
+    for file in log_files(path):
+        with open(file, encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                group = groups.get(entry["fingerprint_id"])
+                if group is None:
+                    group = groups[entry["fingerprint_id"]] = {
+                        "fingerprint_id": entry["fingerprint_id"],
+                        "fingerprint": entry["fingerprint"],
+                        "count": 0,
+                        "total_ms": 0.0,
+                        "max_ms": 0.0,
+                        "routes": defaultdict(int),
+                        "callers": defaultdict(int),
+                        "plan": None,
+                        "plan_warnings": [],
+                        "last_seen": None,
+                    }
+                group["count"] += 1
+                group["total_ms"] += entry["duration_ms"]
+                group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+                group["routes"][entry.get("route") or "-"] += 1
+                group["callers"][entry.get("caller") or "-"] += 1
+                group["last_seen"] = entry.get("ts")
+                if entry.get("plan") is not None:
+                    group["plan"] = entry["plan"]
+                    group["plan_warnings"] = entry.get("plan_warnings", [])
+
+    result = []
+    for group in groups.values():
+        group["avg_ms"] = group["total_ms"] / group["count"]
+        group["routes"] = dict(sorted(group["routes"].items(), key=lambda item: -item[1]))
+        group["callers"] = dict(sorted(group["callers"].items(), key=lambda item: -item[1]))
+        result.append(group)
+    return result
+
+
+_logger: Optional[SlowQueryLogger] = None
+_logger_lock = threading.Lock()
+
+
+def get_slow_query_logger() -> SlowQueryLogger:
+    """Return the process-wide slow query logger configured from settings."""
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                _logger = SlowQueryLogger(
+                    threshold_ms=getattr(settings, "SLOW_QUERY_THRESHOLD_MS", 100),
+                    path=getattr(settings, "SLOW_QUERY_LOG_FILE", settings.BASE_DIR / "logs" / "slow_queries.jsonl"),
+                    max_bytes=getattr(settings, "SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024),
+                    backup_count=getattr(settings, "SLOW_QUERY_LOG_BACKUP_COUNT", 5),
+                    explain=getattr(settings, "SLOW_QUERY_EXPLAIN", True),
+                    explain_queue_size=getattr(settings, "SLOW_QUERY_EXPLAIN_QUEUE", 100),
+                )
+    return _logger
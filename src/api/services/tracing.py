@@ -0,0 +1,256 @@
+"""
+Request Tracing
+
+A small, dependency-free span API. The current trace and span live in
+context variables, so they follow the request across threads started with
+``sync_to_async`` and across ``await`` points.
+
+A request picked by head-based sampling (``TRACING_SAMPLE_RATE``) records
+all of its spans in memory (bounded by ``max_spans``) and is exported when
+it finishes. Other requests only time their root span, which is exported
+on its own if it took at least ``TRACING_SLOW_THRESHOLD_MS``: they build
+no child spans, and code running in them (or outside any trace) pays one
+context variable lookup per ``span()``/``@traced`` call.
+
+Exported traces are JSON lines in the OTLP/JSON shape
+(``resourceSpans`` -> ``scopeSpans`` -> ``spans``), written to a size-rotated
+local file.
+"""
+
+import functools
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], kind: int, attributes: Dict):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = STATUS_UNSET
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class Trace:
+    """All spans of one request."""
+
+    def __init__(self, sampled: bool, max_spans: int):
+        self.trace_id = os.urandom(16).hex()
+        self.sampled = sampled
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+
+    def add(self, span: Span) -> bool:
+        if len(self.spans) >= self.max_spans:
+            self.dropped_spans += 1
+            return False
+        self.spans.append(span)
+        return True
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(name: str, sampled: bool, max_spans: int = 256, kind: int = SPAN_KIND_SERVER, **attributes):
+    """
+    Start a new trace with a root span; yields the root span.
+
+    The caller decides what to do with the finished trace (see
+    ``TraceExporter``); ``root.trace`` holds every recorded span. An
+    unsampled trace is not made current, so it only records the root.
+    """
+    trace = Trace(sampled, max_spans)
+    root = Span(trace, name, None, kind, attributes)
+    trace.add(root)
+    if sampled:
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException:
+        root.status = STATUS_ERROR
+        raise
+    finally:
+        root.end()
+        if sampled:
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """
+    Record a child span of the current span. Yields None outside a trace.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    child = Span(trace, name, parent.span_id if parent else None, kind, attributes)
+    if not trace.add(child):
+        yield None
+        return
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.status = STATUS_ERROR
+        child.attributes["exception.type"] = type(e).__name__
+        raise
+    finally:
+        child.end()
+        _current_span.reset(token)
+
+
+def traced(name: Optional[str] = None, kind: int = SPAN_KIND_INTERNAL):
+    """
+    Decorator recording a span around each call of the function.
+
+    Calls made outside a trace go straight to the function.
+    """
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name, kind=kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def db_span_wrapper(vendor: str, max_statement_length: int = 1000):
+    """
+    Return a ``connection.execute_wrapper`` hook recording a span per query.
+    """
+    def wrapper(execute, sql, params, many, context):
+        if _current_trace.get() is None:
+            return execute(sql, params, many, context)
+        with span("db.query", kind=SPAN_KIND_CLIENT, **{
+            "db.system": vendor,
+            "db.statement": sql[:max_statement_length],
+            "db.executemany": many,
+        }):
+            return execute(sql, params, many, context)
+    return wrapper
+
+
+def should_sample(rate: float) -> bool:
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+def _attribute(key: str, value) -> Dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def to_otlp(trace: Trace, service_name: str) -> Dict:
+    """Convert a trace to an OTLP/JSON ``ExportTraceServiceRequest``."""
+    spans = []
+    for recorded in trace.spans:
+        item = {
+            "traceId": trace.trace_id,
+            "spanId": recorded.span_id,
+            "name": recorded.name,
+            "kind": recorded.kind,
+            "startTimeUnixNano": str(recorded.start_ns),
+            "endTimeUnixNano": str(recorded.end_ns or recorded.start_ns),
+            "attributes": [_attribute(key, value) for key, value in recorded.attributes.items()],
+            "status": {"code": recorded.status},
+        }
+        if recorded.parent_id:
+            item["parentSpanId"] = recorded.parent_id
+        spans.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }]
+    }
+
+
+class TraceExporter:
+    """Decides whether a finished trace is kept and appends it to a rotating JSONL file."""
+
+    def __init__(self, path, slow_threshold_ms: float, service_name: str,
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        self.path = Path(path)
+        self.slow_threshold_ms = slow_threshold_ms
+        self.service_name = service_name
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._logger: Optional[logging.Logger] = None
+
+    def _get_logger(self) -> logging.Logger:
+        if self._logger is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            logger = logging.getLogger(f"{__name__}.export.{self.path}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            if not logger.handlers:
+                handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backup_count)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def finish(self, root: Span) -> bool:
+        """Export the trace of ``root`` if it was sampled or slow. Returns whether it was exported."""
+        trace = root.trace
+        slow = root.duration_ms >= self.slow_threshold_ms
+        if not (trace.sampled or slow):
+            return False
+        root.set_attribute("sampling.reason", "head" if trace.sampled else "slow")
+        if trace.dropped_spans:
+            root.set_attribute("tracing.dropped_spans", trace.dropped_spans)
+        self._get_logger().info(json.dumps(to_otlp(trace, self.service_name), separators=(",", ":")))
+        return True
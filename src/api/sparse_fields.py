@@ -0,0 +1,62 @@
+"""
+Sparse Fieldsets
+
+``?fields=id,amount,status`` on a list or detail route returns only those
+fields: the route reads just their columns with ``values()`` and
+serializes rows with a schema derived from the route's response schema,
+restricted to the requested fields. Derived schemas are cached per field
+set, so each combination is built once per process.
+
+Without ``fields`` a route responds with its full schema as before.
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple, Type
+
+from django.http import HttpResponse
+from ninja import Query, Schema
+from ninja.errors import HttpError
+from pydantic import create_model
+
+
+def fields_query():
+    """The ``fields`` query parameter, for route signatures."""
+    return Query(None, description="Comma-separated response fields to return, e.g. id,amount,status")
+
+
+def parse_fields(schema: Type[Schema], fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    The requested fields in schema order, or None for the full schema.
+
+    Raises:
+        HttpError: 400 if a field is not in ``schema``.
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - schema.model_fields.keys()
+    if unknown or not requested:
+        raise HttpError(400, f"Unknown fields: {', '.join(sorted(unknown)) or '(none given)'}")
+    return tuple(name for name in schema.model_fields if name in requested)
+
+
+@lru_cache(maxsize=256)
+def subset_schema(schema: Type[Schema], fields: Tuple[str, ...]) -> Type[Schema]:
+    """``schema`` restricted to ``fields``."""
+    return create_model(
+        f"{schema.__name__}_{'_'.join(fields)}",
+        __base__=Schema,
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields},
+    )
+
+
+def render(request, schema: Type[Schema], fields: Tuple[str, ...], rows: Iterable[Dict], many: bool = True) -> HttpResponse:
+    """Serialize ``values()`` rows with the ``fields`` subset of ``schema``."""
+    from api.urls import api
+
+    subset = subset_schema(schema, fields)
+    if many:
+        data = [subset.model_validate(row).model_dump() for row in rows]
+    else:
+        data = subset.model_validate(rows).model_dump()
+    return api.create_response(request, data, status=200)
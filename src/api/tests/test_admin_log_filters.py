@@ -0,0 +1,88 @@
+import tempfile
+from datetime import date, timedelta
+from django.test import TestCase, Client, override_settings
+from django.utils import timezone
+from api.models.user import User
+from api.models.admin_log import AdminLog
+from api.services.audit_archive import AdminLogArchive
+from api.services.audit_service import AdminLogFilter
+from api.services.jwt_service import JWTService
+
+
+class AdminLogFilterTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", password="password")
+        self.admin.is_staff = True
+        self.admin.save()
+        self.other = User.objects.create_user(email="other@example.com", password="password")
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {JWTService.create_access_token(self.admin.id, self.admin.email)}"}
+
+        now = timezone.now()
+        for admin, action, target_id, reason, days_ago in [
+            (self.admin, "REJECTED_LOAN", 1, "Income too low", 1),
+            (self.admin, "REJECTED_LOAN", 2, "Incomplete documents", 10),
+            (self.admin, "APPROVED_LOAN", 3, "Looks good", 2),
+            (self.other, "REJECTED_LOAN", 4, "income too low", 3),
+            (self.other, "APPROVED_LOAN", 1, None, 4),
+        ]:
+            AdminLog.objects.create(
+                admin=admin,
+                action=action,
+                target_id=target_id,
+                target_model="LoanApplication",
+                details={"reason": reason} if reason else {},
+                created_at=now - timedelta(days=days_ago),
+            )
+
+    def _targets(self, **params):
+        response = Client().get("/api/admin/logs", params, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        return [entry["target_id"] for entry in response.json()]
+
+    def test_filters(self):
+        start = (timezone.now() - timedelta(days=5)).isoformat()
+        self.assertEqual(self._targets(admin_id=self.admin.id, action="REJECTED_LOAN", start=start), [1])
+        self.assertEqual(self._targets(action="APPROVED_LOAN"), [3, 1])
+        self.assertEqual(self._targets(target_model="LoanApplication", target_id=1), [1, 1])
+        self.assertEqual(self._targets(reason="INCOME"), [1, 4])
+        self.assertEqual(self._targets(reason="inc"), [1, 4, 2])
+        self.assertEqual(self._targets(admin_id=self.other.id), [4, 1])
+
+    def test_details_are_returned_as_json(self):
+        response = Client().get("/api/admin/logs", {"target_id": 3}, **self.headers)
+        self.assertEqual(response.json()[0]["details"], {"reason": "Looks good"})
+
+    def test_filters_are_index_driven(self):
+        now = timezone.now()
+        cases = {
+            "adminlog_admin_action_created": AdminLogFilter(admin_id=1, action="REJECTED_LOAN", start=now),
+            "adminlog_admin_created": AdminLogFilter(admin_id=1, start=now),
+            "adminlog_action_created": AdminLogFilter(action="REJECTED_LOAN", start=now),
+            "adminlog_target_created": AdminLogFilter(target_model="LoanApplication", target_id=7),
+            "adminlog_reason_created": AdminLogFilter(reason="income"),
+            "adminlog_created": AdminLogFilter(start=now),
+        }
+        for index, filters in cases.items():
+            with self.subTest(index=index):
+                plan = filters.apply(AdminLog.objects.all()).order_by("-created_at").explain()
+                self.assertIn(f"USING INDEX {index}", plan)
+                if index != "adminlog_reason_created":
+                    # Equality filters leave the index in created_at order; a
+                    # reason prefix only sorts the entries it matched.
+                    self.assertNotIn("USE TEMP B-TREE", plan)
+
+    def test_archived_entries_with_text_details_are_filtered(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(AUDIT_ARCHIVE_DIR=root):
+            created_at = (timezone.now() - timedelta(days=400)).isoformat()
+            AdminLogArchive(root).write_partition(date.fromisoformat(created_at[:10]), [
+                {"id": 100, "admin_id": self.admin.id, "action": "REJECTED_LOAN", "target_id": 9,
+                 "target_model": "LoanApplication", "details": '{"reason": "Income unverifiable"}',
+                 "created_at": created_at},
+                {"id": 101, "admin_id": self.admin.id, "action": "REJECTED_LOAN", "target_id": 10,
+                 "target_model": "LoanApplication", "details": "", "created_at": created_at},
+            ])
+            start = (timezone.now() - timedelta(days=500)).isoformat()
+            self.assertEqual(self._targets(start=start, reason="income"), [1, 4, 9])
+            self.assertEqual(self._targets(start=start, target_id=10), [10])
@@ -1,12 +1,15 @@
 from django.test import TestCase, Client
 from unittest.mock import patch
 from api.models.user import User
-from api.models.loan_application import LoanApplication, LoanStatus
+from api.models.loan_application import LoanStatus
 from api.models.admin_log import AdminLog
+from api.services.audit_service import AuditLogWriter
 from api.services.jwt_service import JWTService
 import json
 
 class AdminRoutesTests(TestCase):
+    databases = "__all__"
+
     def setUp(self):
         self.client = Client()
         self.admin = User.objects.create_user(email="admin@example.com", password="password")
@@ -16,8 +19,8 @@ class AdminRoutesTests(TestCase):
         self.headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
         
         self.user = User.objects.create_user(email="user@example.com", password="password")
-        self.loan = LoanApplication.objects.create(
-            user=self.user, amount=1000, tenure_months=12, purpose="Test"
+        self.loan = self.user.loan_applications.create(
+            amount=1000, tenure_months=12, purpose="Test"
         )
         self.admin_loans_url = "/api/admin/loans"
 
@@ -31,12 +34,14 @@ class AdminRoutesTests(TestCase):
         url = f"/api/admin/loans/{self.loan.id}/status"
         payload = {"status": "APPROVED", "reason": "Looks good"}
         
-        response = self.client.put(
-            url,
-            data=json.dumps(payload),
-            content_type="application/json",
-            **self.headers
-        )
+        # The audit entry may be written once the loan's shard commits.
+        with self.captureOnCommitCallbacks(using=self.loan._state.db, execute=True):
+            response = self.client.put(
+                url,
+                data=json.dumps(payload),
+                content_type="application/json",
+                **self.headers
+            )
         
         self.assertEqual(response.status_code, 200)
         self.loan.refresh_from_db()
@@ -46,3 +51,14 @@ class AdminRoutesTests(TestCase):
         
         # Verify Log Created
         self.assertTrue(AdminLog.objects.filter(target_id=self.loan.id, action="APPROVED_LOAN").exists())
+
+    def test_audit_log_metrics(self):
+        writer = AuditLogWriter(mode="buffered", max_buffer=500)
+        writer._spilled, writer._dropped = 3, 2
+        with patch("api.routers.admin.routes.get_audit_writer", return_value=writer):
+            response = self.client.get("/api/admin/logs/metrics", **self.headers)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["mode"], "buffered")
+        self.assertEqual((data["max_buffer"], data["spilled_entries"], data["dropped_entries"]), (500, 3, 2))
@@ -0,0 +1,99 @@
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.utils import timezone
+from api.models.user import User
+from api.models.admin_log import AdminLog
+from api.services import audit_archive
+from api.services.audit_archive import AdminLogArchive, archive_admin_logs
+from api.services.jwt_service import JWTService
+
+
+class AdminLogArchiveTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.archive = AdminLogArchive(self.tmp.name)
+        self.admin = User.objects.create_user(email="admin@example.com", password="password")
+        self.admin.is_staff = True
+        self.admin.save()
+
+        now = timezone.now()
+        for days_ago in (200, 150, 120, 5):
+            AdminLog.objects.create(
+                admin=self.admin,
+                action="APPROVED_LOAN",
+                target_id=days_ago,
+                target_model="LoanApplication",
+                created_at=now - timedelta(days=days_ago),
+            )
+
+    def test_archives_old_rows_and_queries_them_by_range(self):
+        stats = archive_admin_logs(older_than_days=90, chunk_size=2, archive=self.archive)
+
+        self.assertEqual(stats["archived"], 3)
+        self.assertEqual(stats["chunks"], 2)
+        self.assertEqual(list(AdminLog.objects.values_list("target_id", flat=True)), [5])
+
+        now = timezone.now()
+        rows = list(self.archive.query(now - timedelta(days=160), now - timedelta(days=100)))
+        self.assertEqual([row["target_id"] for row in rows], [150, 120])
+        self.assertEqual(len(list(self.archive.partitions())), 3)
+        self.assertIsNone(self.archive.load_progress())
+
+    def test_interrupted_run_resumes_without_duplicates(self):
+        original = audit_archive._delete_chunk
+        calls = []
+
+        def crash_once(progress):
+            calls.append(progress)
+            if len(calls) == 1:
+                raise RuntimeError("crash")
+            return original(progress)
+
+        with patch.object(audit_archive, "_delete_chunk", crash_once):
+            with self.assertRaises(RuntimeError):
+                archive_admin_logs(older_than_days=90, chunk_size=2, archive=self.archive)
+            self.assertIsNotNone(self.archive.load_progress()["pending"])
+            archive_admin_logs(older_than_days=90, chunk_size=2, archive=self.archive)
+
+        archived_ids = [row["target_id"] for row in self.archive.query()]
+        self.assertEqual(sorted(archived_ids), [120, 150, 200])
+        self.assertEqual(AdminLog.objects.count(), 1)
+
+    def test_command_and_logs_endpoint_merge_archive(self):
+        with override_settings(AUDIT_ARCHIVE_DIR=self.tmp.name):
+            call_command("archive_admin_logs", "--older-than-days", "90", stdout=open("/dev/null", "w"))
+            token = JWTService.create_access_token(self.admin.id, self.admin.email)
+            start = (timezone.now() - timedelta(days=365)).isoformat()
+            response = Client().get(
+                "/api/admin/logs", {"start": start}, HTTP_AUTHORIZATION=f"Bearer {token}"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([log["target_id"] for log in response.json()], [5, 120, 150, 200])
+
+    def test_endpoint_merges_rows_archived_inside_the_retention_window(self):
+        # Archived with a shorter cutoff than AUDIT_LOG_RETENTION_DAYS (90).
+        now = timezone.now()
+        AdminLog.objects.create(admin=self.admin, action="APPROVED_LOAN", target_id=30,
+                                target_model="LoanApplication", created_at=now - timedelta(days=30))
+        with override_settings(AUDIT_ARCHIVE_DIR=self.tmp.name):
+            archive_admin_logs(older_than_days=10, chunk_size=2, archive=self.archive)
+            token = JWTService.create_access_token(self.admin.id, self.admin.email)
+            response = Client().get(
+                "/api/admin/logs", {"start": (now - timedelta(days=60)).isoformat()},
+                HTTP_AUTHORIZATION=f"Bearer {token}",
+            )
+
+        self.assertEqual(AdminLog.objects.count(), 1)
+        self.assertEqual([log["target_id"] for log in response.json()], [5, 30])
+
+    def test_newest_first_query_is_ordered_across_parts(self):
+        archive_admin_logs(older_than_days=90, chunk_size=2, archive=self.archive)
+        self.assertEqual(self.archive.newest_created_at(), max(row["created_at"] for row in self.archive.query()))
+        self.assertEqual([row["target_id"] for row in self.archive.query(newest_first=True)], [120, 150, 200])
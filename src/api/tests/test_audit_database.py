@@ -0,0 +1,260 @@
+import json
+import tempfile
+import time
+import unittest
+from datetime import datetime, timezone
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from api.db_routers import AuditRouter
+from api.models.admin_log import AdminLog
+from api.models.loan_application import LoanApplication, LoanStatus
+from api.models.loan_rollup import LoanVolumeRollup
+from api.models.user import User
+from api.services import auto_decision
+from api.services.audit_journal import AuditJournal
+from api.services.loan_rollups import update_rollups
+from api.services.audit_service import AFTER_COMMIT, AuditLogWriter, audit_database, get_audit_writer
+
+
+class AuditJournalTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "journal.jsonl"
+        self.journal = AuditJournal(self.path, grace_seconds=0)
+        self.admin = User.objects.create_user(email="auditor@example.com", password="password")
+
+    def entry(self, target_id=1):
+        return AdminLog(admin=self.admin, action="APPROVED_LOAN", target_model="LoanApplication",
+                        target_id=target_id, details={"reason": "ok"})
+
+    def test_after_commit_writer_journals_then_marks_done(self):
+        writer = AuditLogWriter(mode=AFTER_COMMIT, journal=self.journal)
+        with self.captureOnCommitCallbacks(execute=True):
+            writer.record(self.admin, "APPROVED_LOAN", "LoanApplication", 7)
+            self.assertFalse(AdminLog.objects.exists())
+
+        self.assertTrue(AdminLog.objects.filter(target_id=7).exists())
+        self.assertEqual(self.journal.pending(), [])
+        self.assertEqual(writer.metrics()["entries_written"], 1)
+
+    def test_failed_write_is_recovered_once(self):
+        writer = AuditLogWriter(mode=AFTER_COMMIT, journal=self.journal)
+        with patch.object(AdminLog.objects, "bulk_create", side_effect=DatabaseError("audit database is down")), \
+                self.assertLogs("api.services.audit_service", "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                writer.record(self.admin, "REJECTED_LOAN", "LoanApplication", 3, details={"reason": "income"})
+
+        self.assertFalse(AdminLog.objects.exists())
+        self.assertEqual(writer.metrics()["failed_flushes"], 1)
+        [pending] = self.journal.pending()
+        self.assertEqual(pending["entry"]["target_id"], 3)
+
+        self.assertEqual(self.journal.recover(), {"written": 1, "present": 0, "failed": 0, "deferred": 0})
+        self.assertEqual(self.journal.recover()["written"], 0)
+        entry = AdminLog.objects.get()
+        self.assertEqual((entry.admin_id, entry.action, entry.details), (self.admin.id, "REJECTED_LOAN", {"reason": "income"}))
+
+    def test_recover_skips_entries_that_reached_the_database(self):
+        entry = self.entry()
+        self.journal.append(entry)
+        entry.save()
+
+        self.assertEqual(self.journal.recover()["present"], 1)
+        self.assertEqual(AdminLog.objects.count(), 1)
+        self.assertEqual(self.journal.pending(), [])
+
+    def test_recent_entries_are_left_for_their_writer(self):
+        self.journal.grace_seconds = 60
+        self.journal.append(self.entry())
+
+        self.assertEqual(self.journal.recover()["deferred"], 1)
+        self.assertFalse(AdminLog.objects.exists())
+        self.assertEqual(len(self.journal.pending()), 1)
+
+    def test_compaction_keeps_only_pending_entries(self):
+        keys = [self.journal.append(self.entry(target_id)) for target_id in range(10)]
+        for key in keys[:-1]:
+            self.journal.mark_done(key)
+        with open(self.path, "ab") as f:
+            f.write(b'{"key": "torn')
+
+        self.assertEqual(self.journal.compact(), 1)
+        lines = self.path.read_text().splitlines()
+        self.assertEqual([json.loads(line)["key"] for line in lines], keys[-1:])
+
+    def test_mark_done_compacts_past_the_threshold(self):
+        self.journal._compact_at = 0
+        self.journal.mark_done(self.journal.append(self.entry()))
+        self.assertEqual(self.path.stat().st_size, 0)
+
+    def test_works_without_fcntl(self):
+        with patch("api.services.audit_journal.fcntl", None):
+            key = self.journal.append(self.entry())
+            self.assertEqual([record["key"] for record in self.journal.pending()], [key])
+            self.journal.mark_done(key)
+            self.assertEqual(self.journal.compact(), 0)
+
+    def test_recover_command(self):
+        self.journal.append(self.entry())
+        out = StringIO()
+        with override_settings(AUDIT_JOURNAL_PATH=self.path):
+            call_command("recover_audit_journal", grace_seconds=0, stdout=out)
+        self.assertIn("Wrote 1 entries", out.getvalue())
+        self.assertTrue(AdminLog.objects.exists())
+
+
+class AuditRouterTests(TestCase):
+    router = AuditRouter()
+
+    def test_inactive_without_an_audit_database(self):
+        with override_settings(AUDIT_DATABASE=None):
+            self.assertIsNone(self.router.db_for_write(AdminLog))
+            self.assertIsNone(self.router.allow_migrate("default", "api", model_name="adminlog"))
+
+    @override_settings(AUDIT_DATABASE="audit")
+    def test_routes_admin_log_to_the_audit_database(self):
+        self.assertEqual(self.router.db_for_read(AdminLog), "audit")
+        self.assertEqual(self.router.db_for_write(AdminLog), "audit")
+        # The admin of an entry is looked up on the directory database.
+        self.assertEqual(self.router.db_for_read(User, instance=AdminLog()), "default")
+        self.assertIsNone(self.router.db_for_write(User))
+
+    @override_settings(AUDIT_DATABASE="audit")
+    def test_migrates_only_admin_log_on_the_audit_database(self):
+        self.assertTrue(self.router.allow_migrate("audit", "api", model_name="adminlog"))
+        self.assertFalse(self.router.allow_migrate("audit", "api", model_name="user"))
+        self.assertFalse(self.router.allow_migrate("audit", "auth", model_name="permission"))
+        self.assertFalse(self.router.allow_migrate("default", "api", model_name="adminlog"))
+        self.assertIsNone(self.router.allow_migrate("default", "api", model_name="user"))
+
+
+class AuditUserDeletionTests(TestCase):
+    databases = "__all__"
+
+    def test_deleting_a_user_deletes_their_entries(self):
+        admin = User.objects.create_user(email="gone@example.com", password="password")
+        AdminLog.objects.create(admin=admin, action="APPROVED_LOAN", target_model="LoanApplication", target_id=1)
+
+        admin.delete()
+        self.assertFalse(AdminLog.objects.exists())
+
+
+@unittest.skipUnless("audit" in settings.DATABASES, "AUDIT_DATABASE_PATH is not set")
+class AuditDatabaseTests(TestCase):
+    databases = "__all__"
+
+    def test_entries_are_written_to_the_audit_database(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        writer = AuditLogWriter(mode=AFTER_COMMIT, journal=AuditJournal(Path(tmp.name) / "journal.jsonl"))
+        admin = User.objects.create_user(email="auditor@example.com", password="password")
+        with self.captureOnCommitCallbacks(execute=True):
+            writer.record(admin, "APPROVED_LOAN", "LoanApplication", 1)
+
+        self.assertEqual(audit_database(), "audit")
+        entry = AdminLog.objects.using("audit").get()
+        self.assertEqual(entry.admin, admin)
+        self.assertLess(time.time() - entry.created_at.timestamp(), 60)
+
+    @override_settings(LOAN_DECISION_RULES=[{"name": "approve_small", "decision": "APPROVED", "max_amount": 5000}])
+    def test_auto_decisions_are_journaled_and_written_after_commit(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        journal = AuditJournal(Path(tmp.name) / "journal.jsonl")
+        user = User.objects.create_user(email="borrower@example.com", password="password")
+        loan = user.loan_applications.create(amount=1000, tenure_months=6, purpose="test")
+
+        writer = get_audit_writer()
+        self.assertEqual(writer.mode, AFTER_COMMIT)
+        with patch.object(writer, "journal", journal), \
+                patch.object(journal, "append_many", wraps=journal.append_many) as append_many:
+            with self.captureOnCommitCallbacks(using=loan._state.db, execute=True):
+                auto_decision.apply(auto_decision.get_rules())
+                self.assertFalse(AdminLog.objects.using("audit").exists())
+
+        append_many.assert_called_once()
+        entry = AdminLog.objects.using("audit").get()
+        self.assertEqual((entry.target_id, entry.action), (loan.id, f"{LoanStatus.APPROVED}_LOAN"))
+        self.assertEqual(journal.pending(), [])
+
+
+class MoveAdminLogsCommandTests(TestCase):
+    @override_settings(AUDIT_DATABASE=None)
+    def test_requires_an_audit_database(self):
+        with self.assertRaises(CommandError):
+            call_command("move_admin_logs", stdout=StringIO())
+
+
+@unittest.skipUnless("audit" in settings.DATABASES, "AUDIT_DATABASE_PATH is not set")
+class MoveAdminLogsTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        # A deployment that wrote AdminLog to the main database before
+        # AUDIT_DATABASE_PATH was set.
+        with connections["default"].schema_editor() as editor:
+            editor.create_model(AdminLog)
+        self.addCleanup(self._drop_table)
+        self.admin = User.objects.create_user(email="auditor@example.com", password="password")
+
+    def _drop_table(self):
+        with connections["default"].schema_editor() as editor:
+            editor.delete_model(AdminLog)
+
+    def test_moves_rows_in_chunks_without_duplicating_rows_already_moved(self):
+        AdminLog.objects.using("default").bulk_create([
+            AdminLog(admin=self.admin, action="APPROVED_LOAN", target_model="LoanApplication",
+                     target_id=target_id, details={"reason": "ok"})
+            for target_id in range(5)
+        ])
+        written = dict(AdminLog.objects.using("default").values_list("target_id", "created_at"))
+        # Written to the audit database since the switch, and a row whose
+        # copy landed there before an interrupted run deleted it.
+        AdminLog.objects.using("audit").create(admin=self.admin, action="REJECTED_LOAN",
+                                               target_model="LoanApplication", target_id=9)
+        AdminLog.objects.using("audit").create(
+            admin=self.admin, action="APPROVED_LOAN", target_model="LoanApplication", target_id=0,
+            details={"reason": "ok"}, created_at=written[0],
+        )
+
+        out = StringIO()
+        call_command("move_admin_logs", chunk_size=2, stdout=out)
+
+        self.assertIn("Moved 4 rows in 3 chunks (1 already present)", out.getvalue())
+        self.assertFalse(AdminLog.objects.using("default").exists())
+        moved = AdminLog.objects.using("audit").filter(action="APPROVED_LOAN")
+        self.assertEqual(dict(moved.values_list("target_id", "created_at")), written)
+        self.assertEqual({entry.details["reason"] for entry in moved}, {"ok"})
+        self.assertEqual(AdminLog.objects.using("audit").count(), 6)
+
+    def test_rollups_count_each_decision_once_across_the_switch(self):
+        day1 = datetime(2026, 3, 2, 10, tzinfo=timezone.utc)
+        day2 = datetime(2026, 3, 3, 10, tzinfo=timezone.utc)
+
+        def decide(target_id, when):
+            AdminLog.objects.create(admin=self.admin, action="APPROVED_LOAN", target_model="LoanApplication",
+                                    target_id=target_id, created_at=when)
+
+        with override_settings(AUDIT_DATABASE=None):
+            for target_id in range(5):
+                decide(target_id, day1)
+            self.assertEqual(update_rollups()["decisions"], 5)
+            decide(5, day1)  # not rolled up before the switch
+        for target_id in range(6, 9):
+            decide(target_id, day2)
+        self.assertEqual(update_rollups()["decisions"], 3)
+
+        call_command("move_admin_logs", chunk_size=4, stdout=StringIO())
+        update_rollups()
+
+        daily = dict(LoanVolumeRollup.objects.filter(granularity="day").values_list("bucket_start__day", "approvals"))
+        self.assertEqual(daily, {2: 6, 3: 3})
@@ -1,7 +1,26 @@
-from django.test import TestCase, Client
+import tempfile
+from unittest.mock import patch
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from api.models.user import User
+from api.services.auth_service import get_user
+from api.services.jwt_service import JWTService
 import json
 
+
+def shared_cache_settings(test):
+    """CACHES for a shared-memory cache in a temporary directory removed after ``test``."""
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    return {"default": {
+        "BACKEND": "api.cache_backends.SharedMemoryCache",
+        "LOCATION": f"{directory.name}/shared.cache",
+        "OPTIONS": {"SLOTS": 256, "SLOT_SIZE": 1024},
+    }}
+
+
 class AuthRoutesTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -48,3 +67,102 @@ class AuthRoutesTests(TestCase):
         )
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()['email'], "login@example.com")
+
+    def test_authenticated_user_is_cached_until_saved(self):
+        self.enterContext(override_settings(CACHES=shared_cache_settings(self)))
+        token = self.test_login_user()
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+        self.client.get(self.me_url, **auth)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.me_url, **auth).status_code, 200)
+
+        user = User.objects.get(email="login@example.com")
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.client.get(self.me_url, **auth).status_code, 401)
+
+    def test_users_are_not_cached_in_a_process_local_cache(self):
+        user = User.objects.create_user(email="local@example.com", password="password")
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                get_user(user.id)
+
+    def register(self, email):
+        payload = {"email": email, "password": "password123", "full_name": "New User"}
+        return self.client.post(self.register_url, data=json.dumps(payload), content_type="application/json")
+
+    def test_register_is_a_single_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.register("single@example.com").status_code, 200)
+        statements = [query["sql"] for query in queries if "api_user" in query["sql"]]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith("INSERT"))
+
+    def test_emails_are_unique_ignoring_case(self):
+        self.assertEqual(self.register("Taken@Example.com").status_code, 200)
+        response = self.register("taken@example.COM")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_only_a_taken_email_is_a_conflict(self):
+        self.assertEqual(self.register("exact@example.com").status_code, 200)
+        self.assertEqual(self.register("exact@example.com").status_code, 409)
+
+        with patch.object(User.objects, "create_user", side_effect=IntegrityError("NOT NULL constraint failed: api_user.full_name")):
+            with self.assertRaises(IntegrityError):
+                self.register("other@example.com")
+
+    def test_login_ignores_email_case(self):
+        User.objects.create_user(email="Mixed.Case@example.com", password="password123")
+        payload = {"email": "mixed.case@EXAMPLE.com", "password": "password123"}
+        response = self.client.post(self.login_url, data=json.dumps(payload), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_email_lookup_uses_the_case_insensitive_index(self):
+        plan = User.objects.with_email("someone@example.com").explain()
+        self.assertIn("user_email_ci_unique", plan)
+
+
+@override_settings(SERVICE_API_KEYS=["service-key"])
+class IntrospectTests(TestCase):
+    def setUp(self):
+        self.enterContext(override_settings(CACHES=shared_cache_settings(self)))
+        cache.clear()
+        self.url = "/api/auth/introspect"
+        self.users = [User.objects.create_user(email=f"user{i}@example.com", password="password") for i in range(3)]
+        self.users[2].is_active = False
+        self.users[2].save()
+        self.users[1].is_staff = True
+        self.users[1].save()
+
+    def _introspect(self, tokens, key="service-key"):
+        return self.client.post(
+            self.url, data=json.dumps({"tokens": tokens}), content_type="application/json", HTTP_X_SERVICE_KEY=key
+        )
+
+    def test_batch_is_checked_with_one_user_query(self):
+        tokens = [JWTService.create_access_token(user.id, user.email) for user in self.users]
+        refresh = JWTService.create_refresh_token(self.users[0].id, self.users[0].email)
+        batch = [tokens[0], tokens[1], tokens[2], "not-a-token", refresh, tokens[0]]
+
+        with self.assertNumQueries(1):
+            response = self._introspect(batch)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+
+        self.assertEqual([result["active"] for result in results], [True, True, False, False, False, True])
+        self.assertEqual(results[0]["claims"]["user_id"], self.users[0].id)
+        self.assertEqual(results[1]["user"]["is_staff"], True)
+        self.assertEqual(results[2]["error"], "User not found or inactive")
+        self.assertIn("Invalid token type", results[4]["error"])
+        self.assertEqual(results[5], results[0])
+
+        # The users are now in the auth cache.
+        with self.assertNumQueries(0):
+            self._introspect(tokens[:2])
+
+    def test_requires_a_service_key(self):
+        token = JWTService.create_access_token(self.users[0].id, self.users[0].email)
+        self.assertEqual(self._introspect([token], key="wrong").status_code, 401)
+        self.assertEqual(self._introspect([]).status_code, 422)
+        self.assertEqual(self._introspect(["x"] * 501).status_code, 422)
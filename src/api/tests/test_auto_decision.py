@@ -0,0 +1,104 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from api.models.admin_log import AdminLog
+from api.models.loan_application import LoanApplication, LoanStatus
+from api.models.user import User
+from api.services import auto_decision
+
+RULES = [
+    {"name": "reject_large", "decision": "REJECTED", "min_amount": 100000, "reason": "Above the automatic limit"},
+    {"name": "approve_small_clean", "decision": "APPROVED", "max_amount": 5000,
+     "min_tenure_months": 3, "max_tenure_months": 12, "no_prior_rejections": True},
+]
+
+
+@override_settings(LOAN_DECISION_RULES=RULES)
+class AutoDecisionTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.clean = User.objects.create_user(email="clean@example.com", password="password")
+        self.rejected = User.objects.create_user(email="rejected@example.com", password="password")
+        self.other = User.objects.create_user(email="other@example.com", password="password")
+        self.admin = User.objects.create_user(email="admin@example.com", password="password")
+        self.loans = {
+            "small": self._loan(self.clean, 1000, 6),
+            "long": self._loan(self.clean, 1000, 24),
+            "large": self._loan(self.other, 200000, 6),
+            "history": self._loan(self.rejected, 1000, 6),
+            "leased": self._loan(self.clean, 2000, 6),
+        }
+        self._loan(self.rejected, 3000, 6, status=LoanStatus.REJECTED)
+        LoanApplication.objects.filter(id=self.loans["leased"].id).update(
+            lease_owner=self.admin, lease_expires_at=timezone.now() + timedelta(minutes=5)
+        )
+
+    def _loan(self, user, amount, tenure, status=LoanStatus.PENDING):
+        return LoanApplication.objects.create(user=user, amount=amount, tenure_months=tenure, purpose="test", status=status)
+
+    def _status(self, name):
+        return LoanApplication.objects.get(id=self.loans[name].id).status
+
+    @patch("api.services.loan_state.get_event_hub")
+    def test_rules_compile_and_apply_in_order(self, get_event_hub):
+        with self.captureOnCommitCallbacks(execute=True):
+            counts = auto_decision.apply(auto_decision.get_rules(), chunk_size=1)
+
+        self.assertEqual(counts, {"reject_large": 1, "approve_small_clean": 1})
+        self.assertEqual(self._status("small"), LoanStatus.APPROVED)
+        self.assertEqual(self._status("large"), LoanStatus.REJECTED)
+        for name in ("long", "history", "leased"):
+            self.assertEqual(self._status(name), LoanStatus.PENDING)
+
+        actor = auto_decision.get_system_actor()
+        self.assertFalse(actor.is_active)
+        self.assertFalse(actor.has_usable_password())
+        entry = AdminLog.objects.get(target_id=self.loans["large"].id)
+        self.assertEqual(entry.admin, actor)
+        self.assertEqual(entry.action, "REJECTED_LOAN")
+        self.assertEqual(entry.details, {"reason": "Above the automatic limit", "rule": "reject_large"})
+        self.assertEqual(AdminLog.objects.get(target_id=self.loans["small"].id).details["reason"], "approve_small_clean")
+        published = [call.args[2]["loan_id"] for call in get_event_hub.return_value.publish.call_args_list]
+        self.assertEqual(sorted(published), sorted([self.loans["large"].id, self.loans["small"].id]))
+
+    def test_rejections_earlier_in_the_run_count_as_prior(self):
+        small = self._loan(self.other, 1000, 6)
+        auto_decision.apply(auto_decision.get_rules())
+        self.assertEqual(LoanApplication.objects.get(id=small.id).status, LoanStatus.PENDING)
+
+    def test_dry_run_reports_counts_without_deciding(self):
+        out = StringIO()
+        call_command("auto_decide", "--dry-run", stdout=out)
+        self.assertIn("Would decide 2 loans", out.getvalue())
+        self.assertEqual(self._status("small"), LoanStatus.PENDING)
+        self.assertFalse(AdminLog.objects.exists())
+
+    @patch("api.services.email_service.send_loan_approval_email")
+    def test_command_decides_and_optionally_emails(self, send_email):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("auto_decide", stdout=StringIO())
+        send_email.assert_not_called()
+
+        self._loan(self.clean, 500, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("auto_decide", "--send-emails", stdout=StringIO())
+        send_email.assert_called_once()
+        self.assertEqual(send_email.call_args.kwargs["user_email"], "clean@example.com")
+
+    def test_loans_decided_meanwhile_are_skipped(self):
+        rule = auto_decision.get_rules()[1]
+        actor = auto_decision.get_system_actor()
+        LoanApplication.objects.filter(id=self.loans["small"].id).update(status=LoanStatus.REJECTED)
+        self.assertEqual(auto_decision._decide("default", rule, [self.loans["small"].id], actor, False), 0)
+        self.assertFalse(AdminLog.objects.exists())
+
+    def test_invalid_rules_are_rejected(self):
+        for spec in ([{"name": "x", "decision": "MAYBE", "max_amount": 1}], [{"name": "x", "decision": "APPROVED"}],
+                     [{"name": "x", "decision": "APPROVED", "colour": "red"}]):
+            with override_settings(LOAN_DECISION_RULES=spec), self.assertRaises(CommandError):
+                call_command("auto_decide", stdout=StringIO())
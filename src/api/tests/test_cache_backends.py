@@ -0,0 +1,82 @@
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+from api.cache_backends import SharedMemoryCache
+
+
+def _store_in_child(location, options):
+    SharedMemoryCache(location, {"OPTIONS": options}).set("from-child", {"pid": "child"})
+
+
+class SharedMemoryCacheTests(SimpleTestCase):
+    options = {"SLOTS": 64, "SLOT_SIZE": 256, "STRIPES": 4}
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = str(Path(directory.name) / "cache")
+        self.cache = self._cache()
+
+    def _cache(self, **options):
+        return SharedMemoryCache(self.location, {"OPTIONS": {**self.options, **options}})
+
+    def test_set_get_delete(self):
+        self.cache.set("user", {"id": 1, "email": "a@example.com"})
+        self.assertEqual(self.cache.get("user"), {"id": 1, "email": "a@example.com"})
+        self.assertTrue(self.cache.has_key("user"))
+        self.assertTrue(self.cache.delete("user"))
+        self.assertIsNone(self.cache.get("user"))
+        self.assertFalse(self.cache.delete("user"))
+
+    def test_add_only_stores_missing_keys(self):
+        self.assertTrue(self.cache.add("key", 1))
+        self.assertFalse(self.cache.add("key", 2))
+        self.assertEqual(self.cache.get("key"), 1)
+        self.assertEqual(self.cache.incr("key", 5), 6)
+        self.assertEqual(self.cache.get("key"), 6)
+
+    def test_entries_expire(self):
+        self.cache.set("short", "value", timeout=10)
+        self.cache.set("forever", "value", timeout=None)
+        with patch("api.cache_backends.time.time", return_value=time.time() + 11):
+            self.assertIsNone(self.cache.get("short"))
+            self.assertEqual(self.cache.get("forever"), "value")
+            self.assertTrue(self.cache.add("short", "again"))
+
+    def test_full_set_evicts_least_recently_used(self):
+        self.location += "-one-set"
+        cache = self._cache(SLOTS=8)
+        for i in range(8):
+            cache.set(f"key{i}", i)
+        cache.get("key0")
+        cache.set("key8", 8)
+        self.assertEqual(cache.get("key0"), 0)
+        self.assertIsNone(cache.get("key1"))
+        self.assertEqual(cache.get("key8"), 8)
+
+    def test_values_larger_than_a_slot_are_not_stored(self):
+        self.cache.set("big", "small")
+        self.cache.set("big", "x" * 1000)
+        self.assertIsNone(self.cache.get("big"))
+        self.assertFalse(self.cache.add("other", "x" * 1000))
+
+    def test_clear(self):
+        self.cache.set_many({f"key{i}": i for i in range(20)})
+        self.cache.clear()
+        self.assertEqual(self.cache.get_many([f"key{i}" for i in range(20)]), {})
+        self.assertEqual(self.cache.stats()["live"], 0)
+
+    def test_entries_are_shared_between_processes(self):
+        child = multiprocessing.get_context("spawn").Process(target=_store_in_child, args=(self.location, self.options))
+        child.start()
+        child.join(30)
+        self.assertEqual(child.exitcode, 0)
+        self.assertEqual(self.cache.get("from-child"), {"pid": "child"})
+
+    def test_file_with_another_layout_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self._cache(SLOTS=128)
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+from io import StringIO
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from api.models.user import User
+from api.models.loan_application import LoanStatus
+from api.models.admin_log import AdminLog
+from api.services import loan_shards
+from api.services.data_seeder import DataSeeder, parse_status_mix
+
+
+class DataSeederTests(TestCase):
+    databases = "__all__"
+
+    def _seed(self, prefix, seed=7):
+        return DataSeeder(
+            users=40,
+            admins=2,
+            loans_per_user=2.0,
+            status_mix=parse_status_mix("PENDING=1,APPROVED=1,REJECTED=1"),
+            days=30,
+            audit_density=1.0,
+            seed=seed,
+            prefix=prefix,
+            chunk_size=16,
+            transaction_size=32,
+            now=datetime(2026, 6, 1, tzinfo=timezone.utc),
+        ).run()
+
+    def _shape(self, prefix):
+        # Per user, since loans are spread over the shards of their users.
+        return [
+            (loan.amount, loan.tenure_months, loan.status, loan.created_at)
+            for user in User.objects.filter(email__startswith=prefix).order_by("id")
+            for loan in user.loan_applications.order_by("id")
+        ]
+
+    def test_same_seed_gives_same_data(self):
+        first = self._seed("a")
+        second = self._seed("b")
+        self.assertEqual(first, second)
+        self.assertEqual(self._shape("a-"), self._shape("b-"))
+        self.assertNotEqual(self._seed("c", seed=8)["loans"], 0)
+
+    def test_users_share_one_hash_and_decisions_are_logged(self):
+        counts = self._seed("d")
+        users = User.objects.filter(email__startswith="d-user-")
+        self.assertEqual(users.count(), 40)
+        self.assertEqual(users.values("password").distinct().count(), 1)
+        self.assertTrue(users.first().check_password("password123"))
+
+        decided = sum(loans.count() for loans in loan_shards.scatter(lambda loans: loans.exclude(status=LoanStatus.PENDING)))
+        self.assertEqual(counts["audit_logs"], decided)
+        self.assertEqual(AdminLog.objects.count(), decided)
+        self.assertTrue(all(
+            datetime(2026, 5, 2, tzinfo=timezone.utc) <= created <= datetime(2026, 6, 1, tzinfo=timezone.utc)
+            for _, _, _, created in self._shape("d-")
+        ))
+
+    def test_command_refuses_to_seed_twice(self):
+        args = ["--users", "3", "--admins", "1", "--prefix", "cmd", "--end-date", "2026-06-01"]
+        call_command("seed_data", *args, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command("seed_data", *args, stdout=StringIO())
@@ -0,0 +1,145 @@
+import itertools
+import time
+from unittest.mock import patch
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+from api.middleware.load_shedding import LoadSheddingMiddleware
+from api.services.concurrency_limiter import AIMDLimiter, classify, is_high_priority, parse_request_start
+from api.services.jwt_service import JWTService
+
+
+class AIMDLimiterTests(TestCase):
+    def test_slow_responses_shrink_the_limit_once_per_interval(self):
+        limiter = AIMDLimiter("read", initial_limit=10, target_latency_ms=100, backoff_ratio=0.5)
+        for _ in range(3):
+            self.assertTrue(limiter.try_acquire())
+        for _ in range(3):
+            limiter.release(500)
+        self.assertEqual(limiter.snapshot()["limit"], 5)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_fast_responses_grow_a_busy_limit_up_to_the_maximum(self):
+        limiter = AIMDLimiter("read", initial_limit=2, max_limit=4, target_latency_ms=100)
+        for _ in range(50):
+            limiter.try_acquire()
+            limiter.try_acquire()
+            limiter.release(1)
+            limiter.release(1)
+        self.assertEqual(limiter.snapshot()["limit"], 4)
+
+    def test_idle_limit_does_not_grow(self):
+        limiter = AIMDLimiter("read", initial_limit=10, target_latency_ms=100)
+        for _ in range(50):
+            limiter.try_acquire()
+            limiter.release(1)
+        self.assertEqual(limiter.snapshot()["limit"], 10)
+
+    def test_limit_recovers_when_the_class_is_slower_than_its_target(self):
+        # Login hashes a password in ~440 ms, well over a 250 ms target.
+        limiter = AIMDLimiter("auth", initial_limit=10, target_latency_ms=250, baseline_window=20)
+        clock = itertools.count(step=1.0)
+        with patch("api.services.concurrency_limiter.time.monotonic", side_effect=lambda: next(clock)):
+            lowest = limiter.limit
+            for _ in range(300):
+                admitted = 0
+                while limiter.try_acquire():
+                    admitted += 1
+                for _ in range(admitted):
+                    limiter.release(440)
+                lowest = min(lowest, limiter.limit)
+
+        self.assertLess(lowest, 5)
+        self.assertEqual(limiter.baseline_ms, 440)
+        self.assertEqual(limiter.snapshot()["target_latency_ms"], 880)
+        self.assertGreaterEqual(limiter.snapshot()["limit"], 10)
+
+    def test_low_priority_requests_leave_room_for_high_priority(self):
+        limiter = AIMDLimiter("auth", initial_limit=4, low_priority_share=0.5)
+        self.assertTrue(limiter.try_acquire(high_priority=False))
+        self.assertTrue(limiter.try_acquire(high_priority=False))
+        self.assertFalse(limiter.try_acquire(high_priority=False))
+        self.assertTrue(limiter.try_acquire(high_priority=True))
+        self.assertTrue(limiter.try_acquire(high_priority=True))
+        self.assertFalse(limiter.try_acquire(high_priority=True))
+        self.assertEqual(limiter.snapshot()["rejected"], 2)
+
+    def test_classify_and_request_start(self):
+        self.assertEqual(classify("POST", "/api/auth/login"), "auth")
+        self.assertEqual(classify("POST", "/api/auth/introspect"), "introspect")
+        self.assertEqual(classify("GET", "/api/admin/loans"), "read")
+        self.assertEqual(classify("PUT", "/api/admin/loans/1/status"), "admin_write")
+        self.assertEqual(classify("POST", "/api/loans/"), "write")
+        self.assertAlmostEqual(parse_request_start("t=1700000000.5"), 1700000000.5)
+        self.assertAlmostEqual(parse_request_start("1700000000500"), 1700000000.5)
+        self.assertAlmostEqual(parse_request_start("t=1700000000500000"), 1700000000.5)
+        self.assertIsNone(parse_request_start("garbage"))
+
+    def test_only_a_valid_access_token_is_high_priority(self):
+        token = JWTService.create_access_token(1, "user@example.com")
+        refresh = JWTService.create_refresh_token(1, "user@example.com")
+        self.assertTrue(is_high_priority({"Authorization": f"Bearer {token}"}))
+        self.assertFalse(is_high_priority({"Authorization": "Bearer x"}))
+        self.assertFalse(is_high_priority({"Authorization": f"Bearer {refresh}"}))
+        self.assertFalse(is_high_priority({}))
+
+    @override_settings(SERVICE_API_KEYS=["service-key"])
+    def test_a_valid_service_key_is_high_priority(self):
+        self.assertTrue(is_high_priority({"X-Service-Key": "service-key"}))
+        self.assertFalse(is_high_priority({"X-Service-Key": "wrong"}))
+
+
+class LoadSheddingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = LoadSheddingMiddleware(lambda request: HttpResponse("ok"))
+
+    def test_rejects_anonymous_login_when_auth_class_is_saturated(self):
+        limiter = self.middleware.limiters["auth"]
+        while limiter.try_acquire(high_priority=False):
+            pass
+
+        response = self.middleware(self.factory.post("/api/auth/login"))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response)
+
+        response = self.middleware(self.factory.get("/api/auth/me", HTTP_AUTHORIZATION="Bearer forged"))
+        self.assertEqual(response.status_code, 503)
+
+        token = JWTService.create_access_token(1, "user@example.com")
+        response = self.middleware(self.factory.get("/api/auth/me", HTTP_AUTHORIZATION=f"Bearer {token}"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_path_without_a_token_is_low_priority(self):
+        limiter = self.middleware.limiters["admin_write"]
+        while limiter.try_acquire(high_priority=False):
+            pass
+        response = self.middleware(self.factory.put("/api/admin/loans/1/status"))
+        self.assertEqual(response.status_code, 503)
+
+    @override_settings(CONCURRENCY_TRUST_REQUEST_START=True)
+    def test_requests_queued_too_long_are_shed(self):
+        middleware = LoadSheddingMiddleware(lambda request: HttpResponse("ok"))
+        stale = str(time.time() - 60)
+        response = middleware(self.factory.get("/api/loans/", HTTP_X_REQUEST_START=f"t={stale}"))
+        self.assertEqual(response.status_code, 503)
+        snapshot = middleware.limiters["read"].snapshot()
+        self.assertEqual((snapshot["in_flight"], snapshot["rejected"]), (0, 1))
+        # The claimed wait is not a latency sample.
+        self.assertEqual((snapshot["limit"], snapshot["latency_ewma_ms"]), (50, 0))
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_spoofed_request_start_is_ignored_without_a_trusted_proxy(self):
+        for _ in range(60):
+            response = self.middleware(self.factory.get("/api/loans/", HTTP_X_REQUEST_START="t=1"))
+            self.assertEqual(response.status_code, 200)
+        snapshot = self.middleware.limiters["read"].snapshot()
+        self.assertEqual((snapshot["limit"], snapshot["rejected"]), (50, 0))
+        self.assertLess(snapshot["latency_ewma_ms"], 1000)
+
+    def test_non_api_and_exempt_paths_are_not_limited(self):
+        for limiter in self.middleware.limiters.values():
+            while limiter.try_acquire():
+                pass
+        self.assertEqual(self.middleware(self.factory.get("/admin/")).status_code, 200)
+        self.assertEqual(self.middleware(self.factory.get("/api/loans/events")).status_code, 200)
+        self.assertEqual(self.middleware(self.factory.get("/api/loans/")).status_code, 503)
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from django.test import TestCase, AsyncClient, override_settings
+from api.models.user import User
+from api.services import event_hub
+from api.services.event_hub import EventHub
+from api.services.jwt_service import JWTService
+
+
+class EventHubTests(TestCase):
+    async def test_publish_from_another_thread_reaches_subscriber(self):
+        hub = EventHub()
+        subscriber, backlog, missed = hub.subscribe(user_id=1)
+        thread = threading.Thread(target=hub.publish, args=(1, "loan.status", {"loan_id": 5}))
+        thread.start()
+        thread.join()
+        event = await asyncio.wait_for(subscriber.queue.get(), timeout=1)
+        self.assertEqual(event.data, {"loan_id": 5})
+        self.assertEqual((backlog, missed), ([], False))
+
+    async def test_resume_replays_only_the_users_newer_events(self):
+        hub = EventHub(replay_size=3)
+        first = hub.publish(1, "loan.status", {"n": 1})
+        hub.publish(2, "loan.status", {"n": 2})
+        hub.publish(1, "loan.status", {"n": 3})
+
+        _, backlog, missed = hub.subscribe(1, last_event_id=first.id)
+        self.assertEqual([event.data["n"] for event in backlog], [3])
+        self.assertFalse(missed)
+
+        for n in range(4, 8):
+            hub.publish(1, "loan.status", {"n": n})
+        _, _, missed = hub.subscribe(1, last_event_id=first.id)
+        self.assertTrue(missed)
+        _, _, missed = hub.subscribe(1, last_event_id="0-1")
+        self.assertTrue(missed)
+
+    async def test_slow_subscriber_is_disconnected(self):
+        hub = EventHub(queue_size=2)
+        subscriber, _, _ = hub.subscribe(1)
+        for n in range(3):
+            hub.publish(1, "loan.status", {"n": n})
+        await asyncio.sleep(0)
+        self.assertTrue(subscriber.overflowed)
+        items = [subscriber.queue.get_nowait() for _ in range(subscriber.queue.qsize())]
+        self.assertIsNone(items[-1])
+
+
+@override_settings(SSE_HEARTBEAT_SECONDS=0.05)
+class LoanEventsViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="user@example.com", password="password")
+        self.token = JWTService.create_access_token(self.user.id, self.user.email)
+        self.hub = EventHub()
+        event_hub._hub = self.hub
+        self.addCleanup(setattr, event_hub, "_hub", None)
+
+    async def test_requires_bearer_token(self):
+        response = await AsyncClient().get("/api/loans/events")
+        self.assertEqual(response.status_code, 401)
+
+    async def test_streams_heartbeats_and_published_events(self):
+        response = await AsyncClient().get(
+            "/api/loans/events", headers={"Authorization": f"Bearer {self.token}"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        chunks = response.streaming_content
+        self.assertEqual(await anext(chunks), b"retry: 3000\n\n")
+        self.assertEqual(await anext(chunks), b": keep-alive\n\n")
+
+        self.hub.publish(self.user.id, "loan.status", {"loan_id": 9, "status": "APPROVED"})
+        chunk = (await anext(chunks)).decode()
+        self.assertIn("event: loan.status", chunk)
+        self.assertIn('"status": "APPROVED"', chunk)
+        await chunks.aclose()
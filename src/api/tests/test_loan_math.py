@@ -0,0 +1,96 @@
+from django.test import TestCase, Client
+from api.models.user import User
+from django.core.exceptions import ValidationError
+from api.models.loan_application import MAX_TENURE_MONTHS, LoanApplication, LoanStatus
+from api.services import loan_math
+from api.services.jwt_service import JWTService
+
+
+class LoanMathTests(TestCase):
+    def test_installment_and_summary(self):
+        summary = loan_math.loan_summary(1000, 12, 0.12)
+        self.assertEqual(summary["monthly_installment"], 88.85)
+        self.assertEqual(summary["total_interest"], 66.19)
+        self.assertEqual(loan_math.loan_summary(1200, 12, 0.0)["monthly_installment"], 100.0)
+
+    def test_schedule_pays_off_principal(self):
+        schedule = loan_math.amortization_schedule(5000, 24, 0.18)
+        self.assertEqual(len(schedule), 24)
+        self.assertEqual(schedule[-1]["balance"], 0.0)
+        self.assertAlmostEqual(sum(row["principal"] for row in schedule), 5000, places=1)
+        self.assertGreater(schedule[0]["interest"], schedule[-1]["interest"])
+
+    def test_portfolio_matches_individual_schedules(self):
+        loans = [(1000, 12), (2500, 6), (800, 24)]
+        portfolio = loan_math.portfolio_schedule([p for p, _ in loans], [n for _, n in loans], 0.18, chunk_size=2)
+        self.assertEqual(portfolio["loan_count"], 3)
+        self.assertEqual(len(portfolio["schedule"]), 24)
+        for month in (1, 6, 7, 24):
+            expected = sum(
+                row["payment"]
+                for p, n in loans
+                for row in loan_math.amortization_schedule(p, n, 0.18)
+                if row["month"] == month
+            )
+            self.assertAlmostEqual(portfolio["schedule"][month - 1]["payment"], expected, places=1)
+
+
+    def test_schedules_stop_at_the_maximum_tenure(self):
+        self.assertEqual(len(loan_math.amortization_schedule(1000, 10**8, 0.18)), MAX_TENURE_MONTHS)
+        portfolio = loan_math.portfolio_schedule([1000, 1000], [12, 10**8], 0.18)
+        self.assertEqual(len(portfolio["schedule"]), MAX_TENURE_MONTHS)
+        with self.assertRaises(ValidationError):
+            LoanApplication(user_id=1, amount=1000, tenure_months=MAX_TENURE_MONTHS + 1, purpose="Test").full_clean()
+
+
+class LoanScheduleRoutesTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(email="user@example.com", password="password")
+        self.admin = User.objects.create_user(email="admin@example.com", password="password")
+        self.admin.is_staff = True
+        self.admin.save()
+        self.loan = self.user.loan_applications.create(amount=1000, tenure_months=12, purpose="Test")
+        self.user.loan_applications.create(amount=3000, tenure_months=6, purpose="Test")
+        self.user.loan_applications.create(
+            amount=9000, tenure_months=6, purpose="Test", status=LoanStatus.APPROVED
+        )
+
+    def _headers(self, user):
+        return {"HTTP_AUTHORIZATION": f"Bearer {JWTService.create_access_token(user.id, user.email)}"}
+
+    def test_get_loan_schedule(self):
+        response = self.client.get(f"/api/loans/{self.loan.id}/schedule?annual_rate=0.12", **self._headers(self.user))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["monthly_installment"], 88.85)
+        self.assertEqual(len(data["schedule"]), 12)
+
+    def test_admin_portfolio_schedule(self):
+        response = self.client.get("/api/admin/loans/portfolio", **self._headers(self.admin))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["loan_count"], 2)
+        self.assertEqual(data["total_principal"], 4000.0)
+        self.assertEqual(len(data["schedule"]), 12)
+
+    def test_invalid_rates_and_statuses_are_rejected(self):
+        for rate in ("-24", "-12", "-0.01", "1.5"):
+            response = self.client.get(
+                f"/api/loans/{self.loan.id}/schedule?annual_rate={rate}", **self._headers(self.user)
+            )
+            self.assertEqual(response.status_code, 422, rate)
+            response = self.client.get(f"/api/admin/loans/portfolio?annual_rate={rate}", **self._headers(self.admin))
+            self.assertEqual(response.status_code, 422, rate)
+        response = self.client.get("/api/admin/loans/portfolio?status=BOGUS", **self._headers(self.admin))
+        self.assertEqual(response.status_code, 422)
+        response = self.client.get("/api/admin/loans/portfolio?status=APPROVED", **self._headers(self.admin))
+        self.assertEqual(response.json()["status"], "APPROVED")
+
+    def test_missing_or_foreign_loan_is_404(self):
+        other = User.objects.create_user(email="other@example.com", password="password")
+        for user, loan_id in ((other, self.loan.id), (self.user, 999999)):
+            for path in (f"/api/loans/{loan_id}/schedule", f"/api/loans/{loan_id}", f"/api/loans/{loan_id}?fields=id"):
+                self.assertEqual(self.client.get(path, **self._headers(user)).status_code, 404, path)
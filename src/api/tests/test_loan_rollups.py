@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, Client
+from api.models.user import User
+from api.models.admin_log import AdminLog
+from api.models.loan_rollup import LoanVolumeRollup, RollupWatermark
+from api.services import loan_shards
+from api.services.loan_rollups import _loan_source, update_rollups
+from api.services.jwt_service import JWTService
+
+
+class LoanRollupTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", password="password")
+        self.admin.is_staff = True
+        self.admin.save()
+        self.user = User.objects.create_user(email="user@example.com", password="password")
+
+    def _loan(self, amount, when):
+        loan = self.user.loan_applications.create(amount=amount, tenure_months=12, purpose="Test")
+        loan_shards.loan_queryset(loan.id).update(created_at=when)
+        return loan
+
+    def _decide(self, loan, action, when):
+        AdminLog.objects.create(
+            admin=self.admin, action=action, target_id=loan.id,
+            target_model="LoanApplication", created_at=when,
+        )
+
+    def test_incremental_update_only_processes_new_rows(self):
+        day1 = datetime(2026, 3, 2, 10, tzinfo=timezone.utc)
+        day2 = datetime(2026, 3, 3, 10, tzinfo=timezone.utc)
+        first = self._loan(1000, day1)
+        self._loan(500, day1)
+        self._decide(first, "APPROVED_LOAN", day2)
+
+        stats = update_rollups()
+        self.assertEqual(stats["loans"], 2)
+        self.assertEqual(stats["decisions"], 1)
+
+        self.assertEqual(update_rollups()["loans"], 0)
+
+        second = self._loan(250, day2)
+        self._decide(second, "REJECTED_LOAN", day2)
+        update_rollups()
+
+        daily = {r.bucket_start.day: r for r in LoanVolumeRollup.objects.filter(granularity="day")}
+        self.assertEqual(daily[2].applications, 2)
+        self.assertEqual(daily[2].requested_amount, 1500)
+        self.assertEqual((daily[3].applications, daily[3].approvals, daily[3].rejections), (1, 1, 1))
+
+        weekly = LoanVolumeRollup.objects.get(granularity="week")
+        self.assertEqual(str(weekly.bucket_start), "2026-03-02")
+        self.assertEqual(weekly.applications, 3)
+        monthly = LoanVolumeRollup.objects.get(granularity="month")
+        self.assertEqual(str(monthly.bucket_start), "2026-03-01")
+        self.assertEqual(RollupWatermark.objects.get(source=_loan_source(loan_shards.shard_for_user(self.user.id))).last_id, second.id)
+
+    def test_timeseries_endpoint_reads_rollups(self):
+        self._loan(1000, datetime(2026, 1, 15, tzinfo=timezone.utc))
+        self._loan(2000, datetime(2026, 2, 15, tzinfo=timezone.utc))
+        call_command("update_loan_rollups", stdout=StringIO())
+
+        token = JWTService.create_access_token(self.admin.id, self.admin.email)
+        response = Client().get(
+            "/api/admin/loans/timeseries",
+            {"granularity": "auto", "from": "2024-01-01", "to": "2026-12-31", "max_points": 50},
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["granularity"], "month")
+        self.assertEqual([p["applications"] for p in data["points"]], [1, 1])
+        self.assertEqual(data["points"][1]["requested_amount"], 2000.0)
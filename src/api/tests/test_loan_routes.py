@@ -1,10 +1,21 @@
-from django.test import TestCase, Client
+import json
+import threading
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from unittest.mock import patch
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase, Client
+from django.utils import timezone
 from api.models.user import User
-from api.models.loan_application import LoanApplication
+from api.models.idempotency_key import IdempotencyKey
+from api.services import loan_shards
+from api.services.idempotency import MAX_LOST_CLAIMS, RequestInProgressError, _claim, run_idempotent
 from api.services.jwt_service import JWTService
-import json
 
 class LoanRoutesTests(TestCase):
+    databases = "__all__"
+
     def setUp(self):
         self.client = Client()
         self.user = User.objects.create_user(email="loanuser@example.com", password="password")
@@ -25,11 +36,105 @@ class LoanRoutesTests(TestCase):
             **self.headers
         )
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(LoanApplication.objects.count(), 1)
-        self.assertEqual(LoanApplication.objects.first().user, self.user)
+        self.assertEqual(self.user.loan_applications.count(), 1)
+
+    def test_tenure_is_bounded(self):
+        payload = {"amount": 5000.00, "tenure_months": 10**8, "purpose": "Education"}
+        response = self.client.post(self.loans_url, data=json.dumps(payload), content_type="application/json", **self.headers)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.user.loan_applications.count(), 0)
 
     def test_list_loans(self):
-        LoanApplication.objects.create(user=self.user, amount=1000, tenure_months=12, purpose="Test")
+        self.user.loan_applications.create(amount=1000, tenure_months=12, purpose="Test")
         response = self.client.get(self.loans_url, **self.headers)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.json()), 1)
+
+
+class IdempotentLoanCreationTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="retry@example.com", password="password")
+        token = JWTService.create_access_token(self.user.id, self.user.email)
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+        self.payload = json.dumps({"amount": 2500.0, "tenure_months": 12, "purpose": "Retry test"})
+
+    def _post(self, key, payload=None):
+        return Client().post(
+            "/api/loans/",
+            data=payload or self.payload,
+            content_type="application/json",
+            HTTP_IDEMPOTENCY_KEY=key,
+            **self.headers
+        )
+
+    def test_replay_returns_stored_response_without_insert(self):
+        first = self._post("key-1")
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(2):  # user and key lookups
+            replay = self._post("key-1")
+        self.assertEqual(replay.status_code, 200)
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(self.user.loan_applications.count(), 1)
+
+    def test_key_reused_with_different_payload(self):
+        self._post("key-2")
+        other = json.dumps({"amount": 10.0, "tenure_months": 1, "purpose": "Something else"})
+        self.assertEqual(self._post("key-2", other).status_code, 422)
+
+    def test_concurrent_duplicates_create_one_loan(self):
+        results = []
+
+        def post():
+            try:
+                results.append(self._post("key-3"))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([r.status_code for r in results], [200] * 5)
+        self.assertEqual(len({r.json()["id"] for r in results}), 1)
+        self.assertEqual(self.user.loan_applications.count(), 1)
+
+    def test_purge_expired_keys(self):
+        self._post("key-4")
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command("purge_idempotency_keys", stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_only_a_duplicate_key_counts_as_a_lost_claim(self):
+        self.assertIsNotNone(_claim(self.user, "key-5", "fingerprint"))
+        self.assertIsNone(_claim(self.user, "key-5", "fingerprint"))
+
+        error = IntegrityError("FOREIGN KEY constraint failed")
+        with patch.object(IdempotencyKey.objects, "create", side_effect=error):
+            with self.assertRaises(IntegrityError):
+                run_idempotent(self.user, "key-6", {}, lambda: {})
+
+    def test_lost_claims_back_off_and_give_up(self):
+        with patch("api.services.idempotency._claim", return_value=None) as claim, \
+                patch("api.services.idempotency.time.sleep") as sleep:
+            with self.assertRaises(RequestInProgressError):
+                run_idempotent(self.user, "key-7", {}, lambda: {})
+        self.assertEqual(claim.call_count, MAX_LOST_CLAIMS)
+        delays = [call.args[0] for call in sleep.call_args_list]
+        self.assertEqual(len(delays), MAX_LOST_CLAIMS - 1)
+        self.assertEqual(delays, sorted(delays))
+        self.assertGreater(delays[0], 0)
+
+    def test_failed_handler_rolls_back_its_shard_write(self):
+        def handler():
+            self.user.loan_applications.create(amount=100, tenure_months=6, purpose="Rolled back")
+            raise ValueError("handler failed")
+
+        with self.assertRaises(ValueError):
+            run_idempotent(self.user, "key-8", {}, handler, using=loan_shards.shard_for_user(self.user.id))
+        self.assertEqual(self.user.loan_applications.count(), 0)
+        self.assertFalse(IdempotencyKey.objects.exists())
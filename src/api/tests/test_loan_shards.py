@@ -0,0 +1,112 @@
+from collections import Counter
+from unittest import skipUnless
+from unittest.mock import patch
+from django.conf import settings
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from api.models.user import User
+from api.models.loan_application import LoanApplication, LoanStatus
+from api.models.admin_log import AdminLog
+from api.services import loan_shards
+from api.services.jwt_service import JWTService
+
+SHARDS = ["default", "loans_1", "loans_2"]
+
+
+@override_settings(LOAN_SHARDS=SHARDS)
+class ShardMappingTests(SimpleTestCase):
+    def test_users_spread_evenly_and_stably(self):
+        counts = Counter(loan_shards.shard_for_user(user_id) for user_id in range(1, 30001))
+        self.assertEqual(set(counts), set(SHARDS))
+        self.assertLess(max(counts.values()) - min(counts.values()), 1000)
+        self.assertEqual(loan_shards.shard_for_user(12345), loan_shards.shard_for_user(12345))
+
+    def test_loan_ids_carry_their_shard(self):
+        self.assertEqual(loan_shards.shard_for_loan(7), "default")
+        self.assertEqual(loan_shards.shard_for_loan((2 << loan_shards.SHARD_ID_BITS) + 7), "loans_2")
+        self.assertIsNone(loan_shards.shard_for_loan(5 << loan_shards.SHARD_ID_BITS))
+
+    def test_system_check_rejects_shards_without_id_offsets(self):
+        with override_settings(LOAN_SHARDS=["default", "missing"]):
+            self.assertEqual([e.id for e in loan_shards.check_shard_databases(None)], ["api.E001"])
+        with override_settings(LOAN_SHARDS=["default", "default"]), \
+                patch.object(connections["default"], "vendor", "oracle"):
+            self.assertEqual([e.id for e in loan_shards.check_shard_databases(None)], ["api.E002"])
+
+
+@skipUnless(len(settings.LOAN_SHARDS) > 1, "run with LOAN_SHARD_COUNT=2 or more")
+class ShardedLoanRoutesTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", password="password")
+        self.admin.is_staff = True
+        self.admin.save()
+        self.admin_token = JWTService.create_access_token(self.admin.id, self.admin.email)
+
+        # Enough users that every shard holds some of them.
+        self.users = []
+        for i in range(12):
+            user = User.objects.create_user(email=f"user{i}@example.com", password="password")
+            self.users.append((user, JWTService.create_access_token(user.id, user.email)))
+
+    def _create(self, token, amount):
+        response = Client().post(
+            "/api/loans/",
+            {"amount": amount, "tenure_months": 6, "purpose": "Stock"},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_loans_are_stored_and_read_on_the_users_shard(self):
+        for user, token in self.users:
+            loan = self._create(token, 1000 + user.id)
+            alias = loan_shards.shard_for_user(user.id)
+            self.assertEqual(loan_shards.shard_for_loan(loan["id"]), alias)
+            self.assertTrue(LoanApplication.objects.using(alias).filter(id=loan["id"], user_id=user.id).exists())
+
+            response = Client().get("/api/loans/", HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.assertEqual([item["id"] for item in response.json()], [loan["id"]])
+            response = Client().get(f"/api/loans/{loan['id']}", HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.assertEqual(response.json()["amount"], loan["amount"])
+
+        used = {loan_shards.shard_for_user(user.id) for user, _ in self.users}
+        self.assertEqual(used, set(settings.LOAN_SHARDS))
+
+    def test_admin_list_merges_all_shards_newest_first(self):
+        created = [self._create(token, 500)["id"] for _, token in self.users]
+        response = Client().get("/api/admin/loans", HTTP_AUTHORIZATION=f"Bearer {self.admin_token}")
+        loans = response.json()
+        self.assertEqual(sorted(loan["id"] for loan in loans), sorted(created))
+        timestamps = [loan["created_at"] for loan in loans]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+
+    @patch("api.services.email_service.send_loan_approval_email")
+    def test_admin_decision_on_another_shard(self, mock_email):
+        user, token = next(
+            (user, token) for user, token in self.users
+            if loan_shards.shard_for_user(user.id) != loan_shards.DIRECTORY_DATABASE
+        )
+        loan_id = self._create(token, 2500)["id"]
+        alias = loan_shards.shard_for_loan(loan_id)
+
+        with self.captureOnCommitCallbacks(using=alias, execute=True):
+            response = Client().put(
+                f"/api/admin/loans/{loan_id}/status",
+                {"status": LoanStatus.APPROVED},
+                content_type="application/json",
+                HTTP_AUTHORIZATION=f"Bearer {self.admin_token}",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], LoanStatus.APPROVED)
+        self.assertEqual(LoanApplication.objects.using(alias).get(id=loan_id).status, LoanStatus.APPROVED)
+        self.assertTrue(AdminLog.objects.filter(target_id=loan_id).exists())
+        self.assertEqual(mock_email.call_args[1]["user_email"], user.email)
+
+    def test_deleting_a_user_deletes_loans_on_their_shard(self):
+        user, token = self.users[0]
+        loan_id = self._create(token, 800)["id"]
+        user.delete()
+        self.assertFalse(loan_shards.loan_queryset(loan_id).exists())
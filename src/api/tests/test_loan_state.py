@@ -0,0 +1,104 @@
+import threading
+from unittest.mock import patch
+from django.db import connection, transaction, OperationalError
+from django.test import TestCase, TransactionTestCase
+from api.models.user import User
+from api.models.loan_application import LoanStatus
+from api.models.admin_log import AdminLog
+from api.services import loan_shards
+from api.services.loan_state import InvalidTransition, loan_state_machine, transition_loan
+
+
+class LoanStateMachineTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", password="password")
+        self.user = User.objects.create_user(email="user@example.com", password="password")
+        self.loan = self.user.loan_applications.create(
+            amount=1000, tenure_months=12, purpose="Test"
+        )
+
+    def test_transition_is_a_single_conditional_update(self):
+        with self.assertNumQueries(1, using=loan_shards.shard_for_user(self.user.id)):
+            result = transition_loan(self.loan.id, LoanStatus.REJECTED)
+        self.assertTrue(result.applied)
+        self.assertEqual(result.from_status, LoanStatus.PENDING)
+        self.loan.refresh_from_db()
+        self.assertEqual(self.loan.status, LoanStatus.REJECTED)
+
+    def test_second_decision_does_not_apply(self):
+        transition_loan(self.loan.id, LoanStatus.APPROVED)
+        result = transition_loan(self.loan.id, LoanStatus.REJECTED)
+        self.assertFalse(result.applied)
+        self.assertEqual(result.current_status, LoanStatus.APPROVED)
+
+    def test_missing_loan_and_invalid_target(self):
+        self.assertTrue(transition_loan(999999, LoanStatus.APPROVED).not_found)
+        with self.assertRaises(InvalidTransition):
+            transition_loan(self.loan.id, LoanStatus.PENDING)
+
+    @patch("api.services.email_service.send_loan_approval_email")
+    def test_hooks_audit_and_email_after_commit(self, mock_email):
+        with self.captureOnCommitCallbacks(using=loan_shards.shard_for_user(self.user.id), execute=True):
+            transition_loan(self.loan.id, LoanStatus.APPROVED, actor=self.admin, reason="ok")
+        mock_email.assert_called_once()
+        self.assertEqual(mock_email.call_args[1]["user_email"], "user@example.com")
+        self.assertTrue(AdminLog.objects.filter(target_id=self.loan.id, action="APPROVED_LOAN").exists())
+
+    @patch("api.services.email_service.send_loan_approval_email")
+    def test_batch_applies_to_qualifying_loans_and_runs_the_same_hooks(self, mock_email):
+        second = self.user.loan_applications.create(amount=2000, tenure_months=6, purpose="Second")
+        decided = self.user.loan_applications.create(amount=3000, tenure_months=6, purpose="Done", status=LoanStatus.REJECTED)
+        with self.captureOnCommitCallbacks(using=loan_shards.shard_for_user(self.user.id), execute=True):
+            results = loan_state_machine.transition_many(
+                [self.loan.id, second.id, decided.id, 999999], LoanStatus.APPROVED,
+                actor=self.admin, reason="batch", details={"rule": "small"},
+            )
+
+        self.assertEqual(sorted(result.loan_id for result in results), [self.loan.id, second.id])
+        self.assertTrue(all(result.from_status == LoanStatus.PENDING for result in results))
+        self.assertEqual(mock_email.call_count, 2)
+        entries = AdminLog.objects.filter(action="APPROVED_LOAN")
+        self.assertEqual(sorted(entries.values_list("target_id", flat=True)), [self.loan.id, second.id])
+        self.assertEqual(entries.first().details, {"reason": "batch", "rule": "small"})
+
+
+class ConcurrentApprovalTests(TransactionTestCase):
+    databases = "__all__"
+
+    def test_exactly_one_concurrent_approver_wins(self):
+        user = User.objects.create_user(email="racer@example.com", password="password")
+        admins = [
+            User.objects.create_user(email=f"admin{i}@example.com", password="password")
+            for i in range(8)
+        ]
+        loan = user.loan_applications.create(amount=500, tenure_months=6, purpose="Race")
+        barrier = threading.Barrier(len(admins))
+        outcomes = []
+
+        def approve(admin):
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        with transaction.atomic():
+                            result = transition_loan(loan.id, LoanStatus.APPROVED, actor=admin)
+                        outcomes.append(result.applied)
+                        return
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting; retry like a client would.
+                        continue
+            finally:
+                connection.close()
+
+        with patch("api.services.email_service.send_loan_approval_email"):
+            threads = [threading.Thread(target=approve, args=(admin,)) for admin in admins]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(outcomes), len(admins))
+        self.assertEqual(outcomes.count(True), 1)
+        self.assertEqual(AdminLog.objects.filter(target_id=loan.id).count(), 1)
@@ -0,0 +1,74 @@
+import threading
+from decimal import Decimal
+from django.db import IntegrityError, connections
+from django.test import TestCase, TransactionTestCase
+from api.models.loan_application import LoanApplication
+from api.models.user import User
+from api.services import loan_shards
+from api.services.loan_write_coalescer import LoanWriteCoalescer
+
+
+class LoanWriteCoalescerTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.users = User.objects.bulk_create([User(email=f"user{i}@example.com", password="!") for i in range(8)])
+
+    def _create_concurrently(self, coalescer, fields_for):
+        barrier = threading.Barrier(len(self.users))
+        results = {}
+
+        def create(index, user):
+            barrier.wait()
+            try:
+                results[index] = coalescer.create(user, **fields_for(index))
+            except Exception as e:
+                results[index] = e
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=create, args=(i, user)) for i, user in enumerate(self.users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        return results
+
+    def test_concurrent_creates_commit_together_and_each_caller_gets_its_row(self):
+        coalescer = LoanWriteCoalescer(batch_size=100, flush_ms=200)
+        results = self._create_concurrently(
+            coalescer, lambda i: {"amount": Decimal(1000 + i), "tenure_months": 6, "purpose": f"loan {i}"}
+        )
+
+        for index, user in enumerate(self.users):
+            loan = results[index]
+            self.assertIsInstance(loan, LoanApplication)
+            stored = loan_shards.loan_queryset(loan.id).get()
+            self.assertEqual((stored.user_id, stored.purpose), (user.id, f"loan {index}"))
+        self.assertEqual(sum(user.loan_applications.count() for user in self.users), len(self.users))
+        metrics = coalescer.metrics()
+        self.assertEqual(metrics["loans_written"], len(self.users))
+        self.assertLess(metrics["batches"], len(self.users))
+
+    def test_a_failing_row_only_fails_its_own_caller(self):
+        coalescer = LoanWriteCoalescer(batch_size=len(self.users), flush_ms=1000)
+        results = self._create_concurrently(
+            coalescer, lambda i: {"amount": 500, "tenure_months": None if i == 3 else 6, "purpose": "Stock"}
+        )
+
+        self.assertIsInstance(results[3], IntegrityError)
+        created = [loan.id for i, loan in results.items() if i != 3]
+        stored = [loan_id for user in self.users for loan_id in user.loan_applications.values_list("id", flat=True)]
+        self.assertEqual(sorted(stored), sorted(created))
+        self.assertEqual(coalescer.metrics()["fallbacks"], 1)
+
+
+class LoanWriteCoalescerInTransactionTests(TestCase):
+    databases = "__all__"
+
+    def test_callers_in_a_transaction_insert_directly(self):
+        user = User.objects.create_user(email="user@example.com", password="password")
+        coalescer = LoanWriteCoalescer(flush_ms=10000)
+        loan = coalescer.create(user, amount=500, tenure_months=6, purpose="Stock")
+        self.assertTrue(loan_shards.loan_queryset(loan.id).exists())
+        self.assertEqual(coalescer.metrics()["batches"], 0)
@@ -0,0 +1,31 @@
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class EmailCaseMigrationTests(TransactionTestCase):
+    before = [("api", "0012_adminlog_admin_without_db_constraint")]
+    after = [("api", "0013_user_email_ci_unique")]
+
+    def setUp(self):
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes())
+        self.migrate(self.before)
+        self.User = MigrationExecutor(connection).loader.project_state(self.before[0]).apps.get_model("api", "User")
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+
+    def test_case_variant_duplicates_are_reported_before_the_constraint(self):
+        self.User.objects.create(email="Dup@Example.com", full_name="A", password="!")
+        duplicate = self.User.objects.create(email="dup@example.com", full_name="B", password="!")
+        self.User.objects.create(email="unique@example.com", full_name="C", password="!")
+
+        with self.assertRaisesMessage(IntegrityError, "dup@example.com (id"):
+            self.migrate(self.after)
+
+        duplicate.email = "dup+old@example.com"
+        duplicate.save()
+        self.migrate(self.after)
+        self.assertEqual(self.User.objects.count(), 3)
@@ -28,6 +28,8 @@ class LoanApplicationModelTests(TestCase):
         self.assertTrue("Loan" in str(loan))
 
 class AdminLogModelTests(TestCase):
+    databases = "__all__"
+
     def setUp(self):
         self.admin = User.objects.create_user(email="admin@example.com", password="password")
         self.admin.is_staff = True
@@ -0,0 +1,70 @@
+import pstats
+import tempfile
+from pathlib import Path
+from django.test import TestCase, Client, override_settings
+from api.models.user import User
+from api.services import profiler
+from api.services.jwt_service import JWTService
+
+
+class ProfilerTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp(prefix="profiles-")
+        settings_override = override_settings(PROFILING_DIR=Path(self.spool_dir), PROFILING_MAX_CAPTURES=3)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = User.objects.create_user(email="admin@example.com", password="password")
+        self.admin.is_staff = True
+        self.admin.save()
+        self.user = User.objects.create_user(email="user@example.com", password="password")
+
+    def _headers(self, user):
+        return {"HTTP_AUTHORIZATION": f"Bearer {JWTService.create_access_token(user.id, user.email)}"}
+
+    def test_admin_header_captures_request(self):
+        response = Client().get("/api/loans/", HTTP_X_PROFILE="1", **self._headers(self.admin))
+        self.assertEqual(response.status_code, 200)
+
+        [capture] = profiler.get_spool().list()
+        self.assertEqual(response["X-Profile-Id"], capture["id"])
+        self.assertEqual(capture["route"], "/api/loans/")
+        self.assertEqual(capture["status_code"], 200)
+        self.assertEqual(capture["trigger"], "header")
+        self.assertGreater(capture["duration_ms"], 0)
+        self.assertTrue(pstats.Stats(str(Path(self.spool_dir) / capture["files"]["pstats"])).total_calls)
+        self.assertTrue((Path(self.spool_dir) / capture["files"]["collapsed"]).exists())
+
+    def test_untriggered_requests_are_not_captured(self):
+        Client().get("/api/loans/", **self._headers(self.admin))
+        response = Client().get("/api/loans/", HTTP_X_PROFILE="1", **self._headers(self.user))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(profiler.get_spool().list(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_MODE=profiler.SAMPLER)
+    def test_sampled_requests_are_captured_and_spool_is_bounded(self):
+        client = Client()
+        for _ in range(5):
+            client.get("/api/loans/", **self._headers(self.user))
+        captures = profiler.get_spool().list()
+        self.assertEqual(len(captures), 3)
+        self.assertEqual({capture["trigger"] for capture in captures}, {"sample"})
+        self.assertEqual(len(list(Path(self.spool_dir).iterdir())), 6)  # .json + .collapsed each
+
+    def test_admin_lists_and_downloads_captures(self):
+        client = Client()
+        client.get("/api/loans/", HTTP_X_PROFILE="1", **self._headers(self.admin))
+        response = client.get("/api/admin/profiles", **self._headers(self.admin))
+        self.assertEqual(response.status_code, 200)
+        [capture] = response.json()
+        self.assertEqual(capture["route"], "/api/loans/")
+
+        response = client.get(f"/api/admin/profiles/{capture['id']}/collapsed", **self._headers(self.admin))
+        self.assertEqual(response.status_code, 200)
+        response = client.get(f"/api/admin/profiles/{capture['id']}/json", **self._headers(self.admin))
+        self.assertEqual(response.status_code, 404)
+        response = client.get("/api/admin/profiles", **self._headers(self.user))
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,148 @@
+import time
+from unittest import skipUnless
+from unittest.mock import patch
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.test import SimpleTestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from api.db_routers import ReplicaRouter
+from api.models.user import User
+from api.services import read_replicas
+from api.services.jwt_service import JWTService
+from api.services.read_replicas import LEAST_LATENCY, ReplicaMonitor, ReplicaSelector
+
+
+class ReplicaSelectorTests(SimpleTestCase):
+    def test_round_robin_rotates(self):
+        selector = ReplicaSelector(check=lambda alias: True)
+        picks = [selector.choose(["r1", "r2"]) for _ in range(4)]
+        self.assertEqual(picks, ["r1", "r2", "r1", "r2"])
+
+    def test_least_latency_prefers_the_fastest_measured_replica(self):
+        selector = ReplicaSelector(strategy=LEAST_LATENCY, check=lambda alias: True)
+        selector.record("r1", 5.0)
+        # r2 has not been measured yet, so it is tried first.
+        self.assertEqual(selector.choose(["r1", "r2"]), "r2")
+        selector.record("r2", 20.0)
+        self.assertEqual(selector.choose(["r1", "r2"]), "r1")
+
+    def test_unreachable_replicas_are_skipped_until_the_retry_interval(self):
+        reachable = {"r1": False, "r2": True}
+        selector = ReplicaSelector(retry_seconds=60, check=lambda alias: reachable[alias])
+        self.assertEqual({selector.choose(["r1", "r2"]) for _ in range(4)}, {"r2"})
+        self.assertFalse(selector.is_available("r1"))
+
+        reachable["r2"] = False
+        self.assertIsNone(selector.choose(["r1", "r2"]))
+
+    def test_monitor_takes_a_failing_replica_out_of_rotation(self):
+        selector = ReplicaSelector(check=lambda alias: True)
+        monitor = ReplicaMonitor("r1", selector)
+
+        def fail(sql, params, many, context):
+            raise OperationalError("unable to open database file")
+
+        with self.assertRaises(OperationalError):
+            monitor(fail, "SELECT 1", (), False, {})
+        self.assertFalse(selector.is_available("r1"))
+        self.assertEqual(selector.choose(["r1", "r2"]), "r2")
+
+
+@override_settings(DATABASE_REPLICAS={"default": ["replica_x"]})
+class ReadRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.reachable = True
+        selector = ReplicaSelector(check=lambda alias: self.reachable)
+        patcher = patch.object(read_replicas, "_selector", selector)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _in_request(self, method):
+        token = read_replicas.begin_request(method)
+        self.addCleanup(read_replicas.end_request, token)
+
+    def test_reads_outside_requests_and_of_unsafe_requests_use_the_primary(self):
+        self.assertEqual(read_replicas.read_alias("default"), "default")
+        self._in_request("POST")
+        self.assertEqual(read_replicas.read_alias("default"), "default")
+
+    def test_safe_requests_read_from_a_replica(self):
+        self._in_request("GET")
+        self.assertEqual(read_replicas.read_alias("default"), "replica_x")
+        self.assertEqual(ReplicaRouter().db_for_read(User), "replica_x")
+
+    def test_unavailable_replica_falls_back_to_the_primary(self):
+        self.reachable = False
+        self._in_request("GET")
+        self.assertEqual(read_replicas.read_alias("default"), "default")
+
+    def test_writer_is_pinned_to_the_primary(self):
+        self._in_request("POST")
+        read_replicas.bind_user(7)
+        read_replicas.record_write()
+
+        self._in_request("GET")
+        read_replicas.bind_user(7)
+        self.assertEqual(read_replicas.read_alias("default"), "default")
+
+        self._in_request("GET")
+        read_replicas.bind_user(8)
+        self.assertEqual(read_replicas.read_alias("default"), "replica_x")
+
+    @override_settings(READ_YOUR_WRITES_SECONDS=0.01)
+    def test_pin_expires(self):
+        read_replicas.mark_written(7)
+        time.sleep(0.05)
+        self._in_request("GET")
+        read_replicas.bind_user(7)
+        self.assertEqual(read_replicas.read_alias("default"), "replica_x")
+
+    def test_replicas_need_a_shared_cache(self):
+        locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        with override_settings(CACHES=locmem):
+            self.assertEqual([error.id for error in read_replicas.check_replica_cache(None)], ["api.E006"])
+            with override_settings(DATABASE_REPLICAS={"default": []}):
+                self.assertEqual(read_replicas.check_replica_cache(None), [])
+        shared = {"default": {"BACKEND": "api.cache_backends.SharedMemoryCache", "LOCATION": "unused"}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(read_replicas.check_replica_cache(None), [])
+
+    def test_objects_read_from_a_replica_are_written_to_the_primary(self):
+        user = User(id=1, email="a@example.com")
+        user._state.db = "replica_x"
+        other = User(id=2, email="b@example.com")
+        other._state.db = "default"
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_write(User, instance=user), "default")
+        self.assertTrue(router.allow_relation(user, other))
+        self.assertFalse(router.allow_migrate("replica_x", "api", "user"))
+
+
+@skipUnless(any(settings.DATABASE_REPLICAS.values()), "run with DATABASE_REPLICA_PATHS set")
+@override_settings(AUTH_USER_CACHE_SECONDS=0)  # every request looks its user up
+class ReplicaReadsTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        self.replica = settings.DATABASE_REPLICAS["default"][0]
+        self.user = User.objects.create_user(email="reader@example.com", password="password")
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {JWTService.create_access_token(self.user.id, self.user.email)}"}
+
+    def _replica_queries(self, method, path, **kwargs):
+        with CaptureQueriesContext(connections[self.replica]) as queries:
+            response = getattr(Client(), method)(path, content_type="application/json", **self.headers, **kwargs)
+        self.assertLess(response.status_code, 300)
+        return len(queries)
+
+    def test_reads_go_to_the_replica_until_the_user_writes(self):
+        self.assertGreater(self._replica_queries("get", "/api/loans/"), 0)
+        self.assertGreater(self._replica_queries("get", "/api/auth/me"), 0)
+
+        self.assertEqual(
+            self._replica_queries("post", "/api/loans/", data={"amount": 500, "tenure_months": 6, "purpose": "Stock"}),
+            0,
+        )
+        self.assertEqual(self._replica_queries("get", "/api/loans/"), 0)
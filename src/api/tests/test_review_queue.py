@@ -0,0 +1,155 @@
+import threading
+from datetime import timedelta
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, Client
+from django.utils import timezone
+from api.models.loan_application import LoanApplication, LoanStatus
+from api.models.user import User
+from api.services import review_queue
+from api.services.jwt_service import JWTService
+from api.services.loan_state import transition_loan
+
+
+def _admin(email):
+    admin = User.objects.create_user(email=email, password="password")
+    admin.is_staff = True
+    admin.save()
+    return admin
+
+
+class ReviewQueueTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.alice = _admin("alice@example.com")
+        self.bob = _admin("bob@example.com")
+        self.user = User.objects.create_user(email="user@example.com", password="password")
+        now = timezone.now()
+        self.loans = [
+            LoanApplication.objects.create(
+                user=self.user, amount=1000, tenure_months=6, purpose=f"loan {i}", created_at=now - timedelta(hours=10 - i)
+            )
+            for i in range(6)
+        ]
+
+    def _headers(self, admin):
+        return {"HTTP_AUTHORIZATION": f"Bearer {JWTService.create_access_token(admin.id, admin.email)}"}
+
+    def _ids(self, loans):
+        return [loan.id for loan in loans]
+
+    def test_claims_are_oldest_first_and_disjoint(self):
+        LoanApplication.objects.filter(id=self.loans[0].id).update(status=LoanStatus.APPROVED)
+
+        alice = Client().post("/api/admin/queue/claim?n=2", **self._headers(self.alice))
+        self.assertEqual(alice.status_code, 200)
+        self.assertEqual([loan["id"] for loan in alice.json()], self._ids(self.loans[1:3]))
+        self.assertIsNotNone(alice.json()[0]["lease_expires_at"])
+
+        bob = review_queue.claim(self.bob, 10)
+        self.assertEqual(self._ids(bob), self._ids(self.loans[3:]))
+        self.assertEqual(review_queue.claim(self.alice, 10), [])
+
+    def test_expired_leases_return_to_the_queue_first(self):
+        review_queue.claim(self.alice, 2)
+        LoanApplication.objects.filter(id=self.loans[1].id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(self._ids(review_queue.claim(self.bob, 2)), [self.loans[1].id, self.loans[2].id])
+        self.assertFalse(review_queue.renew(self.loans[1].id, self.alice).applied)
+
+    def test_renew_and_release(self):
+        loan_id = self.loans[0].id
+        review_queue.claim(self.alice, 1, lease_seconds=60)
+        headers = self._headers(self.alice)
+
+        response = Client().post(f"/api/admin/queue/{loan_id}/renew?lease_seconds=600", **headers)
+        self.assertEqual(response.status_code, 200)
+        expires = LoanApplication.objects.get(id=loan_id).lease_expires_at
+        self.assertGreater(expires, timezone.now() + timedelta(seconds=500))
+
+        self.assertEqual(Client().post(f"/api/admin/queue/{loan_id}/renew", **self._headers(self.bob)).status_code, 409)
+        self.assertEqual(Client().post(f"/api/admin/queue/{loan_id}/release", **self._headers(self.bob)).status_code, 409)
+        self.assertEqual(Client().post(f"/api/admin/queue/{loan_id}/release", **headers).status_code, 200)
+        self.assertEqual(self._ids(review_queue.claim(self.bob, 1)), [loan_id])
+
+    def test_decided_loans_cannot_be_renewed(self):
+        loan_id = self.loans[0].id
+        review_queue.claim(self.alice, 1)
+        LoanApplication.objects.filter(id=loan_id).update(status=LoanStatus.REJECTED)
+        self.assertFalse(review_queue.renew(loan_id, self.alice).applied)
+
+    def test_only_the_lease_holder_can_decide_a_leased_loan(self):
+        loan_id = self.loans[0].id
+        review_queue.claim(self.alice, 1)
+        url = f"/api/admin/loans/{loan_id}/status"
+        payload = {"status": "APPROVED", "reason": "ok"}
+
+        response = Client().put(url, data=payload, content_type="application/json", **self._headers(self.bob))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(LoanApplication.objects.get(id=loan_id).status, LoanStatus.PENDING)
+
+        response = Client().put(url, data=payload, content_type="application/json", **self._headers(self.alice))
+        self.assertEqual(response.status_code, 200)
+        loan = LoanApplication.objects.get(id=loan_id)
+        self.assertEqual((loan.status, loan.lease_owner, loan.lease_expires_at), (LoanStatus.APPROVED, None, None))
+
+    def test_expired_lease_does_not_block_a_decision(self):
+        loan_id = self.loans[0].id
+        review_queue.claim(self.alice, 1)
+        LoanApplication.objects.filter(id=loan_id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        result = transition_loan(loan_id, LoanStatus.REJECTED, actor=self.bob)
+        self.assertTrue(result.applied)
+        self.assertIsNone(LoanApplication.objects.get(id=loan_id).lease_owner)
+
+    def test_candidates_are_read_through_the_queue_index(self):
+        loans = LoanApplication.objects.filter(status=LoanStatus.PENDING)
+        for queryset in (
+            loans.filter(lease_expires_at__isnull=True).order_by("created_at")[:10],
+            loans.filter(lease_expires_at__lte=timezone.now()).order_by("created_at")[:10],
+        ):
+            self.assertIn("USING INDEX loan_review_queue", queryset.explain())
+        # Never-leased loans are already in created_at order in the index.
+        self.assertNotIn("TEMP B-TREE", loans.filter(lease_expires_at__isnull=True).order_by("created_at")[:10].explain())
+
+    def test_claim_requires_admin(self):
+        response = Client().post("/api/admin/queue/claim", **self._headers(self.user))
+        self.assertEqual(response.status_code, 401)
+
+
+class ConcurrentClaimTests(TransactionTestCase):
+    databases = "__all__"
+
+    def test_concurrent_claims_never_share_a_loan(self):
+        admins = User.objects.bulk_create(
+            [User(email=f"admin{i}@example.com", password="!", is_staff=True) for i in range(6)]
+        )
+        user = User.objects.create(email="user@example.com", password="!")
+        LoanApplication.objects.bulk_create(
+            [LoanApplication(user=user, amount=1000, tenure_months=6, purpose="loan") for _ in range(40)]
+        )
+        barrier = threading.Barrier(len(admins))
+        claimed = {}
+
+        def claim(admin):
+            barrier.wait()
+            try:
+                claimed[admin.id] = [loan.id for loan in review_queue.claim(admin, 5)]
+            except Exception as e:
+                claimed[admin.id] = e
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=claim, args=(admin,)) for admin in admins]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+        leased = [loan_id for ids in claimed.values() for loan_id in ids]
+        self.assertEqual(len(leased), len(set(leased)))
+        self.assertEqual(len(leased), 30)
+        for admin_id, ids in claimed.items():
+            self.assertEqual(
+                set(LoanApplication.objects.filter(lease_owner_id=admin_id).values_list("id", flat=True)), set(ids)
+            )
@@ -1,8 +1,17 @@
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from django.conf import settings
+from django.db import DatabaseError
 from django.test import TestCase
 from unittest.mock import patch
 from api.models.user import User
 from api.services.jwt_service import JWTService
 from api.services.email_service import send_loan_approval_email
+from api.services.audit_service import AuditLogWriter, BUFFERED, IN_TRANSACTION
+from api.models.admin_log import AdminLog
+from api.services.audit_journal import AuditJournal
 
 class JWTServiceTests(TestCase):
     def test_create_and_validate_token(self):
@@ -32,3 +41,69 @@ class EmailServiceTests(TestCase):
         args = mock_send_mail.call_args[1]
         self.assertIn("John Doe", args['html_message'])
         self.assertIn("1,000.00", args['html_message'])
+
+    def test_email_service_imports_mail_stack_lazily(self):
+        code = (
+            "import sys; import api.services.email_service; "
+            "print(any(m in sys.modules for m in ('django.core.mail', 'django.template.loader')))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "False")
+
+class AuditLogWriterTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email="auditor@example.com", password="password")
+
+    def test_in_transaction_mode_writes_immediately(self):
+        writer = AuditLogWriter(mode=IN_TRANSACTION)
+        writer.record(self.admin, "APPROVED_LOAN", "LoanApplication", 1)
+        self.assertEqual(AdminLog.objects.count(), 1)
+        self.assertEqual(writer.metrics()["entries_written"], 1)
+
+    def test_buffered_mode_flushes_on_size_threshold(self):
+        writer = AuditLogWriter(mode=BUFFERED, buffer_size=3, flush_interval=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            for target_id in range(2):
+                writer.record(self.admin, "REJECTED_LOAN", "LoanApplication", target_id)
+        self.assertEqual(AdminLog.objects.count(), 0)
+        self.assertEqual(writer.metrics()["buffer_depth"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            writer.record(self.admin, "REJECTED_LOAN", "LoanApplication", 2)
+        self.assertEqual(AdminLog.objects.count(), 3)
+        metrics = writer.metrics()
+        self.assertEqual(metrics["buffer_depth"], 0)
+        self.assertEqual(metrics["flushes"], 1)
+
+    def test_buffered_mode_close_flushes_remaining(self):
+        writer = AuditLogWriter(mode=BUFFERED, buffer_size=100, flush_interval=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            writer.record(self.admin, "APPROVED_LOAN", "LoanApplication", 7)
+        writer.close()
+        self.assertTrue(AdminLog.objects.filter(target_id=7).exists())
+
+    def test_buffer_is_capped_while_flushes_fail(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        journal = AuditJournal(Path(tmp.name) / "journal.jsonl", grace_seconds=0)
+        writer = AuditLogWriter(mode=BUFFERED, buffer_size=2, flush_interval=0, journal=journal, max_buffer=3)
+        with patch.object(AdminLog.objects, "bulk_create", side_effect=DatabaseError("database is down")), \
+                self.assertLogs("api.services.audit_service", "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                for target_id in range(5):
+                    writer.record(self.admin, "APPROVED_LOAN", "LoanApplication", target_id)
+
+        metrics = writer.metrics()
+        self.assertEqual((metrics["buffer_depth"], metrics["spilled_entries"], metrics["dropped_entries"]), (3, 2, 0))
+        self.assertEqual([record["entry"]["target_id"] for record in journal.pending()], [0, 1])
+        self.assertEqual(journal.recover()["written"], 2)
+        writer.close()
+        self.assertEqual(sorted(AdminLog.objects.values_list("target_id", flat=True)), [0, 1, 2, 3, 4])
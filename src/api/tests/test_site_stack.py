@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.test import TestCase, Client, override_settings
+from api.middleware.site_stack import check_site_middleware
+from api.models.user import User
+
+
+class SiteMiddlewareStackTests(TestCase):
+    def test_api_requests_skip_site_middleware(self):
+        response = Client().get("/api/hello")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Frame-Options", response)
+        self.assertNotIn("Vary", response)
+        self.assertFalse(hasattr(response.wsgi_request, "user"))
+        self.assertFalse(hasattr(response.wsgi_request, "session"))
+        # Security headers still apply to the API.
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+
+    def test_admin_keeps_the_full_stack(self):
+        response = Client().get("/admin/login/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Frame-Options"], "DENY")
+        self.assertIn("csrftoken", response.cookies)
+        self.assertTrue(response.wsgi_request.user.is_anonymous)
+
+    def test_admin_enforces_csrf_and_logs_in_with_a_session(self):
+        User.objects.create_superuser(email="admin@example.com", password="password")
+        client = Client(enforce_csrf_checks=True)
+        response = client.post("/admin/login/", {"username": "admin@example.com", "password": "password"})
+        self.assertEqual(response.status_code, 403)
+
+        client.get("/admin/login/")
+        response = client.post("/admin/login/", {
+            "username": "admin@example.com",
+            "password": "password",
+            "csrfmiddlewaretoken": client.cookies["csrftoken"].value,
+            "next": "/admin/",
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(client.get("/admin/").status_code, 200)
+
+    def test_admin_middleware_is_checked_in_the_site_stack(self):
+        self.assertEqual(check_site_middleware(None), [])
+        without_sessions = [m for m in settings.SITE_MIDDLEWARE if not m.endswith("SessionMiddleware")]
+        with override_settings(SITE_MIDDLEWARE=without_sessions):
+            self.assertEqual([error.id for error in check_site_middleware(None)], ["api.E005"])
+        without_stack = [m for m in settings.MIDDLEWARE if not m.endswith("SiteMiddlewareStack")]
+        with override_settings(MIDDLEWARE=without_stack):
+            self.assertEqual([error.id for error in check_site_middleware(None)], ["api.E003", "api.E004", "api.E005"])
@@ -0,0 +1,121 @@
+import json
+import tempfile
+import threading
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, Client, override_settings
+from api.models.user import User
+from api.models.loan_application import LoanApplication
+from api.services import loan_shards, slow_query_log
+from api.services.jwt_service import JWTService
+from api.services.slow_query_log import SlowQueryLogger, fingerprint
+
+
+class FingerprintTests(TestCase):
+    def test_literals_and_parameter_lists_are_stripped(self):
+        a = fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'bob' LIMIT 21")
+        b = fingerprint("SELECT *  FROM t WHERE id IN (%s) AND name = 'o''neil' LIMIT 5")
+        self.assertEqual(a, "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?")
+        self.assertEqual(b, "SELECT * FROM t WHERE id IN (?) AND name = ? LIMIT ?")
+
+    def test_quoted_identifiers_with_digits_are_kept(self):
+        self.assertEqual(fingerprint('SELECT "t1"."col2" FROM "t1"'), 'SELECT "t1"."col2" FROM "t1"')
+
+
+class SlowQueryLoggerTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "slow.jsonl"
+        self.logger = SlowQueryLogger(threshold_ms=0, path=self.path)
+        user = User.objects.create_user(email="admin@example.com", password="password")
+        user.is_staff = True
+        user.save()
+        self.token = JWTService.create_access_token(user.id, user.email)
+        user.loan_applications.create(amount=1000, tenure_months=6, purpose="Rent")
+
+    def _entries(self):
+        if not self.path.exists():
+            return []
+        return [json.loads(line) for line in self.path.read_text().splitlines()]
+
+    @override_settings(SLOW_QUERY_LOG_ENABLED=True)
+    def test_records_route_caller_and_plan_once_per_fingerprint(self):
+        # The unindexed order_by('-created_at') shows up as a temporary sort.
+        with connection.execute_wrapper(self.logger):
+            Client().get("/api/admin/loans", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+            Client().get("/api/admin/loans", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+        self.logger.drain()
+        entries = [e for e in self._entries() if '"api_loanapplication"' in e["fingerprint"]]
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0]["fingerprint_id"], entries[1]["fingerprint_id"])
+        self.assertEqual(entries[0]["route"], "GET /api/admin/loans")
+        if loan_shards.is_sharded():
+            # The per-shard queries are read by the merge, not the endpoint.
+            self.assertIn("api/services/loan_shards.py", entries[0]["caller"])
+        else:
+            self.assertIn("api/routers/admin/routes.py", entries[0]["caller"])
+            self.assertIn("list_all_loans", entries[0]["caller"])
+        self.assertIn("plan", entries[0])
+        self.assertNotIn("plan", entries[1])
+        self.assertTrue(any("TEMP B-TREE" in line for line in entries[0]["plan_warnings"]))
+
+    def test_failed_queries_are_not_logged(self):
+        with connection.execute_wrapper(self.logger), self.assertRaises(DatabaseError):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute("SELECT * FROM no_such_table")
+        self.logger.drain()
+        self.assertFalse(any("no_such_table" in entry["fingerprint"] for entry in self._entries()))
+
+    def test_plans_are_captured_off_the_calling_thread(self):
+        threads = []
+        explain = self.logger._explain
+
+        def record_thread(*args):
+            threads.append(threading.current_thread())
+            return explain(*args)
+
+        with patch.object(self.logger, "_explain", side_effect=record_thread), connection.execute_wrapper(self.logger):
+            list(LoanApplication.objects.filter(amount__gt=10))
+            self.logger.drain()
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+        self.assertIn("plan", self._entries()[0])
+
+    def test_plan_is_skipped_when_the_queue_is_full(self):
+        logger = SlowQueryLogger(threshold_ms=0, path=self.path, explain_queue_size=1)
+        logger._worker = threading.current_thread()  # keep the queue from being drained
+        with connection.execute_wrapper(logger):
+            list(LoanApplication.objects.filter(amount__gt=10))
+            list(LoanApplication.objects.filter(amount__lt=10))
+        entries = self._entries()
+        self.assertEqual(len(entries), 1)
+        self.assertNotIn("plan", entries[0])
+
+    def test_fast_queries_are_not_logged(self):
+        logger = SlowQueryLogger(threshold_ms=10_000, path=self.path)
+        with connection.execute_wrapper(logger):
+            list(LoanApplication.objects.all())
+        self.assertFalse(self.path.exists())
+
+    def test_report_groups_by_fingerprint(self):
+        with connection.execute_wrapper(self.logger):
+            for _ in range(3):
+                list(LoanApplication.objects.filter(amount__gt=10).order_by("-created_at"))
+        self.logger.drain()
+
+        groups = slow_query_log.summarize(self.path)
+        loan_group = next(g for g in groups if '"api_loanapplication"' in g["fingerprint"])
+        self.assertEqual(loan_group["count"], 3)
+        self.assertIsNotNone(loan_group["plan"])
+
+        out = StringIO()
+        call_command("slow_queries", file=str(self.path), stdout=out)
+        self.assertIn(loan_group["fingerprint_id"], out.getvalue())
+        self.assertIn("3 calls", out.getvalue())
@@ -0,0 +1,66 @@
+from django.db import connections
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from api import sparse_fields
+from api.models.admin_log import AdminLog
+from api.models.user import User
+from api.services import loan_shards
+from api.routers.loans._schemas import LoanApplicationResponse
+from api.services.jwt_service import JWTService
+
+
+class SparseFieldsTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", password="password")
+        self.admin.is_staff = True
+        self.admin.save()
+        self.user = User.objects.create_user(email="user@example.com", password="password")
+        self.loans = [
+            self.user.loan_applications.create(amount=1000 + i, tenure_months=6, purpose="A long purpose " * 20)
+            for i in range(3)
+        ]
+        AdminLog.objects.create(
+            admin=self.admin, action="APPROVED_LOAN", target_id=self.loans[0].id,
+            target_model="LoanApplication", details={"reason": "ok"},
+        )
+
+    def _get(self, url, user, **params):
+        token = JWTService.create_access_token(user.id, user.email)
+        return Client().get(url, params, HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_list_reads_and_returns_only_requested_fields(self):
+        with CaptureQueriesContext(connections[loan_shards.shard_for_user(self.user.id)]) as queries:
+            response = self._get("/api/loans/", self.user, fields="status,amount,id")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0], {"id": self.loans[0].id, "amount": 1000.0, "status": "PENDING"})
+        loan_query = next(query["sql"] for query in queries if "api_loanapplication" in query["sql"])
+        self.assertNotIn("purpose", loan_query)
+
+    def test_detail_and_admin_routes(self):
+        response = self._get(f"/api/loans/{self.loans[1].id}", self.user, fields="id,amount")
+        self.assertEqual(response.json(), {"id": self.loans[1].id, "amount": 1001.0})
+
+        response = self._get("/api/admin/loans", self.admin, fields="id")
+        self.assertEqual(response.json(), [{"id": loan.id} for loan in reversed(self.loans)])
+
+        response = self._get("/api/admin/logs", self.admin, fields="action,details")
+        self.assertEqual(response.json(), [{"action": "APPROVED_LOAN", "details": {"reason": "ok"}}])
+
+    def test_without_fields_the_full_schema_is_returned(self):
+        response = self._get("/api/loans/", self.user)
+        self.assertEqual(set(response.json()[0]), set(LoanApplicationResponse.model_fields))
+
+    def test_unknown_fields_are_rejected(self):
+        self.assertEqual(self._get("/api/loans/", self.user, fields="id,password").status_code, 400)
+        self.assertEqual(self._get("/api/loans/", self.user, fields=",").status_code, 400)
+
+    def test_derived_schemas_are_cached_per_field_set(self):
+        first = sparse_fields.parse_fields(LoanApplicationResponse, "status,id")
+        second = sparse_fields.parse_fields(LoanApplicationResponse, "id, status")
+        self.assertEqual(first, ("id", "status"))
+        self.assertIs(
+            sparse_fields.subset_schema(LoanApplicationResponse, first),
+            sparse_fields.subset_schema(LoanApplicationResponse, second),
+        )
@@ -0,0 +1,117 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+from django.test import TestCase, Client, override_settings
+from api.models.user import User
+from api.services import tracing
+from api.services.jwt_service import JWTService
+
+
+class SpanApiTests(TestCase):
+    def test_spans_outside_a_trace_are_noops(self):
+        @tracing.traced("work")
+        def work():
+            return 42
+
+        with tracing.span("outside") as span:
+            self.assertIsNone(span)
+        self.assertEqual(work(), 42)
+        self.assertIsNone(tracing.current_trace())
+
+    def test_nested_spans_share_the_trace_and_link_parents(self):
+        @tracing.traced("child")
+        def child():
+            with tracing.span("grandchild", key="value"):
+                pass
+
+        with tracing.start_trace("root", sampled=True) as root:
+            child()
+
+        names = {span.name: span for span in root.trace.spans}
+        self.assertEqual(list(names), ["root", "child", "grandchild"])
+        self.assertEqual(names["child"].parent_id, root.span_id)
+        self.assertEqual(names["grandchild"].parent_id, names["child"].span_id)
+        self.assertEqual(names["grandchild"].attributes, {"key": "value"})
+        self.assertTrue(all(span.end_ns >= span.start_ns for span in root.trace.spans))
+
+    def test_span_limit_drops_extra_spans(self):
+        with tracing.start_trace("root", sampled=True, max_spans=3) as root:
+            for _ in range(5):
+                with tracing.span("child"):
+                    pass
+        self.assertEqual(len(root.trace.spans), 3)
+        self.assertEqual(root.trace.dropped_spans, 3)
+
+
+class TracingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "traces.jsonl"
+        self.user = User.objects.create_user(email="user@example.com", password="password")
+        self.token = JWTService.create_access_token(self.user.id, self.user.email)
+
+    def _traces(self):
+        if not self.path.exists():
+            return []
+        return [json.loads(line) for line in self.path.read_text().splitlines()]
+
+    def _get_loans(self):
+        return Client().get("/api/loans/", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+    def test_sampled_request_exports_otlp_spans(self):
+        with self.settings(TRACING_FILE=self.path, TRACING_SAMPLE_RATE=1.0):
+            response = self._get_loans()
+        self.assertEqual(response.status_code, 200)
+
+        traces = self._traces()
+        self.assertEqual(len(traces), 1)
+        spans = traces[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        by_name = {}
+        for span in spans:
+            by_name.setdefault(span["name"], []).append(span)
+
+        root = by_name["GET /api/loans/"][0]
+        attributes = {item["key"]: item["value"] for item in root["attributes"]}
+        self.assertEqual(attributes["http.route"], {"stringValue": "/api/loans/"})
+        self.assertEqual(attributes["http.status_code"], {"intValue": "200"})
+        self.assertEqual(attributes["sampling.reason"], {"stringValue": "head"})
+        self.assertNotIn("parentSpanId", root)
+
+        for name in ("auth.authenticate", "jwt.validate", "db.query", "ninja.render"):
+            self.assertIn(name, by_name)
+        self.assertTrue(all(span["traceId"] == root["traceId"] for span in spans))
+        self.assertEqual(by_name["jwt.validate"][0]["parentSpanId"], by_name["auth.authenticate"][0]["spanId"])
+
+    def test_unsampled_fast_request_is_not_exported(self):
+        with self.settings(TRACING_FILE=self.path, TRACING_SAMPLE_RATE=0.0, TRACING_SLOW_THRESHOLD_MS=10_000):
+            self._get_loans()
+        self.assertEqual(self._traces(), [])
+
+    def test_slow_request_is_exported_without_sampling(self):
+        with self.settings(TRACING_FILE=self.path, TRACING_SAMPLE_RATE=0.0, TRACING_SLOW_THRESHOLD_MS=0):
+            self._get_loans()
+        traces = self._traces()
+        self.assertEqual(len(traces), 1)
+        [root] = traces[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        self.assertIn({"key": "sampling.reason", "value": {"stringValue": "slow"}}, root["attributes"])
+
+    def test_unsampled_request_builds_no_child_spans(self):
+        with tracing.start_trace("root", sampled=False) as root:
+            self.assertIsNone(tracing.current_trace())
+            with tracing.span("child") as child:
+                self.assertIsNone(child)
+        self.assertEqual(root.trace.spans, [root])
+        self.assertGreater(root.end_ns, 0)
+
+        with self.settings(TRACING_FILE=self.path, TRACING_SAMPLE_RATE=0.0, TRACING_SLOW_THRESHOLD_MS=10_000), \
+                patch.object(tracing, "db_span_wrapper") as wrapper:
+            self.assertEqual(self._get_loans().status_code, 200)
+        wrapper.assert_not_called()
+
+    @override_settings(TRACING_ENABLED=False)
+    def test_disabled_tracing_records_nothing(self):
+        with self.settings(TRACING_FILE=self.path, TRACING_SAMPLE_RATE=1.0):
+            self._get_loans()
+        self.assertEqual(self._traces(), [])
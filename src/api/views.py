@@ -1,3 +1,69 @@
-from django.shortcuts import render
+import asyncio
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+
+from api.services.auth_service import AuthBearer
+from api.services.event_hub import TooManyConnections, get_event_hub
+
+
+async def loan_events(request):
+    """
+    Server-Sent Events stream of the authenticated user's loan status changes.
+
+    Authenticated with the same bearer token as the API. Clients resume after
+    a disconnect by sending the ``Last-Event-ID`` header; if events were lost
+    in between, a ``reset`` event tells the client to refetch its loans.
+    Must be served by an ASGI server.
+    """
+    if request.method != "GET":
+        return JsonResponse({"detail": "Method not allowed"}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "Event streams require an ASGI server"}, status=501)
+
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    user = None
+    if scheme.lower() == "bearer" and token:
+        user = await sync_to_async(AuthBearer().authenticate)(request, token)
+    if user is None:
+        return JsonResponse({"detail": "Unauthorized"}, status=401)
+
+    hub = get_event_hub()
+    if hub.connection_count(user.id) >= hub.max_connections_per_user:
+        return JsonResponse({"detail": "Too many open event streams"}, status=429)
+
+    heartbeat = getattr(settings, "SSE_HEARTBEAT_SECONDS", 15)
+    last_event_id = request.headers.get("Last-Event-ID")
+
+    async def stream():
+        # Subscribe when streaming starts, so the finally clause always
+        # runs for a registered subscriber.
+        try:
+            subscriber, backlog, missed = hub.subscribe(user.id, last_event_id)
+        except TooManyConnections:
+            return
+        try:
+            yield "retry: 3000\n\n"
+            if missed:
+                yield "event: reset\ndata: {}\n\n"
+            for event in backlog:
+                yield event.encode()
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    # The client fell too far behind; it can resume with Last-Event-ID.
+                    break
+                yield event.encode()
+        finally:
+            hub.unsubscribe(subscriber)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,167 @@
+"""
+Audit database isolation benchmark.
+
+Measures customer write throughput while AdminLog entries are written at
+the same time. For each layout (``shared``: AdminLog in the main
+database; ``dedicated``: AdminLog in its own database, as with
+``AUDIT_DATABASE_PATH``) and each audit volume, spawns a fresh interpreter
+with every database redirected to a scratch directory. ``--workers``
+customer processes (like a multi-process WSGI server) create loans, one
+autocommitted INSERT each, while ``--audit-workers`` processes insert
+AdminLog entries one at a time, paced to ``--audit-rates`` entries per
+second in total, until the customers are done. Reports customer loans per
+second and the audit entries actually written alongside. The audit
+writers are paced rather than run flat out so that, on a machine with few
+cores, they compete with the customers for the write lock rather than
+just for CPU.
+
+With a shared database the two kinds of writes queue on one SQLite write
+lock, so loan throughput drops as audit volume grows; with a dedicated
+audit database it only pays for the CPU the audit writers use.
+
+Usage (from the ``src`` directory):
+
+    python benchmarks/audit_isolation.py --workers 4 --audit-rates 0 100 300 --loans 4000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+CHILD_SCRIPT = """
+import json, multiprocessing, sys, tempfile, time
+from pathlib import Path
+import django
+from django.conf import settings
+
+scratch = Path(tempfile.mkdtemp(prefix="audit-bench-"))
+for alias, database in settings.DATABASES.items():
+    database["NAME"] = scratch / f"{alias}.sqlite3"
+django.setup()
+
+from django.core.management import call_command
+from django.db import connections
+from api.models.admin_log import AdminLog
+from api.models.user import User
+
+for alias in settings.DATABASES:
+    call_command("migrate", database=alias, verbosity=0)
+
+workers, audit_workers, audit_rate, total = int(sys.argv[1]), int(sys.argv[2]), float(sys.argv[3]), int(sys.argv[4])
+users = User.objects.bulk_create(
+    [User(email=f"bench-{i}@example.com", full_name="Bench", password="!") for i in range(workers * 16)]
+)
+connections.close_all()
+context = multiprocessing.get_context("fork")
+done = context.Event()
+
+def customer(index, results):
+    try:
+        mine = users[index::workers]
+        for n in range(total // workers):
+            mine[n % len(mine)].loan_applications.create(amount=1000, tenure_months=6, purpose="bench")
+        results.put(None)
+    except Exception as e:
+        results.put(repr(e))
+    finally:
+        connections.close_all()
+
+def auditor(index, results):
+    written = 0
+    interval = audit_workers / audit_rate
+    started = time.perf_counter()
+    try:
+        while not done.is_set():
+            delay = started + written * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            AdminLog.objects.create(
+                admin_id=users[index % len(users)].id,
+                action="APPROVED_LOAN",
+                target_model="LoanApplication",
+                target_id=written,
+                details={"reason": "bench"},
+            )
+            written += 1
+    except Exception as e:
+        results.put(repr(e))
+    finally:
+        results.put(written)
+        connections.close_all()
+
+customer_results, audit_results = context.Queue(), context.Queue()
+auditors = [context.Process(target=auditor, args=(i, audit_results)) for i in range(audit_workers if audit_rate else 0)]
+customers = [context.Process(target=customer, args=(i, customer_results)) for i in range(workers)]
+for process in auditors:
+    process.start()
+start = time.perf_counter()
+for process in customers:
+    process.start()
+errors = [error for error in (customer_results.get() for _ in customers) if error]
+elapsed = time.perf_counter() - start
+done.set()
+audit_entries = 0
+for _ in auditors:
+    result = audit_results.get()
+    while not isinstance(result, int):
+        errors.append(result)
+        result = audit_results.get()
+    audit_entries += result
+for process in auditors + customers:
+    process.join()
+print(json.dumps({
+    "elapsed_s": elapsed,
+    "loans": total // workers * workers,
+    "audit_entries": audit_entries,
+    "errors": errors[:3],
+}))
+"""
+
+
+def run(layout: str, workers: int, audit_workers: int, audit_rate: float, loans: int) -> dict:
+    env = dict(os.environ, TRACING_ENABLED="false", SLOW_QUERY_LOG_ENABLED="false")
+    env.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    env.pop("AUDIT_DATABASE_PATH", None)
+    if layout == "dedicated":
+        # The child redirects the path into its scratch directory.
+        env["AUDIT_DATABASE_PATH"] = "audit.sqlite3"
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, str(workers), str(audit_workers), str(audit_rate), str(loans)],
+        cwd=SRC_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent customer writer processes")
+    parser.add_argument("--audit-workers", type=int, default=2, help="Audit writer processes")
+    parser.add_argument("--audit-rates", type=float, nargs="+", default=[0, 100, 300], help="Audit entries per second to compare")
+    parser.add_argument("--loans", type=int, default=4000, help="Loans created per run")
+    args = parser.parse_args()
+
+    print(f"{args.loans} loans from {args.workers} customer processes")
+    print(f"  {'layout':<11}{'audit target/s':>15}{'loans/s':>10}{'vs. idle':>10}{'audit/s':>10}  errors")
+    for layout in ("shared", "dedicated"):
+        baseline = None
+        for audit_rate in args.audit_rates:
+            result = run(layout, args.workers, args.audit_workers, audit_rate, args.loans)
+            rate = result["loans"] / result["elapsed_s"]
+            baseline = baseline or rate
+            print(
+                f"  {layout:<11}{audit_rate:>15.0f}{rate:>10.0f}{f'x{rate / baseline:.2f}':>10}"
+                f"{result['audit_entries'] / result['elapsed_s']:>10.0f}  {result['errors'] or 'none'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Cache backend benchmark.
+
+Compares Django's local-memory and file-based caches with
+``api.cache_backends.SharedMemoryCache`` on two workloads:
+
+- ``latency``: single-process get (hit), get (miss) and set cost per
+  operation, with values shaped like the cached ``User`` rows,
+- ``workers``: ``--workers`` forked processes (like a multi-process WSGI
+  server) each look up the same ``--keys`` hot keys ``--rounds`` times,
+  loading and storing a key on a miss. Reports how many loads (the
+  ``User`` queries the cache is there to save) each backend needed and
+  the lookups per second.
+
+Usage (from the ``src`` directory):
+
+    python benchmarks/cache_backends.py --workers 4 --keys 2000 --rounds 5
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SRC_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.cache.backends.filebased import FileBasedCache  # noqa: E402
+from django.core.cache.backends.locmem import LocMemCache  # noqa: E402
+
+from api.cache_backends import SharedMemoryCache  # noqa: E402
+from api.models.user import User  # noqa: E402
+
+BACKENDS = ("locmem", "file", "shared_memory")
+
+
+def make_cache(backend: str, scratch: Path):
+    params = {"TIMEOUT": 300, "OPTIONS": {"MAX_ENTRIES": 100000}}
+    if backend == "locmem":
+        return LocMemCache("bench", params)
+    if backend == "file":
+        return FileBasedCache(str(scratch / "file"), params)
+    return SharedMemoryCache(str(scratch / "shared.cache"), {"TIMEOUT": 300, "OPTIONS": {"SLOTS": 65536, "SLOT_SIZE": 1024}})
+
+
+def user_row(user_id: int) -> User:
+    return User(
+        id=user_id,
+        email=f"user{user_id}@example.com",
+        full_name="Benchmark User",
+        password="pbkdf2_sha256$870000$" + "x" * 77,
+    )
+
+
+def per_op_us(fn, count: int) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def latency(backend: str, scratch: Path, operations: int) -> dict:
+    cache = make_cache(backend, scratch)
+    cache.clear()
+    keys = [f"auth:user:{i}" for i in range(1000)]
+    rows = [user_row(i) for i in range(1000)]
+    set_us = per_op_us(lambda i: cache.set(keys[i % 1000], rows[i % 1000]), operations)
+    hit_us = per_op_us(lambda i: cache.get(keys[i % 1000]), operations)
+    miss_us = per_op_us(lambda i: cache.get(f"missing:{i}"), operations)
+    return {"get_hit_us": hit_us, "get_miss_us": miss_us, "set_us": set_us}
+
+
+def worker(backend: str, scratch: Path, keys: int, rounds: int, offset: int, queue) -> None:
+    cache = make_cache(backend, scratch)
+    loads = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for n in range(keys):
+            user_id = (n + offset) % keys
+            key = f"auth:user:{user_id}"
+            if cache.get(key) is None:
+                loads += 1
+                cache.set(key, user_row(user_id))
+    queue.put((loads, time.perf_counter() - start))
+
+
+def shared_hot_set(backend: str, scratch: Path, workers: int, keys: int, rounds: int) -> dict:
+    make_cache(backend, scratch).clear()
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(backend, scratch, keys, rounds, index * keys // workers, queue))
+        for index in range(workers)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+    lookups = workers * keys * rounds
+    return {
+        "loads": sum(loads for loads, _ in results),
+        "lookups_per_s": lookups / elapsed,
+        "slowest_worker_s": max(seconds for _, seconds in results),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--operations", type=int, default=20000, help="Operations per latency measurement.")
+    parser.add_argument("--repeat", type=int, default=3, help="Latency rounds; the median is reported.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--keys", type=int, default=2000, help="Hot keys every worker looks up.")
+    parser.add_argument("--rounds", type=int, default=5, help="Passes over the hot keys per worker.")
+    args = parser.parse_args()
+
+    print(f"{'backend':<15}{'get hit us':>12}{'get miss us':>13}{'set us':>10}{'loads':>10}{'lookups/s':>12}")
+    for backend in args.backends:
+        with tempfile.TemporaryDirectory(prefix="cache-bench-") as scratch:
+            scratch = Path(scratch)
+            runs = [latency(backend, scratch, args.operations) for _ in range(args.repeat)]
+            median = {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+            shared = shared_hot_set(backend, scratch, args.workers, args.keys, args.rounds)
+        print(
+            f"{backend:<15}{median['get_hit_us']:>12.1f}{median['get_miss_us']:>13.1f}{median['set_us']:>10.1f}"
+            f"{shared['loads']:>10}{shared['lookups_per_s']:>12.0f}"
+        )
+    print(f"\n{args.workers} workers x {args.keys} hot keys: the minimum possible number of loads is {args.keys}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Middleware overhead benchmark.
+
+Measures the per-request cost of the middleware stack in-process, by
+driving Django's WSGI handler directly with three configurations:
+
+- ``none``: no middleware at all (the baseline),
+- ``flat``: every middleware in ``MIDDLEWARE`` for every path (the stack
+  before ``SiteMiddlewareStack``),
+- ``lean``: the configured stack, where ``/api/`` skips ``SITE_MIDDLEWARE``.
+
+Tracing and the slow query log are disabled so only middleware cost is
+compared.
+
+Usage (from the ``src`` directory):
+
+    python benchmarks/middleware_overhead.py --requests 5000 --path /api/hello --path /admin/login/
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SRC_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+
+SITE_STACK = "api.middleware.site_stack.SiteMiddlewareStack"
+
+# The admin fails without the site middleware; keep its tracebacks out of the report.
+logging.getLogger("django.request").setLevel(logging.CRITICAL)
+
+
+def flat_middleware() -> list:
+    """The configured stack with SITE_MIDDLEWARE inlined where SiteMiddlewareStack sits."""
+    flat = []
+    for path in settings.MIDDLEWARE:
+        flat.extend(settings.SITE_MIDDLEWARE if path == SITE_STACK else [path])
+    return flat
+
+
+def measure(middleware: list, path: str, requests: int, rounds: int) -> list:
+    """Return the mean time per request (us) of each round."""
+    with override_settings(MIDDLEWARE=middleware, TRACING_ENABLED=False, SLOW_QUERY_LOG_ENABLED=False):
+        handler = WSGIHandler()
+        environ = RequestFactory(SERVER_NAME="localhost").get(path).environ
+
+        def call():
+            response = handler(dict(environ), lambda status, headers: None)
+            response.close()
+            return response.status_code
+
+        status = call()
+        for _ in range(min(requests, 200)):
+            call()
+
+        results = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(requests):
+                call()
+            results.append((time.perf_counter() - start) / requests * 1e6)
+    return status, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per round")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds per configuration")
+    parser.add_argument("--path", action="append", help="Path to request (repeatable; default /api/hello and /admin/login/)")
+    args = parser.parse_args()
+
+    configurations = {"none": [], "flat": flat_middleware(), "lean": list(settings.MIDDLEWARE)}
+    for path in args.path or ["/api/hello", "/admin/login/"]:
+        print(f"GET {path} ({args.rounds} rounds x {args.requests} requests)")
+        baseline = None
+        for name, middleware in configurations.items():
+            status, results = measure(middleware, path, args.requests, args.rounds)
+            median = statistics.median(results)
+            if baseline is None:
+                baseline = (status, median)
+            # Pages that need the site middleware (the admin) fail without it,
+            # so there is no baseline to subtract.
+            overhead = f"{median - baseline[1]:8.1f} us" if status == baseline[0] else "       -"
+            print(
+                f"  {name:<5} {len(middleware):2d} middleware  status {status}  "
+                f"median {median:8.1f} us/request  overhead {overhead}"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Sharded write throughput benchmark.
+
+For each shard count, spawns a fresh interpreter with
+``LOAN_SHARD_COUNT=<n>`` and every database redirected to a scratch
+directory, migrates all shards, then has concurrent worker processes (like
+a multi-process WSGI server) create loans, one autocommitted INSERT each
+routed to the user's shard, and reports loans per second. SQLite allows
+one writer per file, so throughput grows with the number of shards until
+the workers are CPU bound.
+
+Usage (from the ``src`` directory):
+
+    python benchmarks/shard_writes.py --shards 1 2 4 --workers 8 --loans 4000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+CHILD_SCRIPT = """
+import json, multiprocessing, sys, tempfile, time
+from pathlib import Path
+import django
+from django.conf import settings
+
+scratch = Path(tempfile.mkdtemp(prefix="shard-bench-"))
+for alias, database in settings.DATABASES.items():
+    database["NAME"] = scratch / f"{alias}.sqlite3"
+django.setup()
+
+from django.core.management import call_command
+from django.db import connections
+from api.models.user import User
+
+for alias in settings.DATABASES:
+    call_command("migrate", database=alias, verbosity=0)
+
+workers, total = int(sys.argv[1]), int(sys.argv[2])
+users = User.objects.bulk_create(
+    [User(email=f"bench-{i}@example.com", full_name="Bench", password="!") for i in range(workers * 16)]
+)
+connections.close_all()
+
+def worker(index):
+    try:
+        mine = users[index::workers]
+        for n in range(total // workers):
+            mine[n % len(mine)].loan_applications.create(amount=1000, tenure_months=6, purpose="bench")
+        return None
+    except Exception as e:
+        return repr(e)
+    finally:
+        connections.close_all()
+
+with multiprocessing.get_context("fork").Pool(workers) as pool:
+    start = time.perf_counter()
+    errors = [error for error in pool.map(worker, range(workers)) if error]
+    elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed_s": elapsed, "loans": total // workers * workers, "errors": errors[:3]}))
+"""
+
+
+def run(shards: int, workers: int, loans: int) -> dict:
+    env = dict(os.environ, LOAN_SHARD_COUNT=str(shards), TRACING_ENABLED="false", SLOW_QUERY_LOG_ENABLED="false")
+    env.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, str(workers), str(loans)],
+        cwd=SRC_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4], help="Shard counts to compare")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent writer processes")
+    parser.add_argument("--loans", type=int, default=4000, help="Loans created per run")
+    args = parser.parse_args()
+
+    print(f"{args.loans} loans from {args.workers} worker processes")
+    baseline = None
+    for shards in args.shards:
+        result = run(shards, args.workers, args.loans)
+        rate = result["loans"] / result["elapsed_s"]
+        baseline = baseline or rate
+        print(f"  {shards:2d} shard(s)  {rate:9.0f} loans/s  x{rate / baseline:4.2f}  errors: {result['errors'] or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
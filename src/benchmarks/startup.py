@@ -0,0 +1,128 @@
+"""
+Startup benchmark.
+
+Spawns fresh interpreters and measures how long a cold worker takes to get
+ready: ``django.setup()``, importing the URLconf (which builds the Ninja API
+and imports every router) and serving its first request. Each child runs with
+``-X importtime`` so the report also shows where import time goes.
+
+The first request defaults to the OpenAPI schema, which walks every router,
+operation and schema without needing a database; the run fails unless it
+answers 2xx, so a wrong ``--path`` cannot pass for a fast 404.
+
+Usage (from the ``src`` directory):
+
+    python benchmarks/startup.py --runs 5 --top 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+# Modules that should only be imported when they are actually needed.
+WATCHED_MODULES = [
+    "django.core.mail",
+    "django.core.mail.backends.smtp",
+    "smtplib",
+    "django.template.loader",
+]
+
+CHILD_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+import django
+django.setup()
+t1 = time.perf_counter()
+from django.conf import settings
+from importlib import import_module
+import_module(settings.ROOT_URLCONF)
+t2 = time.perf_counter()
+from django.test import Client
+response = Client(SERVER_NAME="localhost").get(sys.argv[1])
+t3 = time.perf_counter()
+print(json.dumps({
+    "setup_ms": (t1 - t0) * 1000,
+    "urlconf_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t3 - t2) * 1000,
+    "total_ms": (t3 - t0) * 1000,
+    "status": response.status_code,
+    "loaded": {name: name in sys.modules for name in json.loads(sys.argv[2])},
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Aggregate ``-X importtime`` self times (in ms) by top-level package.
+    """
+    totals = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, _cumulative, name = line[len("import time:"):].split("|")
+        except ValueError:
+            continue
+        package = name.strip().split(".")[0]
+        totals[package] += int(self_us) / 1000
+    return totals
+
+
+def run_once(path: str) -> tuple[dict, dict]:
+    env = dict(os.environ)
+    env.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT, path, json.dumps(WATCHED_MODULES)],
+        cwd=SRC_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    if not 200 <= timings["status"] < 300:
+        raise SystemExit(f"GET {path} answered {timings['status']}; pass a --path that answers 2xx")
+    return timings, parse_importtime(proc.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold starts to measure")
+    parser.add_argument("--top", type=int, default=15, help="Number of packages in the import breakdown")
+    parser.add_argument("--path", default="/api/openapi.json", help="Path used for the first request (must answer 2xx)")
+    args = parser.parse_args()
+
+    results = [run_once(args.path) for _ in range(args.runs)]
+    timings = [timing for timing, _ in results]
+
+    print(f"Cold starts: {args.runs} (first request: GET {args.path} -> {timings[0]['status']})")
+    for key in ("setup_ms", "urlconf_ms", "first_request_ms", "total_ms"):
+        values = [timing[key] for timing in timings]
+        print(f"  {key:<18} median {statistics.median(values):8.1f}  min {min(values):8.1f}  max {max(values):8.1f}")
+
+    print("\nLoaded after first request:")
+    for name, loaded in timings[-1]["loaded"].items():
+        print(f"  {name:<34} {'yes' if loaded else 'no'}")
+
+    packages = defaultdict(list)
+    for _, breakdown in results:
+        for package, ms in breakdown.items():
+            packages[package].append(ms)
+    ranked = sorted(
+        ((statistics.median(values), package) for package, values in packages.items()),
+        reverse=True,
+    )
+    print(f"\nImport self time by top-level package (median ms, top {args.top}):")
+    for ms, package in ranked[:args.top]:
+        print(f"  {package:<34} {ms:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,12 +10,18 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import json
+import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Running under `manage.py test` (the slow query log then defaults to off).
+TESTING = sys.argv[1:2] == ["test"]
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -41,15 +47,34 @@ INSTALLED_APPS = [
     "api",
 ]
 
+# SecurityMiddleware and CommonMiddleware come first so that every response,
+# including 503s from load shedding, gets the security headers, and HTTPS
+# and slash redirects are answered before any request work is done.
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "api.middleware.load_shedding.LoadSheddingMiddleware",
+    "api.middleware.profiling.ProfilingMiddleware",
+    "api.middleware.tracing.TracingMiddleware",
+    "api.middleware.slow_queries.SlowQueryRouteMiddleware",
+    "api.middleware.read_replicas.ReadReplicaMiddleware",
+    "api.middleware.site_stack.SiteMiddlewareStack",
+]
+
+# Browser-facing middleware, run by SiteMiddlewareStack for every path except
+# LEAN_PATH_PREFIXES. The bearer-token API under /api/ needs none of it.
+SITE_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+LEAN_PATH_PREFIXES = ["/api/"]
+
+# The admin checks look for these middleware in MIDDLEWARE only; the api
+# checks api.E003-E005 look for them through SiteMiddlewareStack instead.
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410"]
 
 ROOT_URLCONF = "core.urls"
 
@@ -79,9 +104,68 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # A file-backed test database gives tests real SQLite locking
+        # semantics (the in-memory shared cache raises table-lock errors
+        # under concurrent writers instead of waiting).
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
+# Loan applications are sharded by user over LOAN_SHARD_COUNT databases;
+# "default" is shard 0 and keeps users and everything else. Migrate each
+# shard with `python manage.py migrate --database loans_<n>`.
+LOAN_SHARD_COUNT = int(os.getenv("LOAN_SHARD_COUNT", 1))
+LOAN_SHARDS = ["default"]
+for _index in range(1, LOAN_SHARD_COUNT):
+    LOAN_SHARDS.append(f"loans_{_index}")
+    DATABASES[f"loans_{_index}"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / f"db_loans_{_index}.sqlite3",
+        "TEST": {"NAME": BASE_DIR / f"test_db_loans_{_index}.sqlite3"},
+    }
+
+# Read replicas: reads of GET/HEAD/OPTIONS requests go to a replica of their
+# primary, except for users who wrote in the last READ_YOUR_WRITES_SECONDS
+# (tracked in the cache, so CACHES must be shared between workers: with
+# replicas and a per-process cache, startup fails with api.E006).
+# DATABASE_REPLICA_PATHS lists local read-only SQLite copies of db.sqlite3;
+# `python manage.py refresh_replicas` re-copies them.
+DATABASE_REPLICA_PATHS = [_path.strip() for _path in os.getenv("DATABASE_REPLICA_PATHS", "").split(",") if _path.strip()]
+DATABASE_REPLICAS = {"default": []}
+for _index, _path in enumerate(DATABASE_REPLICA_PATHS, 1):
+    DATABASES[f"replica_{_index}"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": f"file:{BASE_DIR / _path}?mode=ro",
+        "OPTIONS": {"uri": True},
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS["default"].append(f"replica_{_index}")
+REPLICA_SELECTION = os.getenv("REPLICA_SELECTION", "round_robin")  # or "least_latency"
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", 30))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+
+# Audit database: with AUDIT_DATABASE_PATH set, AdminLog lives in its own
+# SQLite file, so audit writes don't queue on the main database's writer lock.
+# Migrate it with `python manage.py migrate --database audit`; on an existing
+# deployment, then move the AdminLog rows already in the main database there
+# with `python manage.py move_admin_logs`.
+AUDIT_DATABASE_PATH = os.getenv("AUDIT_DATABASE_PATH", "")
+AUDIT_DATABASE = "audit" if AUDIT_DATABASE_PATH else None
+if AUDIT_DATABASE:
+    DATABASES[AUDIT_DATABASE] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / AUDIT_DATABASE_PATH,
+        "OPTIONS": {
+            "timeout": 30,
+            # Appends only: WAL without a sync per commit; the audit journal
+            # covers entries lost in a crash.
+            "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL",
+        },
+        "TEST": {"NAME": BASE_DIR / "test_audit.sqlite3"},
+    }
+
+DATABASE_ROUTERS = ["api.db_routers.ReplicaRouter", "api.db_routers.AuditRouter", "api.db_routers.LoanShardRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -126,8 +210,6 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "api.User"
 
-import os
-
 # JWT Configuration
 JWT_SECRET_KEY = SECRET_KEY  
 JWT_ALGORITHM = "HS256"
@@ -142,3 +224,138 @@ EMAIL_HOST_USER = os.getenv("SMTP_USER")
 EMAIL_HOST_PASSWORD = os.getenv("SMTP_PASSWORD")
 EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "true").lower() == "true"
 DEFAULT_FROM_EMAIL = os.getenv("SMTP_FROM", EMAIL_HOST_USER)
+
+# Audit Log Configuration
+# "in-transaction" writes each AdminLog inside the request transaction;
+# "after-commit" journals it to AUDIT_JOURNAL_PATH and writes it after commit
+# (the default with an audit database; `manage.py recover_audit_journal`
+# writes entries left behind by a crash); "buffered" batches them with
+# bulk_create after commit.
+AUDIT_LOG_MODE = os.getenv("AUDIT_LOG_MODE", "after-commit" if AUDIT_DATABASE else "in-transaction")
+AUDIT_JOURNAL_PATH = Path(os.getenv("AUDIT_JOURNAL_PATH", BASE_DIR / "logs" / "audit_journal.jsonl"))
+AUDIT_JOURNAL_GRACE_SECONDS = float(os.getenv("AUDIT_JOURNAL_GRACE_SECONDS", 60))
+AUDIT_LOG_BUFFER_SIZE = int(os.getenv("AUDIT_LOG_BUFFER_SIZE", 100))
+AUDIT_LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL_SECONDS", 1.0))
+# Buffered entries kept while flushes fail; older ones spill to AUDIT_JOURNAL_PATH.
+AUDIT_LOG_MAX_BUFFER = int(os.getenv("AUDIT_LOG_MAX_BUFFER", 10000))
+
+# AdminLog rows older than this are moved to AUDIT_ARCHIVE_DIR by
+# `manage.py archive_admin_logs`.
+AUDIT_LOG_RETENTION_DAYS = int(os.getenv("AUDIT_LOG_RETENTION_DAYS", 90))
+AUDIT_ARCHIVE_DIR = Path(os.getenv("AUDIT_ARCHIVE_DIR", BASE_DIR / "archive" / "admin_logs"))
+
+# Loan Math
+# Nominal annual rate used for installments and amortization schedules, and
+# the highest installment-to-income ratio considered affordable.
+LOAN_ANNUAL_INTEREST_RATE = float(os.getenv("LOAN_ANNUAL_INTEREST_RATE", 0.18))
+LOAN_MAX_DEBT_TO_INCOME = float(os.getenv("LOAN_MAX_DEBT_TO_INCOME", 0.4))
+
+# Server-Sent Events (GET /api/loans/events, served under ASGI)
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+SSE_REPLAY_BUFFER_SIZE = int(os.getenv("SSE_REPLAY_BUFFER_SIZE", 1000))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", 100))
+SSE_MAX_CONNECTIONS_PER_USER = int(os.getenv("SSE_MAX_CONNECTIONS_PER_USER", 5))
+
+# Group commit for POST /api/loans/: concurrent inserts are committed together
+# with one bulk INSERT, after LOAN_WRITE_FLUSH_MS or LOAN_WRITE_BATCH_SIZE loans.
+LOAN_WRITE_COALESCING = os.getenv("LOAN_WRITE_COALESCING", "false").lower() == "true"
+LOAN_WRITE_BATCH_SIZE = int(os.getenv("LOAN_WRITE_BATCH_SIZE", 100))
+LOAN_WRITE_FLUSH_MS = float(os.getenv("LOAN_WRITE_FLUSH_MS", 2))
+
+# Policies for `manage.py auto_decide`, applied in order; see
+# api.services.auto_decision for the rule fields. Decisions are logged as
+# LOAN_DECISION_ACTOR_EMAIL, a staff user that cannot log in.
+LOAN_DECISION_RULES = json.loads(os.getenv("LOAN_DECISION_RULES", "[]"))
+LOAN_DECISION_ACTOR_EMAIL = os.getenv("LOAN_DECISION_ACTOR_EMAIL", "auto-decision@system.local")
+
+# Review queue: POST /api/admin/queue/claim leases pending loans to an admin
+# for this long unless renewed.
+REVIEW_LEASE_SECONDS = int(os.getenv("REVIEW_LEASE_SECONDS", 300))
+
+# Idempotency-Key support for POST /api/loans/
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", 24))
+IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS = int(os.getenv("IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS", 60))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 10))
+
+# Request Tracing
+# A TRACING_SAMPLE_RATE share of requests is traced, plus every request slower
+# than TRACING_SLOW_THRESHOLD_MS; traces are written as OTLP/JSON lines.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", 0.01))
+TRACING_SLOW_THRESHOLD_MS = float(os.getenv("TRACING_SLOW_THRESHOLD_MS", 500))
+TRACING_MAX_SPANS = int(os.getenv("TRACING_MAX_SPANS", 256))
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "nobus-api")
+TRACING_FILE = Path(os.getenv("TRACING_FILE", BASE_DIR / "traces" / "traces.jsonl"))
+TRACING_FILE_MAX_BYTES = int(os.getenv("TRACING_FILE_MAX_BYTES", 10 * 1024 * 1024))
+TRACING_FILE_BACKUP_COUNT = int(os.getenv("TRACING_FILE_BACKUP_COUNT", 5))
+
+# Slow Query Log
+# Queries slower than SLOW_QUERY_THRESHOLD_MS are written with their plan to
+# SLOW_QUERY_LOG_FILE; `manage.py slow_queries` summarizes them. Plans are
+# captured off the request path; at most SLOW_QUERY_EXPLAIN_QUEUE wait.
+SLOW_QUERY_LOG_ENABLED = os.getenv("SLOW_QUERY_LOG_ENABLED", "false" if TESTING else "true").lower() == "true"
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 100))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+SLOW_QUERY_EXPLAIN_QUEUE = int(os.getenv("SLOW_QUERY_EXPLAIN_QUEUE", 100))
+SLOW_QUERY_LOG_FILE = Path(os.getenv("SLOW_QUERY_LOG_FILE", BASE_DIR / "logs" / "slow_queries.jsonl"))
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUP_COUNT = int(os.getenv("SLOW_QUERY_LOG_BACKUP_COUNT", 5))
+
+# Adaptive concurrency limits for /api/ (per route class: auth, introspect,
+# read, write, admin_write). Limits shrink when responses exceed the class's
+# target latency (CONCURRENCY_TARGET_LATENCIES_MS, else
+# CONCURRENCY_TARGET_LATENCY_MS) or CONCURRENCY_LATENCY_TOLERANCE times its
+# unloaded latency, whichever is higher; requests over the limit get 503 with
+# Retry-After. Requests without a valid access token or service key may only
+# use CONCURRENCY_LOW_PRIORITY_SHARE of a class's limit. Set
+# CONCURRENCY_TRUST_REQUEST_START only behind a proxy that overwrites
+# X-Request-Start; requests it shows waited over CONCURRENCY_MAX_QUEUE_MS get 503.
+CONCURRENCY_LIMIT_ENABLED = os.getenv("CONCURRENCY_LIMIT_ENABLED", "true").lower() == "true"
+CONCURRENCY_TARGET_LATENCY_MS = float(os.getenv("CONCURRENCY_TARGET_LATENCY_MS", 250))
+CONCURRENCY_TARGET_LATENCIES_MS = {"auth": float(os.getenv("CONCURRENCY_AUTH_TARGET_LATENCY_MS", 1000))}
+CONCURRENCY_LATENCY_TOLERANCE = float(os.getenv("CONCURRENCY_LATENCY_TOLERANCE", 2.0))
+CONCURRENCY_MIN_LIMIT = int(os.getenv("CONCURRENCY_MIN_LIMIT", 1))
+CONCURRENCY_MAX_LIMIT = int(os.getenv("CONCURRENCY_MAX_LIMIT", 200))
+CONCURRENCY_BACKOFF_RATIO = float(os.getenv("CONCURRENCY_BACKOFF_RATIO", 0.9))
+CONCURRENCY_LOW_PRIORITY_SHARE = float(os.getenv("CONCURRENCY_LOW_PRIORITY_SHARE", 0.5))
+CONCURRENCY_MAX_QUEUE_MS = float(os.getenv("CONCURRENCY_MAX_QUEUE_MS", 2000))
+CONCURRENCY_TRUST_REQUEST_START = os.getenv("CONCURRENCY_TRUST_REQUEST_START", "false").lower() == "true"
+CONCURRENCY_INITIAL_LIMITS = {"auth": 10, "introspect": 20, "read": 50, "write": 10, "admin_write": 10}
+CONCURRENCY_EXEMPT_PATHS = ["/api/loans/events"]
+
+# Cache
+# "shared_memory" keeps one cache per host in a memory-mapped file that all
+# workers share (put CACHE_LOCATION on tmpfs, e.g. /dev/shm/nobus-cache);
+# "locmem" keeps a separate cache in every process.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+if CACHE_BACKEND == "shared_memory":
+    CACHES = {
+        "default": {
+            "BACKEND": "api.cache_backends.SharedMemoryCache",
+            "LOCATION": os.getenv("CACHE_LOCATION", str(BASE_DIR / "cache" / "shared.cache")),
+            "OPTIONS": {
+                "SLOTS": int(os.getenv("CACHE_SLOTS", 16384)),
+                "SLOT_SIZE": int(os.getenv("CACHE_SLOT_SIZE", 1024)),
+                "STRIPES": int(os.getenv("CACHE_STRIPES", 64)),
+            },
+        }
+    }
+# Users looked up by AuthBearer are cached this long (0 disables). Only
+# with a cache shared by the workers (CACHE_BACKEND=shared_memory): with a
+# per-process cache, a deactivated user would stay cached in other workers.
+AUTH_USER_CACHE_SECONDS = int(os.getenv("AUTH_USER_CACHE_SECONDS", 30))
+# Keys internal services send as X-Service-Key to POST /api/auth/introspect
+# (comma-separated; empty disables the endpoint).
+SERVICE_API_KEYS = [key for key in os.getenv("SERVICE_API_KEYS", "").split(",") if key]
+
+# Request profiling
+# An admin request carrying the X-Profile header, or a PROFILING_SAMPLE_RATE
+# share of all requests, is profiled into PROFILING_DIR (cProfile .pstats and
+# sampled .collapsed stacks); see GET /api/admin/profiles.
+# PROFILING_MODE "sampler" skips cProfile and only samples stacks.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "true").lower() == "true"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0))
+PROFILING_MODE = os.getenv("PROFILING_MODE", "cprofile")
+PROFILING_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", 1))
+PROFILING_DIR = Path(os.getenv("PROFILING_DIR", BASE_DIR / "profiles"))
+PROFILING_MAX_CAPTURES = int(os.getenv("PROFILING_MAX_CAPTURES", 50))
@@ -18,8 +18,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 from api.urls import api
+from api.views import loan_events
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("api/loans/events", loan_events, name="loan-events"),
     path("api/", api.urls),
 ]